@@ -0,0 +1,123 @@
+"""
+Synthetic datasets of the benchmarks.
+"""
+from flask_jwt_extended import create_access_token
+
+from src.exts import db
+from src.models import Movie, Rating, User
+from src.models.db_movie_model import RATING_HISTOGRAM_COLUMNS, get_rating_histogram_column
+
+
+# The rating values of the synthetic ratings, half stars like in the Goodreads dumps.
+RATING_VALUES = (1, 1.5, 2, 2.5, 3, 3.5, 4, 4.5, 5)
+
+CATEGORIES = ("Drama", "Comedy", "Action", "Horror", "Book")
+COUNTRIES = ("USA", "UK", "France", "Japan", "Unknown")
+
+
+def generate_ratings(users, movies, density, rng):
+    """
+    Generates random ratings. Every user rates every movie with the probability of the density, but at least two
+    movies, so every user has a Spearman's correlation coefficient with the other users.
+
+    :param users: The number of users, their IDs are 1 to users.
+    :type users: int
+
+    :param movies: The number of movies, their IDs are 1 to movies.
+    :type movies: int
+
+    :param density: The share of the rated movies, 0 to 1.
+    :type density: float
+
+    :param rng: The random generator.
+    :type rng: random.Random
+
+    :return: The ratings of the users, key: user ID, value: dict with key: movie ID, value: rating.
+    :rtype: dict[int, dict[int, float]]
+    """
+    users_ratings = {}
+    for user_id in range(1, users + 1):
+        rated_count = max(2, min(movies, round(rng.gauss(movies * density, movies * density / 4))))
+        users_ratings[user_id] = {movie_id: rng.choice(RATING_VALUES)
+                                  for movie_id in sorted(rng.sample(range(1, movies + 1), rated_count))}
+
+    return users_ratings
+
+
+def create_movies(count, rng, users_ratings=None):
+    """
+    Inserts random movies with rating aggregates consistent with the ratings. Without ratings, the aggregates are
+    random, e.g. for the benchmarks of the movie listings.
+
+    :param count: The number of movies, their IDs are 1 to count.
+    :type count: int
+
+    :param rng: The random generator.
+    :type rng: random.Random
+
+    :param users_ratings: The ratings of the users (see generate_ratings()), None for random aggregates.
+    :type users_ratings: dict[int, dict[int, float]] or None
+    """
+    movie_ratings = {movie_id: [] for movie_id in range(1, count + 1)}
+    for ratings in (users_ratings or {}).values():
+        for movie_id, rating in ratings.items():
+            movie_ratings[movie_id].append(rating)
+
+    movies = []
+    for movie_id, ratings in movie_ratings.items():
+        if users_ratings is None:
+            ratings = [stars for stars in range(1, 6) for _ in range(rng.randint(0, 20))]
+
+        histogram = {column: 0 for column in RATING_HISTOGRAM_COLUMNS}
+        for rating in ratings:
+            histogram[get_rating_histogram_column(rating)] += 1
+
+        movies.append({
+            "id": movie_id,
+            "title": f"Movie {rng.randrange(count):08d}",
+            "category": rng.choice(CATEGORIES),
+            "country": rng.choice(COUNTRIES),
+            "year": rng.randint(1920, 2023),
+            "main_actors": "Actor One, Actor Two",
+            "description": "A synthetic movie of the benchmark catalogue.",
+            "rating_count": len(ratings),
+            "rating_sum": float(sum(ratings)),
+            **histogram,
+            "average_rating": sum(ratings) / len(ratings) if ratings else 0
+        })
+
+    db.session.execute(db.insert(Movie), movies)
+    db.session.commit()
+
+
+def create_users(users_ratings):
+    """
+    Inserts the users and their ratings.
+
+    :param users_ratings: The ratings of the users, see generate_ratings().
+    :type users_ratings: dict[int, dict[int, float]]
+    """
+    db.session.execute(db.insert(User), [
+        {"id": user_id, "name": "Synthetic", "surname": "User", "email": f"user-{user_id}@example.invalid",
+         "password": "benchmark"}
+        for user_id in users_ratings
+    ])
+    db.session.execute(db.insert(Rating), [
+        {"user_id": user_id, "movie_id": movie_id, "rating": rating}
+        for user_id, ratings in users_ratings.items() for movie_id, rating in ratings.items()
+    ])
+    db.session.commit()
+
+
+def create_benchmark_access_token():
+    """
+    Creates the user the benchmarks log in as and returns its access token.
+
+    :return: The JWT access token.
+    :rtype: str
+    """
+    user = User(name="Benchmark", surname="User", email="benchmark@example.invalid", password="benchmark")
+    db.session.add(user)
+    db.session.commit()
+
+    return create_access_token(identity=user.email)
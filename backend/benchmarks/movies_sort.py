@@ -0,0 +1,100 @@
+"""
+Benchmark of the GET /movies/sort endpoint with a synthetic catalogue.
+
+The benchmark fills a temporary SQLite database with random movies (including their rating aggregates), requests
+the first page and a page from the middle of the catalogue for every supported sort key in both directions, and the
+first page of the filtered listings with their facet counts, through the Flask test client and fails when the 95th
+percentile latency of a request exceeds the budget.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.movies_sort --movies 100000 --max-ms 50
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+from src import create_app, TestConfig
+from src.exts import db
+from src.models import Movie
+from src.models.db_movie_model import QUERY_SORT_COLUMNS
+
+from .datasets import create_movies, create_benchmark_access_token
+from .timing import measure
+
+
+# One sort value per direction, the sort values of a direction are equivalent.
+SORT_VALUES = ("abc", "zyx")
+
+# The filters of the filtered listings, sorted by title.
+FILTERS = {
+    "category": {"filter_category": "Drama"},
+    "country and category": {"filter_country": "Japan", "filter_category": "Comedy"},
+    "year range": {"filter_year_from": 1990, "filter_year_to": 1999},
+    "all facets": {"filter_category": "Horror", "filter_country": "UK", "filter_year_from": 1950,
+                   "filter_year_to": 2000}
+}
+
+
+def main():
+    """
+    Runs the benchmark and prints the latency of every sort, the exit status is 1 if a sort exceeds the budget.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark of the GET /movies/sort endpoint.")
+    parser.add_argument("--movies", type=int, default=100000, help="The number of movies in the catalogue.")
+    parser.add_argument("--repeat", type=int, default=5, help="The number of requests per sort.")
+    parser.add_argument("--limit", type=int, default=100, help="The number of movies per page.")
+    parser.add_argument("--max-ms", type=float, default=50, help="The latency budget (p95) of a request.")
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the random catalogue.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        class BenchmarkConfig(TestConfig):
+            SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(directory, "benchmark.db")
+
+        app = create_app(BenchmarkConfig)
+
+        with app.app_context():
+            db.create_all()
+            create_movies(args.movies, random.Random(args.seed))
+            headers = {"Authorization": f"Bearer {create_benchmark_access_token()}"}
+
+        client = app.test_client()
+        over_budget = False
+
+        for key in QUERY_SORT_COLUMNS:
+            for value in SORT_VALUES:
+                with app.app_context():
+                    middle_cursor = Movie.get_page({key: value}, args.movies // 2)["next_cursor"]
+
+                for page, cursor in (("first page", None), ("middle page", middle_cursor)):
+                    query_string = {key: value, "limit": args.limit, **({"cursor": cursor} if cursor else {})}
+
+                    def request_page():
+                        response = client.get("/movies/sort", query_string=query_string, headers=headers)
+                        assert response.status_code == 200, response.get_data(as_text=True)
+
+                    run_times = measure(request_page, args.repeat)
+                    over_budget |= run_times["p95"] > args.max_ms
+                    print(f"{key}={value}, {page}: median {run_times['median']:.1f} ms, p95 {run_times['p95']:.1f} ms"
+                          f"{' (over budget)' if run_times['p95'] > args.max_ms else ''}")
+
+        for name, filters in FILTERS.items():
+            query_string = {"title": "abc", "limit": args.limit, **filters}
+
+            def request_filtered_page():
+                response = client.get("/movies/sort", query_string=query_string, headers=headers)
+                assert response.status_code == 200, response.get_data(as_text=True)
+
+            run_times = measure(request_filtered_page, args.repeat)
+            over_budget |= run_times["p95"] > args.max_ms
+            print(f"{name} filter, first page with facets: median {run_times['median']:.1f} ms, "
+                  f"p95 {run_times['p95']:.1f} ms{' (over budget)' if run_times['p95'] > args.max_ms else ''}")
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
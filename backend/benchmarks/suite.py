@@ -0,0 +1,272 @@
+"""
+Benchmark suite of the recommendation system and of the API hot paths.
+
+The suite generates a synthetic rating dataset (the numbers of users and movies and the density of the ratings are
+configurable) and times:
+
+- the recommendation system without the database: SpearmanMechanism for the target user and every other user,
+  RecMechanism with the calculation of the correlation coefficients, RecMechanism.get_recommendations() and
+  RecMechanism.get_predicted_rating_for_movie(),
+- the parallel neighbor precomputation of all users (get_parallel_neighbors(), the correlation store batch job)
+  with every number of worker processes of --processes, so its scaling can be checked against the core count,
+- the API endpoints through the Flask test client, against the TestConfig SQLite database (its tables are recreated)
+  and with the recommendation cache disabled, so every request calculates its response.
+
+The results are written to a JSON file, which a later run can compare against with --baseline to track regressions.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.suite --users 500 --movies 1000 --density 0.05 --output benchmark-results.json
+    python -m benchmarks.suite --only recsys --users 5000 --processes 1,2,4,8
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+
+from src import create_app, TestConfig
+from src.exts import db
+from src.recsys import RatingsSnapshot, RecMechanism, SpearmanMechanism, get_parallel_neighbors
+
+from .datasets import generate_ratings, create_movies, create_users, create_benchmark_access_token
+from .timing import measure
+
+
+# The TestConfig with the recommendation cache disabled.
+class BenchmarkConfig(TestConfig):
+    RECOMMENDATION_CACHE_BACKEND = "none"
+
+
+def main():
+    """
+    Runs the benchmark suite, prints the run times and writes them to the output file.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark suite of the recommendation system and the API.")
+    parser.add_argument("--users", type=int, default=500, help="The number of users.")
+    parser.add_argument("--movies", type=int, default=1000, help="The number of movies.")
+    parser.add_argument("--density", type=float, default=0.05, help="The share of the movies rated by a user.")
+    parser.add_argument("--repeat", type=int, default=5, help="The number of measured runs per benchmark.")
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the synthetic dataset.")
+    parser.add_argument("--processes", default=f"1,{os.cpu_count() or 1}",
+                        help="Comma-separated numbers of worker processes of the parallel neighbor precomputation.")
+    parser.add_argument("--block-size", type=int, default=64,
+                        help="The number of users per block of the precomputation.")
+    parser.add_argument("--only", choices=("recsys", "api"), help="Run only the recsys or the API benchmarks.")
+    parser.add_argument("--output", default="benchmark-results.json", help="The JSON file of the results.")
+    parser.add_argument("--baseline", help="The JSON file of earlier results to compare the median run times with.")
+    args = parser.parse_args()
+    processes_counts = sorted({int(processes) for processes in args.processes.split(",")})
+
+    users_ratings = generate_ratings(args.users, args.movies, args.density, random.Random(args.seed))
+    target_user_id, movie_id = _get_targets(users_ratings, args.movies)
+
+    results = {}
+    if args.only in (None, "recsys"):
+        results.update(run_recsys_benchmarks(users_ratings, target_user_id, movie_id, args.repeat))
+        results.update(run_parallel_benchmarks(users_ratings, processes_counts, args.block_size, args.repeat))
+    if args.only in (None, "api"):
+        results.update(run_api_benchmarks(users_ratings, args.movies, target_user_id, movie_id, args.repeat,
+                                          random.Random(args.seed)))
+
+    baseline = _load_baseline(args.baseline)
+    for name, run_times in results.items():
+        change = ""
+        if name in baseline:
+            change = f" ({(run_times['median'] / baseline[name]['median'] - 1) * 100:+.1f} % against the baseline)"
+        print(f"{name}: median {run_times['median']:.2f} ms, p95 {run_times['p95']:.2f} ms{change}")
+
+    with open(args.output, "w") as file:
+        json.dump({
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": vars(args),
+            "dataset": {
+                "users": len(users_ratings),
+                "movies": args.movies,
+                "ratings": sum(len(ratings) for ratings in users_ratings.values()),
+                "target_user_id": target_user_id,
+                "movie_id": movie_id
+            },
+            "results": results
+        }, file, indent=2)
+
+    print(f"The results were written to {args.output}.")
+
+
+def run_recsys_benchmarks(users_ratings, target_user_id, movie_id, repeat):
+    """
+    Times the recommendation system on the snapshot users, without the database.
+
+    :param users_ratings: The ratings of the users, see generate_ratings().
+    :type users_ratings: dict[int, dict[int, float]]
+
+    :param target_user_id: The ID of the user the recommendations are calculated for.
+    :type target_user_id: int
+
+    :param movie_id: The ID of a movie the target user did not rate, for the predicted rating.
+    :type movie_id: int
+
+    :param repeat: The number of measured runs per benchmark.
+    :type repeat: int
+
+    :return: The run times, key: benchmark name, value: the statistics of measure().
+    :rtype: dict[str, dict[str, float]]
+    """
+    snapshot = RatingsSnapshot.from_users_ratings(users_ratings)
+    users = snapshot.get_users()
+    target_user = snapshot.get_user(target_user_id)
+    other_users = [user for user in users if user.get_id() != target_user_id]
+    coefficients = RecMechanism(target_user, other_users).get_spearman_correlation_coefficients()
+
+    return {
+        "recsys.spearman_mechanism": measure(
+            lambda: [SpearmanMechanism(target_user, user).get_spearman_correlation_coefficient()
+                     for user in other_users], repeat),
+        "recsys.rec_mechanism.correlations": measure(lambda: RecMechanism(target_user, other_users), repeat),
+        "recsys.rec_mechanism.get_recommendations": measure(
+            lambda: RecMechanism(target_user, spearman_correlation_coefficients=coefficients).get_recommendations(),
+            repeat),
+        "recsys.rec_mechanism.get_predicted_rating_for_movie": measure(
+            lambda: RecMechanism(target_user, spearman_correlation_coefficients=coefficients)
+            .get_predicted_rating_for_movie(movie_id), repeat)
+    }
+
+
+def run_parallel_benchmarks(users_ratings, processes_counts, block_size, repeat):
+    """
+    Times the nearest neighbor precomputation of all users with different numbers of worker processes and prints
+    the speedup against the first (smallest) number.
+
+    :param users_ratings: The ratings of the users, see generate_ratings().
+    :type users_ratings: dict[int, dict[int, float]]
+
+    :param processes_counts: The numbers of worker processes, in ascending order.
+    :type processes_counts: list[int]
+
+    :param block_size: The number of users per block.
+    :type block_size: int
+
+    :param repeat: The number of measured runs per benchmark.
+    :type repeat: int
+
+    :return: The run times, key: benchmark name, value: the statistics of measure().
+    :rtype: dict[str, dict[str, float]]
+    """
+    snapshot = RatingsSnapshot.from_users_ratings(users_ratings)
+
+    results = {}
+    for processes in processes_counts:
+        results[f"recsys.parallel_neighbors.processes_{processes}"] = measure(
+            lambda: list(get_parallel_neighbors(snapshot, processes=processes, block_size=block_size,
+                                                min_correlation=RecMechanism.MIN_CORRELATION)), repeat)
+
+    base_processes = processes_counts[0]
+    base_median = results[f"recsys.parallel_neighbors.processes_{base_processes}"]["median"]
+    for processes in processes_counts[1:]:
+        speedup = base_median / results[f"recsys.parallel_neighbors.processes_{processes}"]["median"]
+        print(f"parallel neighbors: {speedup:.2f}x speedup with {processes} processes against {base_processes}")
+
+    return results
+
+
+def run_api_benchmarks(users_ratings, movies, target_user_id, movie_id, repeat, rng):
+    """
+    Times the API endpoints through the Flask test client against the TestConfig database.
+
+    :param users_ratings: The ratings of the users, see generate_ratings().
+    :type users_ratings: dict[int, dict[int, float]]
+
+    :param movies: The number of movies.
+    :type movies: int
+
+    :param target_user_id: The ID of the user the user endpoints are requested for.
+    :type target_user_id: int
+
+    :param movie_id: The ID of a movie the target user did not rate.
+    :type movie_id: int
+
+    :param repeat: The number of measured runs per benchmark.
+    :type repeat: int
+
+    :param rng: The random generator of the movies.
+    :type rng: random.Random
+
+    :return: The run times, key: benchmark name, value: the statistics of measure().
+    :rtype: dict[str, dict[str, float]]
+    """
+    app = create_app(BenchmarkConfig)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        create_movies(movies, rng, users_ratings)
+        create_users(users_ratings)
+        headers = {"Authorization": f"Bearer {create_benchmark_access_token()}"}
+
+    client = app.test_client()
+    predicted_movie_ids = ",".join(str(movie) for movie in range(1, min(movies, 50) + 1))
+
+    requests = {
+        "api.movies": ("/movies", {}),
+        "api.movies.sort": ("/movies/sort", {"rating": "highest"}),
+        "api.movies.stream": ("/movies", {"stream": "ndjson"}),
+        "api.movie": (f"/movies/movie/{movie_id}", {}),
+        "api.user": (f"/user/{target_user_id}", {}),
+        "api.user.ratings": (f"/user/{target_user_id}/ratings", {}),
+        "api.user.recommendations": (f"/user/{target_user_id}/recommendations", {}),
+        "api.user.prediction": (f"/user/{target_user_id}/prediction/{movie_id}", {}),
+        "api.user.predictions": (f"/user/{target_user_id}/predictions", {"movie_ids": predicted_movie_ids})
+    }
+
+    def get_request(path, query_string):
+        def request():
+            response = client.get(path, query_string=query_string, headers=headers)
+            assert response.status_code == 200, f"{path}: {response.status_code} {response.get_data(as_text=True)}"
+
+        return request
+
+    return {name: measure(get_request(path, query_string), repeat) for name, (path, query_string) in requests.items()}
+
+
+def _get_targets(users_ratings, movies):
+    """
+    Chooses the target user, the user with the median number of ratings, and a movie the user did not rate.
+
+    :param users_ratings: The ratings of the users, see generate_ratings().
+    :type users_ratings: dict[int, dict[int, float]]
+
+    :param movies: The number of movies.
+    :type movies: int
+
+    :return: The target user ID and the movie ID.
+    :rtype: tuple[int, int]
+    """
+    user_ids = sorted(users_ratings, key=lambda user_id: (len(users_ratings[user_id]), user_id))
+    target_user_id = user_ids[len(user_ids) // 2]
+    movie_id = next((movie for movie in range(1, movies + 1) if movie not in users_ratings[target_user_id]), 1)
+
+    return target_user_id, movie_id
+
+
+def _load_baseline(path):
+    """
+    Loads the results of an earlier run.
+
+    :param path: The JSON file of the results, None for no baseline.
+    :type path: str or None
+
+    :return: The run times of the baseline, key: benchmark name, value: the statistics of measure().
+    :rtype: dict[str, dict[str, float]]
+    """
+    if path is None:
+        return {}
+
+    with open(path) as file:
+        return json.load(file)["results"]
+
+
+if __name__ == "__main__":
+    main()
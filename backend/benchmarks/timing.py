@@ -0,0 +1,58 @@
+"""
+Timing of the benchmarks.
+"""
+import statistics
+import time
+
+
+def measure(function, repeat, warmup=1):
+    """
+    Calls the function repeatedly and returns the statistics of its run times.
+
+    :param function: The measured function without arguments.
+    :type function: callable
+
+    :param repeat: The number of measured calls.
+    :type repeat: int
+
+    :param warmup: The number of calls before the measured calls, e.g. to fill the caches of SQLite.
+    :type warmup: int
+
+    :return: The run times in milliseconds with the following keys: runs, min, median, mean, p95 and max.
+    :rtype: dict[str, float]
+    """
+    for _ in range(warmup):
+        function()
+
+    run_times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        run_times.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "runs": repeat,
+        "min": min(run_times),
+        "median": statistics.median(run_times),
+        "mean": statistics.mean(run_times),
+        "p95": get_percentile(run_times, 95),
+        "max": max(run_times)
+    }
+
+
+def get_percentile(values, percentile):
+    """
+    Returns the percentile of the values (nearest rank).
+
+    :param values: The measured values.
+    :type values: list[float]
+
+    :param percentile: The percentile, 0 to 100.
+    :type percentile: float
+
+    :return: The percentile value.
+    :rtype: float
+    """
+    ordered = sorted(values)
+
+    return ordered[max(0, -(-len(ordered) * percentile // 100) - 1)]
@@ -0,0 +1,88 @@
+"""Full-text search index of the movies and the comments
+
+Revision ID: f2b9c7a4e5d3
+Revises: a6f4d2e8c071
+Create Date: 2026-10-18 22:57:19.604128
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b9c7a4e5d3'
+down_revision = 'a6f4d2e8c071'
+branch_labels = None
+depends_on = None
+
+
+# The FTS5 tables and their triggers, the same as SEARCH_INDEX_DDL of src/models/search_index.py.
+SEARCH_INDEX_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS movie_fts USING fts5(
+        title, description, main_actors, content='movie', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movie_fts_insert AFTER INSERT ON movie BEGIN
+        INSERT INTO movie_fts(rowid, title, description, main_actors)
+        VALUES (new.id, new.title, new.description, new.main_actors);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movie_fts_delete AFTER DELETE ON movie BEGIN
+        INSERT INTO movie_fts(movie_fts, rowid, title, description, main_actors)
+        VALUES ('delete', old.id, old.title, old.description, old.main_actors);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movie_fts_update AFTER UPDATE OF title, description, main_actors ON movie BEGIN
+        INSERT INTO movie_fts(movie_fts, rowid, title, description, main_actors)
+        VALUES ('delete', old.id, old.title, old.description, old.main_actors);
+        INSERT INTO movie_fts(rowid, title, description, main_actors)
+        VALUES (new.id, new.title, new.description, new.main_actors);
+    END
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS comment_fts USING fts5(
+        comment, content='', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS comment_fts_insert AFTER INSERT ON comment BEGIN
+        INSERT INTO comment_fts(rowid, comment) VALUES ((new.movie_id << 32) + new.id, new.comment);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS comment_fts_delete AFTER DELETE ON comment BEGIN
+        INSERT INTO comment_fts(comment_fts, rowid, comment)
+        VALUES ('delete', (old.movie_id << 32) + old.id, old.comment);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS comment_fts_update AFTER UPDATE OF comment, movie_id ON comment BEGIN
+        INSERT INTO comment_fts(comment_fts, rowid, comment)
+        VALUES ('delete', (old.movie_id << 32) + old.id, old.comment);
+        INSERT INTO comment_fts(rowid, comment) VALUES ((new.movie_id << 32) + new.id, new.comment);
+    END
+    """
+)
+
+
+def upgrade():
+    for statement in SEARCH_INDEX_DDL:
+        op.execute(statement)
+
+    # Index the existing movies and comments.
+    op.execute("INSERT INTO movie_fts(movie_fts) VALUES ('rebuild')")
+    op.execute("INSERT INTO comment_fts(rowid, comment) SELECT (movie_id << 32) + id, comment FROM comment")
+
+
+def downgrade():
+    for trigger in ('comment_fts_update', 'comment_fts_delete', 'comment_fts_insert',
+                    'movie_fts_update', 'movie_fts_delete', 'movie_fts_insert'):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+    op.execute("DROP TABLE IF EXISTS comment_fts")
+    op.execute("DROP TABLE IF EXISTS movie_fts")
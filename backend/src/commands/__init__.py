@@ -0,0 +1,3 @@
+from .recsys import recsys_cli
+from .importer import import_cli
+from .jobs import jobs_cli
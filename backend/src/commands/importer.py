@@ -0,0 +1,211 @@
+import csv
+import os
+import time
+from itertools import islice
+
+import click
+from flask.cli import AppGroup
+
+from ..exts import db, recommendation_cache
+from ..models import Movie, Rating, User, ImportProgress
+from .jobs import run_precompute_job
+
+
+import_cli = AppGroup("import", help="Bulk import of movies and ratings from CSV files.")
+
+# The columns that can hold the movie ID in a rating dump.
+RATING_MOVIE_ID_COLUMNS = ("movie_id", "item_id", "book_id")
+
+
+@import_cli.command("books")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--chunk-size", type=int, default=5000, show_default=True, help="The number of rows per transaction.")
+@click.option("--category", default="Book", show_default=True, help="The category of the imported movies.")
+@click.option("--country", default="Unknown", show_default=True, help="The country of the imported movies.")
+@click.option("--restart", is_flag=True, help="Discard the saved progress and import the file from the first row.")
+def import_books(path, chunk_size, category, country, restart):
+    """
+    Imports the movies from a CSV file with the Goodreads books schema (books.csv): book_id becomes the movie ID,
+    authors the main actors and the title the description. The books.csv has no category and country columns,
+    their values are set by the options.
+    """
+    def get_movie(row):
+        title = (row.get("original_title") or row.get("title") or "").strip()
+        movie_id = _parse_number(row.get("book_id"), int)
+        if movie_id is None or not title:
+            return None
+
+        return {
+            "id": movie_id,
+            "title": title[:40],
+            "category": category,
+            "country": country,
+            "year": _parse_number(row.get("original_publication_year"), lambda value: int(float(value))) or 0,
+            "main_actors": (row.get("authors") or "").strip(),
+            "description": (row.get("title") or title).strip()
+        }
+
+    def import_chunk(rows):
+        movies = [movie for movie in map(get_movie, rows) if movie is not None]
+
+        return Movie.bulk_insert(movies) if movies else 0
+
+    _import_file("books", path, chunk_size, restart, import_chunk)
+
+
+@import_cli.command("ratings")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--chunk-size", type=int, default=20000, show_default=True, help="The number of rows per transaction.")
+@click.option("--restart", is_flag=True, help="Discard the saved progress and import the file from the first row.")
+@click.option("--precompute", is_flag=True,
+              help="Rebuild the correlation store and precompute the recommendations of all users afterwards.")
+def import_ratings(path, chunk_size, restart, precompute):
+    """
+    Imports the ratings from a CSV file with the user_id, movie ID (movie_id, item_id or book_id) and rating columns.
+    Missing users are created as placeholders, the ratings of unknown movies are skipped and an existing rating of
+    the same movie by the same user is updated.
+
+    The correlation store is not refreshed by the import, use --precompute (or run flask jobs precompute
+    afterwards) to rebuild it and to fill the recommendation cache.
+    """
+    def get_rating(row, movie_id_column):
+        user_id = _parse_number(row.get("user_id"), int)
+        movie_id = _parse_number(row.get(movie_id_column), int)
+        rating = _parse_number(row.get("rating"), float)
+
+        return None if user_id is None or movie_id is None or rating is None else (user_id, movie_id, rating)
+
+    def import_chunk(rows):
+        movie_id_column = next((column for column in RATING_MOVIE_ID_COLUMNS if column in rows[0]), None)
+        if movie_id_column is None:
+            raise click.ClickException(f"No movie ID column, expected one of: {', '.join(RATING_MOVIE_ID_COLUMNS)}.")
+
+        ratings = [rating for rating in (get_rating(row, movie_id_column) for row in rows) if rating is not None]
+        if not ratings:
+            return 0
+
+        User.bulk_create_missing({user_id for user_id, _, _ in ratings})
+        inserted_count, updated_count = Rating.bulk_upsert(ratings)
+
+        return inserted_count + updated_count
+
+    _import_file("ratings", path, chunk_size, restart, import_chunk)
+
+    recommendation_cache.clear()
+
+    if precompute:
+        run_precompute_job()
+    else:
+        click.echo("Run flask jobs precompute to rebuild the correlation store and the recommendations.")
+
+
+def _import_file(kind, path, chunk_size, restart, import_chunk):
+    """
+    Streams the CSV file in chunks and imports every chunk in its own transaction, together with the import progress.
+    An interrupted import continues after the last committed chunk when it is started again.
+
+    :param kind: The kind of the import, part of the progress key.
+    :type kind: str
+
+    :param path: The path of the CSV file.
+    :type path: str
+
+    :param chunk_size: The number of rows per transaction.
+    :type chunk_size: int
+
+    :param restart: Whether to discard the saved progress.
+    :type restart: bool
+
+    :param import_chunk: The function that imports a list of CSV rows (dictionaries) and returns the number of
+                         stored rows, without committing.
+    :type import_chunk: callable
+    """
+    if chunk_size < 1:
+        raise click.BadParameter("The chunk size must be positive.", param_hint="--chunk-size")
+
+    progress = ImportProgress.get_or_create(f"{kind}:{os.path.abspath(path)}", restart)
+    if progress.completed:
+        click.echo(f"{path} was already imported ({progress.rows} rows), use --restart to import it again.")
+        return
+
+    if progress.rows:
+        click.echo(f"Resuming after row {progress.rows}.")
+
+    started = time.perf_counter()
+    read_count = stored_count = 0
+
+    with open(path, "rb") as file:
+        rows = islice(csv.DictReader(_decode(line) for line in file), progress.rows, None)
+
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+
+            stored_count += import_chunk(chunk)
+            read_count += len(chunk)
+            progress.advance(len(chunk), completed=len(chunk) < chunk_size)
+            db.session.commit()
+
+            click.echo(f"{progress.rows} rows processed, {_get_rate(read_count, started):.0f} rows/sec")
+
+    if not progress.completed:
+        progress.advance(0, completed=True)
+        db.session.commit()
+
+    click.echo(f"Imported {stored_count} of {read_count} rows in {time.perf_counter() - started:.1f} s "
+               f"({_get_rate(read_count, started):.0f} rows/sec).")
+
+
+def _decode(line):
+    """
+    Decodes a line of the input file. The lines are decoded as UTF-8, the lines that are not valid UTF-8 as
+    Windows-1252, because the Goodreads dumps (including the books.csv) mix both encodings.
+
+    :param line: The raw line.
+    :type line: bytes
+
+    :return: The decoded line.
+    :rtype: str
+    """
+    try:
+        return line.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return line.decode("cp1252", errors="replace")
+
+
+def _parse_number(value, cast):
+    """
+    Parses a numeric CSV value.
+
+    :param value: The CSV value.
+    :type value: str or None
+
+    :param cast: The conversion function, e.g. int or float.
+    :type cast: callable
+
+    :return: The number, None if the value is empty or invalid.
+    :rtype: int or float or None
+    """
+    try:
+        return cast(value.strip())
+    except (AttributeError, ValueError):
+        return None
+
+
+def _get_rate(rows, started):
+    """
+    Calculates the import rate.
+
+    :param rows: The number of processed rows.
+    :type rows: int
+
+    :param started: The perf_counter() value at the start of the import.
+    :type started: float
+
+    :return: The processed rows per second.
+    :rtype: float
+    """
+    elapsed = time.perf_counter() - started
+
+    return rows / elapsed if elapsed > 0 else 0
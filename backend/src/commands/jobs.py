@@ -0,0 +1,66 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from ..models import Job
+
+
+jobs_cli = AppGroup("jobs", help="Background jobs, e.g. the refresh of stale recommendations.")
+
+
+@jobs_cli.command("run")
+@click.option("--kind", default=None, help="Run only the jobs of this kind, e.g. recommendations.")
+@click.option("--requeue", is_flag=True,
+              help="Queue the running jobs again first, e.g. after the server was stopped while running them.")
+def run_jobs(kind, requeue):
+    """
+    Runs the queued jobs in this process, the oldest first, e.g. the jobs queued with JOB_WORKERS=0.
+    """
+    if requeue:
+        click.echo(f"Queued {Job.requeue_running()} running jobs again.")
+
+    click.echo(f"Ran {Job.run_queued(kind)} jobs.")
+
+
+@jobs_cli.command("precompute")
+@click.option("--processes", type=int, default=None,
+              help="The number of worker processes, CORRELATIONS_PROCESSES (or the CPU count) by default.")
+@click.option("--block-size", type=int, default=None,
+              help="The number of users per block, CORRELATIONS_BLOCK_SIZE by default.")
+def precompute(processes, block_size):
+    """
+    Rebuilds the correlation store and calculates the recommendations of all users into the recommendation cache,
+    e.g. after a bulk import. The job is recorded in the job table and run in this process.
+    """
+    run_precompute_job(processes, block_size)
+
+
+def run_precompute_job(processes=None, block_size=None):
+    """
+    Queues a "precompute" job and runs it in the current process, then prints its status.
+
+    :param processes: The number of worker processes, CORRELATIONS_PROCESSES (or the CPU count) if None.
+    :type processes: int or None
+
+    :param block_size: The number of users per block, CORRELATIONS_BLOCK_SIZE if None.
+    :type block_size: int or None
+    """
+    processes = processes or current_app.config["CORRELATIONS_PROCESSES"] or None
+    block_size = block_size or current_app.config["CORRELATIONS_BLOCK_SIZE"]
+
+    if block_size < 1:
+        raise click.UsageError("The block size must be positive.")
+
+    # The job handler detaches the session objects, so only the job ID is kept.
+    job_id = Job.enqueue("precompute", {"processes": processes, "block_size": block_size}, key="precompute",
+                         submit=False).id
+    click.echo(f"Running job {job_id}.")
+    Job.run(job_id)
+
+    data = Job.get_by_id(job_id).get_data()
+    if data["status"] == "done":
+        click.echo(f"Job {job_id} done: {data['result']}.")
+    elif data["status"] == "failed":
+        raise click.ClickException(f"Job {job_id} failed: {data['error']}")
+    else:
+        click.echo(f"Job {job_id} is {data['status']}.")
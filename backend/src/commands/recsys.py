@@ -0,0 +1,285 @@
+import json
+import random
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from ..exts import neighbor_index, recommendation_cache
+from ..models import User, Rating, Correlation
+from ..recsys import MinHashIndex, RatingsSnapshot, RatingsSnapshotStore, RecMechanism, get_parallel_neighbors, \
+    select_nearest_neighbors
+
+
+recsys_cli = AppGroup("recsys", help="Recommendation system related operations.")
+
+
+@recsys_cli.command("correlations")
+@click.option("--processes", type=int, default=None,
+              help="The number of worker processes, CORRELATIONS_PROCESSES (or the CPU count) by default.")
+@click.option("--block-size", type=int, default=None,
+              help="The number of users per block, CORRELATIONS_BLOCK_SIZE by default.")
+def build_correlations(processes, block_size):
+    """
+    Fills the correlation store with the Spearman's rank correlation coefficients of all users.
+
+    The batch job recalculates the whole store, the users are split into blocks calculated on a pool of worker
+    processes. Later rating changes refresh only the affected user's correlations.
+    """
+    processes, block_size = _get_parallel_options(processes, block_size)
+    stored_count = Correlation.rebuild(Rating.get_snapshot(), processes, block_size)
+
+    click.echo(f"Stored {stored_count} correlations.")
+
+
+@recsys_cli.command("neighbor-index")
+@click.option("--size", type=int, default=None, help="The number of neighbors kept for each user (K).")
+@click.option("--processes", type=int, default=None,
+              help="The number of worker processes, CORRELATIONS_PROCESSES (or the CPU count) by default.")
+@click.option("--block-size", type=int, default=None,
+              help="The number of users per block, CORRELATIONS_BLOCK_SIZE by default.")
+def neighbor_index_metrics(size, processes, block_size):
+    """
+    Indexes the nearest neighbors of all users and prints the index metrics, which help to choose the index size (K)
+    that fits the memory budget (see NEIGHBOR_INDEX_SIZE). The neighbors are calculated like the correlation store.
+    """
+    if size is not None:
+        try:
+            neighbor_index.configure(size, neighbor_index.min_correlation)
+        except ValueError as error:
+            raise click.BadParameter(str(error), param_hint="--size")
+
+    processes, block_size = _get_parallel_options(processes, block_size)
+    all_neighbors = get_parallel_neighbors(Rating.get_snapshot(), processes=processes, block_size=block_size,
+                                           max_neighbors=neighbor_index.max_neighbors,
+                                           min_correlation=neighbor_index.min_correlation)
+
+    for user_id, neighbors in all_neighbors:
+        neighbor_index.put(user_id, dict(neighbors))
+
+    for metric, value in neighbor_index.get_metrics().items():
+        click.echo(f"{metric}: {value}")
+
+
+@recsys_cli.command("publish")
+@click.option("--name", default=None, help="The shared memory block name, RATINGS_SNAPSHOT_NAME by default.")
+def publish_snapshot(name):
+    """
+    Publishes a snapshot of the rating table into shared memory, the worker processes attach it read-only.
+    A previously published snapshot with the same name is replaced, the workers attach the new one on their next
+    request.
+    """
+    name = name or current_app.config["RATINGS_SNAPSHOT_NAME"]
+    if not name:
+        raise click.UsageError("No snapshot name, use --name or set RATINGS_SNAPSHOT_NAME.")
+
+    snapshot = Rating.get_snapshot()
+
+    try:
+        RatingsSnapshot.unpublish(name)
+    except FileNotFoundError:
+        pass
+    snapshot.publish(name)
+
+    click.echo(f"Published {len(snapshot.ratings)} ratings of {len(snapshot.user_ids)} users as '{name}'.")
+
+
+@recsys_cli.command("unpublish")
+@click.option("--name", default=None, help="The shared memory block name, RATINGS_SNAPSHOT_NAME by default.")
+def unpublish_snapshot(name):
+    """
+    Removes the published snapshot from shared memory.
+    """
+    name = name or current_app.config["RATINGS_SNAPSHOT_NAME"]
+    if not name:
+        raise click.UsageError("No snapshot name, use --name or set RATINGS_SNAPSHOT_NAME.")
+
+    try:
+        RatingsSnapshot.unpublish(name)
+    except FileNotFoundError:
+        raise click.ClickException(f"The snapshot '{name}' is not published.")
+
+    click.echo(f"Removed the snapshot '{name}'.")
+
+
+@recsys_cli.command("snapshot")
+@click.option("--dir", "directory", default=None, help="The snapshot directory, RATINGS_SNAPSHOT_DIR by default.")
+@click.option("--keep", type=int, default=2, show_default=True, help="The number of the newest versions to keep.")
+def write_snapshot(directory, keep):
+    """
+    Writes a new version of the ratings snapshot file, which the worker processes memory-map instead of loading
+    the rating table. The running workers switch to the new version on their next request.
+    """
+    directory = directory or current_app.config["RATINGS_SNAPSHOT_DIR"]
+    if not directory:
+        raise click.UsageError("No snapshot directory, use --dir or set RATINGS_SNAPSHOT_DIR.")
+
+    snapshot = Rating.get_snapshot()
+    store = RatingsSnapshotStore(directory)
+    version = store.write(snapshot, keep)
+
+    click.echo(f"Wrote {len(snapshot.ratings)} ratings of {len(snapshot.user_ids)} users to {store.get_path(version)}.")
+
+
+@recsys_cli.command("recommendations")
+@click.argument("user_ids", nargs=-1, type=int)
+@click.option("--all", "all_users", is_flag=True, help="Recommend to all users.")
+@click.option("--processes", type=int, default=None,
+              help="The number of worker processes, RECOMMENDATIONS_BATCH_PROCESSES (or the CPU count) by default.")
+@click.option("--output", type=click.File("w"), default="-", help="The NDJSON output file, stdout by default.")
+def batch_recommendations(user_ids, all_users, processes, output):
+    """
+    Calculates the recommendations of the users in one pass over a ratings snapshot and writes them as NDJSON,
+    one line per user: {"user_id": ..., "recommendations": [...]}.
+    """
+    if all_users == bool(user_ids):
+        raise click.UsageError("Provide either the user IDs or --all.")
+
+    user_ids = User.get_all_ids() if all_users else list(user_ids)
+
+    missing_ids = User.get_missing_ids(user_ids)
+    if missing_ids:
+        raise click.UsageError(f"Users not found: {', '.join(map(str, missing_ids))}.")
+
+    processes = processes or current_app.config["RECOMMENDATIONS_BATCH_PROCESSES"] or None
+
+    for line in User.get_batch_recommendations(user_ids, processes):
+        output.write(json.dumps(line) + "\n")
+
+
+@recsys_cli.command("cache")
+@click.option("--clear", is_flag=True, help="Drop all cached recommendations.")
+def cache_metrics(clear):
+    """
+    Prints the recommendation cache metrics. The entries and the ratings version of the SQLite backend are shared by
+    all processes, the hit, miss, eviction and invalidation counters belong to each process.
+    """
+    if clear:
+        recommendation_cache.clear()
+
+    for metric, value in recommendation_cache.get_metrics().items():
+        click.echo(f"{metric}: {value}")
+
+
+@recsys_cli.command("recall")
+@click.option("--sample", type=int, default=100, show_default=True, help="The number of sampled users.")
+@click.option("--candidates", default="100,300,1000", show_default=True,
+              help="Comma-separated numbers of candidates (RECSYS_CANDIDATES) to evaluate.")
+@click.option("--hashes", type=int, default=None,
+              help="The number of MinHash hashes, RECSYS_MINHASH_HASHES by default.")
+@click.option("--band-size", type=int, default=None,
+              help="The number of hashes per band, RECSYS_MINHASH_BAND_SIZE by default.")
+@click.option("--seed", type=int, default=0, show_default=True, help="The seed of the user sample.")
+@click.option("--output", type=click.File("w"), default=None, help="A JSON file for the report.")
+def recall_report(sample, candidates, hashes, band_size, seed, output):
+    """
+    Reports the recall and the latency of the MinHash candidate generation (see RECSYS_CANDIDATES) against the exact
+    output for a sample of users. The neighbor recall is the share of the exact nearest neighbors (NEIGHBOR_INDEX_SIZE
+    and NEIGHBOR_INDEX_MIN_CORRELATION) matched by the approximate ones, a neighbor tied with the last exact neighbor
+    counts as a match. The recommendation recall is the share of the exact recommendations (RecMechanism) that are
+    recommended with the candidates only. The latency covers the correlation coefficients of one user.
+    """
+    try:
+        candidate_counts = [int(count) for count in candidates.split(",")]
+    except ValueError:
+        raise click.UsageError("The numbers of candidates must be comma-separated integers.")
+
+    snapshot = Rating.get_snapshot()
+    user_ids = snapshot.get_user_ids()
+    user_ids = random.Random(seed).sample(user_ids, min(sample, len(user_ids)))
+    if not user_ids:
+        raise click.ClickException("There are no ratings.")
+
+    started = time.perf_counter()
+    minhash_index = MinHashIndex(snapshot, hashes or current_app.config["RECSYS_MINHASH_HASHES"],
+                                 band_size or current_app.config["RECSYS_MINHASH_BAND_SIZE"])
+    index_ms = (time.perf_counter() - started) * 1000
+    click.echo(f"Indexed {len(snapshot.user_ids)} users in {index_ms:.0f} ms.")
+
+    exact_ms, exact = _get_recall_results(snapshot, user_ids, snapshot.get_correlations)
+    click.echo(f"exact: {exact_ms:.2f} ms per user")
+
+    report = {"users": len(snapshot.user_ids), "sample": len(user_ids), "index_ms": index_ms, "exact_ms": exact_ms,
+              "candidates": []}
+
+    for candidate_count in candidate_counts:
+        approximate_ms, approximate = _get_recall_results(
+            snapshot, user_ids, lambda user_id: minhash_index.get_correlations(user_id, candidate_count))
+
+        expected_neighbors = found_neighbors = expected_movies = found_movies = 0
+        for (neighbors, movie_ids), (approximate_neighbors, approximate_movie_ids) in zip(exact, approximate):
+            expected_neighbors += len(neighbors)
+            if neighbors:
+                found_neighbors += sum(1 for _, correlation in approximate_neighbors[:len(neighbors)]
+                                       if correlation >= neighbors[-1][1])
+            expected_movies += len(movie_ids)
+            found_movies += len(movie_ids & approximate_movie_ids)
+
+        neighbor_recall = found_neighbors / expected_neighbors if expected_neighbors else 1.0
+        recommendation_recall = found_movies / expected_movies if expected_movies else 1.0
+
+        report["candidates"].append({"candidates": candidate_count, "ms": approximate_ms,
+                                     "neighbor_recall": neighbor_recall,
+                                     "recommendation_recall": recommendation_recall})
+        click.echo(f"candidates={candidate_count}: {approximate_ms:.2f} ms per user, "
+                   f"neighbor recall {neighbor_recall:.3f}, recommendation recall {recommendation_recall:.3f}")
+
+    if output is not None:
+        json.dump(report, output, indent=2)
+
+
+def _get_recall_results(snapshot, user_ids, get_correlations):
+    """
+    Calculates the correlation coefficients of the users, selects their nearest neighbors like the neighbor index
+    and calculates their recommendations.
+
+    :param snapshot: The snapshot of the ratings of all users.
+    :type snapshot: RatingsSnapshot
+
+    :param user_ids: The user IDs.
+    :type user_ids: list[int]
+
+    :param get_correlations: The function returning the correlation coefficients of a user.
+    :type get_correlations: callable
+
+    :return: The mean time of the correlation coefficients of a user in milliseconds and, for every user,
+             the list of (neighbor user ID, correlation) tuples and the set of the recommended movie IDs.
+    :rtype: tuple[float, list[tuple[list[tuple[int, float]], set[int]]]]
+    """
+    elapsed = 0
+    results = []
+    for user_id in user_ids:
+        started = time.perf_counter()
+        correlations = get_correlations(user_id)
+        elapsed += time.perf_counter() - started
+
+        neighbors = select_nearest_neighbors(correlations, neighbor_index.max_neighbors,
+                                             neighbor_index.min_correlation)
+        recommendations = RecMechanism(snapshot.get_user(user_id),
+                                       spearman_correlation_coefficients=correlations).get_recommendations()
+        results.append((neighbors, {movie["id"] for movie in recommendations}))
+
+    return elapsed * 1000 / len(user_ids), results
+
+
+def _get_parallel_options(processes, block_size):
+    """
+    Resolves the options of the parallel correlation calculation, the application config is the default.
+
+    :param processes: The number of worker processes from the command line, if provided.
+    :type processes: int or None
+
+    :param block_size: The number of users per block from the command line, if provided.
+    :type block_size: int or None
+
+    :return: The number of worker processes (None for the CPU count) and the block size.
+    :rtype: tuple[int or None, int]
+    """
+    processes = processes or current_app.config["CORRELATIONS_PROCESSES"] or None
+    block_size = block_size or current_app.config["CORRELATIONS_BLOCK_SIZE"]
+
+    if block_size < 1:
+        raise click.UsageError("The block size must be positive.")
+
+    return processes, block_size
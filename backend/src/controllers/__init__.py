@@ -2,3 +2,4 @@ from .auth import AuthController
 from .user import UserController
 from .movies import MoviesController
 from .movie import MovieController
+from .jobs import JobController
@@ -0,0 +1,37 @@
+from ..models import Job
+
+
+class JobController:
+    """
+    JobController class for handling background job related operations.
+
+    :ivar job: Instance of the Job model.
+    """
+
+    def __init__(self, job_id):
+        """
+        Initialize the JobController with a job ID.
+
+        :param job_id: The ID of the job.
+        :type job_id: int
+        """
+        self.job = Job.get_by_id(job_id)
+
+    def get_job(self):
+        """
+        Retrieve the job status.
+
+        :return: None if the job is not found, otherwise a dictionary containing the job data with the following keys:
+                    - id (int): Job ID.
+                    - kind (str): The kind of the job, e.g. "recommendations" or "precompute".
+                    - key (str): The deduplication key.
+                    - status (str): "queued", "running", "done" or "failed".
+                    - payload (dict[str, any]): The arguments of the job.
+                    - result (any): The result of the job, if it is done.
+                    - error (str): The error message, if the job failed.
+                    - created_at (datetime.datetime): The time the job was queued.
+                    - started_at (datetime.datetime): The time the job was started.
+                    - finished_at (datetime.datetime): The time the job was finished.
+        :rtype: dict[str, any] or None
+        """
+        return None if self.job is None else self.job.get_data()
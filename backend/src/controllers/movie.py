@@ -19,7 +19,7 @@ class MovieController:
 
     def get_movie(self):
         """
-        Retrieve movie data.
+        Retrieve movie data with the first page of the movie's comments.
 
         :return: None if the movie is not found, otherwise a dictionary containing movie data with the following keys:
                     - id (int): Movie ID.
@@ -30,10 +30,50 @@ class MovieController:
                     - main_actors (str): Main actors in the movie.
                     - description (str): Movie description.
                     - rating (int): Movie's average rating.
-                    - comments (list[dict[str, any]]): Dictionary of user's comments.
+                    - comment_count (int): The number of comments of the movie.
+                    - comments (list[dict[str, any]]): The first page of user's comments.
+                    - comments_next_cursor (str or None): The cursor of the next page of comments.
         :rtype: dict[str, any] or None
         """
-        return None if self.movie is None else self.movie.get_data()
+        if self.movie is None:
+            return None
+
+        comments_page = Comment.get_page(self.movie.get_id())
+
+        return {**self.movie.get_data(), "comments": comments_page["comments"],
+                "comments_next_cursor": comments_page["next_cursor"]}
+
+    def is_found(self):
+        """
+        Whether the movie exists.
+
+        :return: True if the movie is found, False otherwise.
+        :rtype: bool
+        """
+        return self.movie is not None
+
+    def get_comments(self, limit, cursor=None):
+        """
+        Retrieve a page of the movie's comments, the oldest comment first.
+
+        :param limit: The maximum number of comments of the page.
+        :type limit: int
+
+        :param cursor: The cursor of the page, None for the first page.
+        :type cursor: str or None
+
+        :return: None if the movie is not found or the cursor is invalid, otherwise a dictionary with the page:
+                    - comments (list[dict[str, any]]): The comments (user_id, user_comment).
+                    - next_cursor (str or None): The cursor of the next page, None on the last page.
+        :rtype: dict[str, any] or None
+        """
+        if not self.movie:
+            return None
+
+        try:
+            return Comment.get_page(self.movie.get_id(), limit, cursor)
+        except ValueError:
+            return None
 
     def rate_movie(self, user_id, user_rating):
         """
@@ -45,25 +85,28 @@ class MovieController:
         :param user_rating: The user's rating of the movie.
         :type user_rating: int
 
-        :return: None if the movie is not found, otherwise an updated dictionary containing movie data:
+        :return: None if the movie is not found, otherwise a dictionary built from the movie's rating aggregates,
+                 without reloading the movie's ratings and comments:
                     - id (int): Movie ID.
                     - title (str): Movie title.
-                    - category (str): Movie category.
-                    - country (str): Movie's country.
-                    - year (int): Movie's release year.
-                    - main_actors (str): Main actors in the movie.
-                    - description (str): Movie description.
-                    - rating (int): Movie's average rating.
-                    - comments (list[dict[str, any]]): Dictionary of user's comments.
+                    - rating (float): Movie's average rating after the change.
+                    - rating_count (int): The number of ratings of the movie after the change.
+                    - user_id (int): The ID of the user.
+                    - user_rating (float): The user's rating of the movie.
         :rtype: dict[str, any] or None
         """
         if not self.movie:
             return None
 
-        new_rating = Rating.create(self.movie.get_id(), user_id, user_rating)
-        new_rating.save()
+        movie_id, title = self.movie.get_id(), self.movie.title
+        aggregates = Rating.upsert(movie_id, user_id, user_rating)
+        if aggregates is None:
+            return None
+
+        rating_count, average_rating = aggregates
 
-        return self.movie.get_data()
+        return {"id": movie_id, "title": title, "rating": average_rating, "rating_count": rating_count,
+                "user_id": user_id, "user_rating": user_rating}
 
     def comment_movie(self, user_id, user_comment):
         """
@@ -75,22 +118,22 @@ class MovieController:
         :param user_comment: The user's comment for the movie.
         :type user_comment: str
 
-        :return: None if the movie is not found, otherwise an updated dictionary containing movie data:
+        :return: None if the movie is not found, otherwise a dictionary with the stored comment, without reloading
+                 the movie's ratings and comments:
                     - id (int): Movie ID.
                     - title (str): Movie title.
-                    - category (str): Movie category.
-                    - country (str): Movie's country.
-                    - year (int): Movie's release year.
-                    - main_actors (str): Main actors in the movie.
-                    - description (str): Movie description.
-                    - rating (int): Movie's average rating.
-                    - comments (list[dict[str, any]]): Dictionary of user's comments.
+                    - comment_count (int): The number of comments of the movie after the change.
+                    - user_id (int): The ID of the user.
+                    - user_comment (str): The user's comment for the movie.
         :rtype: dict[str, any] or None
         """
         if not self.movie:
             return None
 
-        new_comment = Comment.create(self.movie.get_id(), user_id, user_comment)
-        new_comment.save()
+        movie_id, title = self.movie.get_id(), self.movie.title
+        comment_count = Comment.upsert(movie_id, user_id, user_comment)
+        if comment_count is None:
+            return None
 
-        return self.movie.get_data()
+        return {"id": movie_id, "title": title, "comment_count": comment_count, "user_id": user_id,
+                "user_comment": user_comment}
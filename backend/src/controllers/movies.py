@@ -1,4 +1,5 @@
-from ..models import Movie
+from ..models import Movie, MovieFacetCount
+from ..models.db_movie_model import MOVIES_PAGE_SIZE, MOVIES_MAX_PAGE_SIZE
 
 
 class MoviesController:
@@ -7,17 +8,111 @@ class MoviesController:
     """
 
     @staticmethod
-    def get_movies():
+    def get_movies(limit, cursor=None):
         """
-        Retrieve all movie data.
+        Retrieve a page of movie data ordered by movie IDs.
 
-        :return: A list of dictionaries containing movie previews:
+        :param limit: The maximum number of movies of the page.
+        :type limit: int
+
+        :param cursor: The cursor of the page, None for the first page.
+        :type cursor: str or None
+
+        :return: A dictionary with the page or None if the cursor is invalid:
+                    - movies (list[dict[str, any]]): Movie previews (id, title, category).
+                    - next_cursor (str or None): The cursor of the next page, None on the last page.
+        :rtype: dict[str, any] or None
+        """
+        try:
+            return Movie.get_page(limit=limit, cursor=cursor)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def search_movies(text, limit, cursor=None):
+        """
+        Retrieve a page of the movies matching the text, the best match first.
+
+        :param text: The searched text.
+        :type text: str
+
+        :param limit: The maximum number of movies of the page.
+        :type limit: int
+
+        :param cursor: The cursor of the page, None for the first page.
+        :type cursor: str or None
+
+        :return: A dictionary with the page or None if the text has no words or the cursor is invalid:
+                    - movies (list[dict[str, any]]): The matching movies (id, title, category, score).
+                    - next_cursor (str or None): The cursor of the next page, None on the last page.
+        :rtype: dict[str, any] or None
+        """
+        try:
+            return Movie.search(text, limit, cursor)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def get_title_matches(prefix, limit):
+        """
+        Retrieve the movies whose title, or a word of the title, starts with the typed prefix, for the typeahead.
+
+        :param prefix: The typed text.
+        :type prefix: str
+
+        :param limit: The maximum number of movies.
+        :type limit: int
+
+        :return: A list of the matching movies (id, title), the titles starting with the prefix first.
+        :rtype: list[dict[str, any]]
+        """
+        return Movie.get_title_matches(prefix, limit)
+
+    @staticmethod
+    def get_all_movies(params=None, filters=None):
+        """
+        Retrieve the data of all movies as a generator, for a streamed response.
+
+        :param params: The parameters for sorting movies, None to order the movies by IDs.
+        :type params: dict or None
+
+        :param filters: The parsed filter parameters, None for all movies.
+        :type filters: dict or None
+
+        :return: A generator of dictionaries containing movie previews:
                     - id (int): Movie ID.
                     - title (str): Movie title.
                     - category (str): Movie category.
-        :rtype: list[dict[str, any]]
+        :rtype: generator[dict[str, any]]
         """
-        return Movie.get_all()
+        return Movie.iter_previews(params, filters)
+
+    @staticmethod
+    def get_page_limit(limit, default=MOVIES_PAGE_SIZE, maximum=MOVIES_MAX_PAGE_SIZE):
+        """
+        Parse the page size QUERY parameter.
+
+        :param limit: The page size parameter, None for the default page size.
+        :type limit: str or None
+
+        :param default: The default page size, the movies page size by default.
+        :type default: int
+
+        :param maximum: The maximum page size, the maximum movies page size by default.
+        :type maximum: int
+
+        :return: The page size or None if it is not a number from 1 to the maximum page size.
+        :rtype: int or None
+        """
+        if limit is None:
+            return default
+
+        try:
+            limit = int(limit)
+        except ValueError:
+            return None
+
+        return limit if 1 <= limit <= maximum else None
 
     @staticmethod
     def validate_sort_parameters(params):
@@ -33,17 +128,47 @@ class MoviesController:
         return Movie.validate_sort_parameters(params)
 
     @staticmethod
-    def get_movies_sorted(params):
+    def parse_filter_parameters(params):
         """
-        Retrieve sorted movie data based on the provided parameters.
+        Validate and convert the provided filter parameters.
+
+        :param params: The parameters for filtering movies (filter_category, filter_country,
+                       filter_year_from, filter_year_to).
+        :type params: dict
+
+        :return: The parsed filter parameters or None if they are invalid.
+        :rtype: dict or None
+        """
+        return Movie.parse_filter_parameters(params)
+
+    @staticmethod
+    def get_movies_sorted(params, limit, cursor=None, filters=None):
+        """
+        Retrieve a page of sorted and filtered movie data based on the provided parameters, with the facet counts.
 
         :param params: The parameters for sorting movies.
         :type params: dict
 
-        :return: A list of dictionaries containing sorted movie previews:
-                    - id (int): Movie ID.
-                    - title (str): Movie title.
-                    - category (str): Movie category.
-        :rtype: list[dict[str, any]]
+        :param limit: The maximum number of movies of the page.
+        :type limit: int
+
+        :param cursor: The cursor of the page, None for the first page. A cursor is valid only for the sort
+                       parameters of the page that returned it.
+        :type cursor: str or None
+
+        :param filters: The parsed filter parameters, None for all movies.
+        :type filters: dict or None
+
+        :return: A dictionary with the page or None if the cursor is invalid:
+                    - movies (list[dict[str, any]]): Sorted movie previews (id, title, category).
+                    - next_cursor (str or None): The cursor of the next page, None on the last page.
+                    - facets (dict[str, list[dict[str, any]]]): The movie counts of the values of every facet
+                      (category, country, year), see MovieFacetCount.get_facet_counts().
+        :rtype: dict[str, any] or None
         """
-        return Movie.sort_all(params)
+        try:
+            movies_page = Movie.get_page(params, limit, cursor, filters)
+        except ValueError:
+            return None
+
+        return {**movies_page, "facets": MovieFacetCount.get_facet_counts(filters)}
@@ -1,3 +1,5 @@
+from flask import current_app
+
 from ..models import User, Movie
 
 
@@ -30,6 +32,17 @@ class UserController:
         """
         return None if not self.user else self.user.get_data()
 
+    def get_ratings(self):
+        """
+        Retrieve all ratings of the user as a generator, for a streamed export.
+
+        :return: None if the user is not found, otherwise a generator of dictionaries, where each dictionary contains:
+                    - movie_id (int): ID of the rated movie.
+                    - movie_rating (float): Rating of the movie.
+        :rtype: generator[dict[str, any]] or None
+        """
+        return None if not self.user else self.user.iter_ratings()
+
     def get_recommendations(self):
         """
         Retrieve movie recommendations for the user.
@@ -51,6 +64,15 @@ class UserController:
 
         return full_recommendations
 
+    def get_refresh_job_id(self):
+        """
+        Retrieve the ID of the background job queued by get_recommendations() to refresh stale recommendations.
+
+        :return: The job ID, None if the recommendations were not stale.
+        :rtype: int or None
+        """
+        return getattr(self.user, "refresh_job_id", None)
+
     def get_predicted_movie_rating(self, movie_id):
         """
         This method retrieves a predicted movie rating for a specified movie ID. If the movie doesn't exist,
@@ -74,3 +96,42 @@ class UserController:
         """
         return None if not self.user or not Movie.get_by_id(movie_id) else \
             self.user.get_predicted_movie_rating_by_movie_id(movie_id)
+
+    def get_predicted_movie_ratings(self, movie_ids):
+        """
+        Retrieve the predicted ratings for many movies at once, see User.get_predicted_movie_ratings_by_movie_ids().
+
+        :param movie_ids: The IDs of the movies for which the predicted ratings are to be retrieved.
+        :type movie_ids: list[int]
+
+        :return: None if the user or any of the movies doesn't exist, otherwise the predicted ratings with
+                 the following keys:
+                    - user_id (int): The user's ID.
+                    - user_predicted_ratings (dict[int, float]): The prediction values, key: movie ID.
+        :rtype: dict[str, any] or None
+        """
+        return None if not self.user or Movie.get_missing_ids(movie_ids) else \
+            self.user.get_predicted_movie_ratings_by_movie_ids(movie_ids)
+
+    @staticmethod
+    def get_batch_recommendations(user_ids):
+        """
+        Retrieve the movie recommendations of many users at once, see User.get_batch_recommendations().
+
+        :param user_ids: The IDs of the users, or "all" for all users.
+        :type user_ids: list[int] or str
+
+        :return: None if any of the users is not found, otherwise a generator of dictionaries with the following keys:
+                    - user_id (int): User ID.
+                    - recommendations (list[dict[str, any]]): The user's raw recommendations (id, similar_user_id,
+                      similar_user_rating, similar_user_correlation).
+        :rtype: generator[dict[str, any]] or None
+        """
+        if user_ids == "all":
+            user_ids = User.get_all_ids()
+        elif User.get_missing_ids(user_ids):
+            return None
+
+        # The batch is calculated in the request thread unless a pool is configured, a pool of one process per CPU
+        # for every request would be forked from the multi-threaded server and take all cores.
+        return User.get_batch_recommendations(user_ids, current_app.config["RECOMMENDATIONS_BATCH_PROCESSES"] or 1)
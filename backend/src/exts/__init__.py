@@ -1,2 +1,3 @@
 from .config import DevConfig, TestConfig
-from .exts import db
+from .exts import db, neighbor_index, candidate_index, shared_snapshot, recommendation_cache, \
+    instrumentation, job_queue, title_index
@@ -13,6 +13,24 @@ class Config:
     JWT_SECRET_KEY = config("JWT_SECRET_KEY")
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=1)
     JWT_ACCESS_TOKEN_LOCATION = ["headers"]
+    NEIGHBOR_INDEX_SIZE = config("NEIGHBOR_INDEX_SIZE", default=50, cast=int)
+    NEIGHBOR_INDEX_MIN_CORRELATION = config("NEIGHBOR_INDEX_MIN_CORRELATION", default=0.7, cast=float)
+    RECSYS_CANDIDATES = config("RECSYS_CANDIDATES", default=0, cast=int)
+    RECSYS_MINHASH_HASHES = config("RECSYS_MINHASH_HASHES", default=32, cast=int)
+    RECSYS_MINHASH_BAND_SIZE = config("RECSYS_MINHASH_BAND_SIZE", default=1, cast=int)
+    RATINGS_SNAPSHOT_NAME = config("RATINGS_SNAPSHOT_NAME", default=None)
+    RATINGS_SNAPSHOT_DIR = config("RATINGS_SNAPSHOT_DIR", default=None)
+    RECOMMENDATION_CACHE_BACKEND = config("RECOMMENDATION_CACHE_BACKEND", default="memory")
+    RECOMMENDATION_CACHE_SIZE = config("RECOMMENDATION_CACHE_SIZE", default=1024, cast=int)
+    RECOMMENDATIONS_BATCH_PROCESSES = config("RECOMMENDATIONS_BATCH_PROCESSES", default=0, cast=int)
+    PREDICTIONS_MAX_MOVIES = config("PREDICTIONS_MAX_MOVIES", default=100, cast=int)
+    CORRELATIONS_PROCESSES = config("CORRELATIONS_PROCESSES", default=0, cast=int)
+    CORRELATIONS_BLOCK_SIZE = config("CORRELATIONS_BLOCK_SIZE", default=64, cast=int)
+    JOB_WORKERS = config("JOB_WORKERS", default=2, cast=int)
+    INSTRUMENTATION_ENABLED = config("INSTRUMENTATION_ENABLED", default=False, cast=bool)
+    PROFILE_SAMPLE_RATE = config("PROFILE_SAMPLE_RATE", default=0, cast=float)
+    PROFILE_SLOW_MS = config("PROFILE_SLOW_MS", default=500, cast=float)
+    PROFILE_DIR = config("PROFILE_DIR", default="profiles")
 
 
 # Development configuration settings with DEV DB.
@@ -1,4 +1,17 @@
 from flask_sqlalchemy import SQLAlchemy
 
+from ..recsys import NeighborIndex, CandidateIndex, SharedRatingsSnapshot, RecommendationCache, RecMechanism
+from .instrumentation import Instrumentation
+from .job_queue import JobQueue
+from .title_index import TitleIndex
+
 
 db = SQLAlchemy()
+neighbor_index = NeighborIndex(required_neighbors=RecMechanism.MAX_NEIGHBORS,
+                               required_min_correlation=RecMechanism.MIN_CORRELATION)
+candidate_index = CandidateIndex()
+shared_snapshot = SharedRatingsSnapshot()
+recommendation_cache = RecommendationCache()
+instrumentation = Instrumentation()
+job_queue = JobQueue()
+title_index = TitleIndex()
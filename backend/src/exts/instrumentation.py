@@ -0,0 +1,329 @@
+import bisect
+import cProfile
+import functools
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+
+
+# The upper bounds of the buckets of the request duration histogram, in seconds.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Instrumentation:
+    """
+    Opt-in per-request instrumentation of the Flask application. When enabled (INSTRUMENTATION_ENABLED), every request
+    records its wall time, the number and the time of its SQL statements (from the SQLAlchemy engine events) and the
+    time spent in the tracked sections, e.g. the recommendation system (see track()). The measurements are sent in
+    the Server-Timing response header and aggregated per endpoint for the /metrics endpoint (Prometheus text format),
+    together with the metrics of the registered sources, e.g. the recommendation cache.
+
+    A sample of the requests (PROFILE_SAMPLE_RATE) is profiled with cProfile and the profiles of the requests slower
+    than PROFILE_SLOW_MS are written to PROFILE_DIR, one pstats file per request (e.g. python -m pstats FILE).
+
+    The Server-Timing header of a streamed response is sent before its body, so it covers only the creation of the
+    response, while the aggregated metrics (and the profile) cover the streaming of the body too, they are recorded
+    when the response is closed. The metrics live in the memory of one process.
+
+    :ivar enabled: Whether the instrumentation is enabled.
+    :type enabled: bool
+
+    :ivar profile_sample_rate: The share of the profiled requests, 0 to 1.
+    :type profile_sample_rate: float
+
+    :ivar profile_slow_ms: The minimum wall time of a request whose profile is written, in milliseconds.
+    :type profile_slow_ms: float
+
+    :ivar profile_dir: The directory of the written profiles.
+    :type profile_dir: str
+
+    :ivar metrics_sources: The registered metrics sources, key: metric name prefix, value: a function returning
+                           a dictionary of metrics (see add_metrics_source()).
+    :type metrics_sources: dict[str, callable]
+
+    Usage:
+    instrumentation = Instrumentation()
+    instrumentation.init_app(app)
+    with instrumentation.track("recsys"):
+        recommendations = rec_mechanism.get_recommendations()
+    """
+
+    def __init__(self):
+        """
+        Initialize a disabled Instrumentation.
+        """
+        self.enabled = False
+        self.profile_sample_rate = 0
+        self.profile_slow_ms = 500
+        self.profile_dir = "profiles"
+        self.metrics_sources = {}
+
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._durations = {}
+        self._sections = {}
+        self._profiles = 0
+
+    def init_app(self, app):
+        """
+        Configures the instrumentation from the Flask application config (INSTRUMENTATION_ENABLED,
+        PROFILE_SAMPLE_RATE, PROFILE_SLOW_MS and PROFILE_DIR). If enabled, the request hooks, the SQLAlchemy engine
+        events and the /metrics endpoint are registered, so the database has to be initialized with the app first.
+
+        :param app: The Flask application.
+        :type app: Flask
+        """
+        self.enabled = app.config.get("INSTRUMENTATION_ENABLED", False)
+        self.profile_sample_rate = app.config.get("PROFILE_SAMPLE_RATE", self.profile_sample_rate)
+        self.profile_slow_ms = app.config.get("PROFILE_SLOW_MS", self.profile_slow_ms)
+        self.profile_dir = app.config.get("PROFILE_DIR", self.profile_dir)
+
+        if not self.enabled:
+            return
+
+        with app.app_context():
+            engine = app.extensions["sqlalchemy"].engine
+
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule("/metrics", "metrics", self._get_metrics_response)
+
+    def add_metrics_source(self, prefix, get_metrics):
+        """
+        Registers a source of metrics for the /metrics endpoint. The numeric values of the returned dictionary are
+        exported as gauges named <prefix>_<key>.
+
+        :param prefix: The prefix of the metric names, e.g. "recommendation_cache".
+        :type prefix: str
+
+        :param get_metrics: The function returning the metrics, e.g. RecommendationCache.get_metrics.
+        :type get_metrics: callable
+        """
+        self.metrics_sources[prefix] = get_metrics
+
+    @contextmanager
+    def track(self, section):
+        """
+        Measures the time spent in a section of the current request, e.g. "recsys". Nested or repeated sections of
+        the same name are added up. Outside a request or if the instrumentation is disabled, nothing is measured.
+
+        :param section: The section name, it becomes the name of the Server-Timing metric.
+        :type section: str
+        """
+        state = g.get("instrumentation") if self.enabled and has_request_context() else None
+        if state is None:
+            yield
+            return
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            state["sections"][section] = state["sections"].get(section, 0) + time.perf_counter() - started
+
+    def _start_request(self):
+        """
+        Starts the measurement of the request, and its profiling if the request is sampled.
+        """
+        profiler = None
+        if self.profile_sample_rate and random.random() < self.profile_sample_rate:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                profiler = None  # Another profiler is active, e.g. in a concurrent request.
+
+        g.instrumentation = {"started": time.perf_counter(), "sql_count": 0, "sql_time": 0, "sections": {},
+                             "profiler": profiler}
+
+    def _finish_request(self, response):
+        """
+        Adds the Server-Timing header and aggregates the measurements of the request. The measurements of a streamed
+        response are aggregated when the response is closed, after its body was streamed within the request context
+        (see create_stream_response()).
+
+        :param response: The response of the request.
+        :type response: Response
+
+        :return: The response with the Server-Timing header.
+        :rtype: Response
+        """
+        state = g.get("instrumentation")
+        if state is None:
+            return response
+
+        duration = time.perf_counter() - state["started"]
+        timings = [f"app;dur={duration * 1000:.2f}",
+                   f'db;dur={state["sql_time"] * 1000:.2f};desc="{state["sql_count"]} queries"']
+        timings += [f"{section};dur={section_time * 1000:.2f}" for section, section_time in state["sections"].items()]
+        response.headers.add("Server-Timing", ", ".join(timings))
+
+        record = functools.partial(self._record_request, state, request.method, request.endpoint or "unknown",
+                                   response.status_code)
+        if response.is_streamed:
+            # The state stays in g, so the SQL statements of the streamed body are counted as well.
+            response.call_on_close(record)
+        else:
+            g.pop("instrumentation")
+            record()
+
+        return response
+
+    def _record_request(self, state, method, endpoint, status_code):
+        """
+        Finishes the measurement of the request and aggregates it, writes the profile of a slow sampled request.
+
+        :param state: The measurements of the request.
+        :type state: dict
+
+        :param method: The HTTP method of the request.
+        :type method: str
+
+        :param endpoint: The endpoint of the request.
+        :type endpoint: str
+
+        :param status_code: The status code of the response.
+        :type status_code: int
+        """
+        duration = time.perf_counter() - state["started"]
+        if state["profiler"] is not None:
+            state["profiler"].disable()
+            if duration * 1000 >= self.profile_slow_ms:
+                self._write_profile(state["profiler"], duration, endpoint)
+
+        with self._lock:
+            key = (method, endpoint, status_code)
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+            durations = self._durations.setdefault(endpoint, {"buckets": [0] * len(DURATION_BUCKETS), "sum": 0,
+                                                              "count": 0, "sql_count": 0, "sql_time": 0})
+            bucket = bisect.bisect_left(DURATION_BUCKETS, duration)
+            if bucket < len(DURATION_BUCKETS):
+                durations["buckets"][bucket] += 1
+            durations["sum"] += duration
+            durations["count"] += 1
+            durations["sql_count"] += state["sql_count"]
+            durations["sql_time"] += state["sql_time"]
+
+            for section, section_time in state["sections"].items():
+                self._sections[(endpoint, section)] = self._sections.get((endpoint, section), 0) + section_time
+
+    @staticmethod
+    def _teardown_request(error=None):
+        """
+        Stops the profiler of a request that failed before its response was finished. The request context of
+        a streamed response is torn down after its body was streamed, before the response is closed.
+
+        :param error: The unhandled exception of the request, if any.
+        :type error: Exception or None
+        """
+        state = g.pop("instrumentation", None)
+        if state is not None and state["profiler"] is not None:
+            state["profiler"].disable()
+
+    def _write_profile(self, profiler, duration, endpoint):
+        """
+        Writes the profile of a slow request to the profile directory.
+
+        :param profiler: The profiler of the request.
+        :type profiler: cProfile.Profile
+
+        :param duration: The wall time of the request, in seconds.
+        :type duration: float
+
+        :param endpoint: The endpoint of the request.
+        :type endpoint: str
+        """
+        os.makedirs(self.profile_dir, exist_ok=True)
+
+        endpoint = re.sub(r"[^A-Za-z0-9_.-]", "_", endpoint)
+        file_name = f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint}-{duration * 1000:.0f}ms-{uuid.uuid4().hex[:8]}.prof"
+        profiler.dump_stats(os.path.join(self.profile_dir, file_name))
+
+        with self._lock:
+            self._profiles += 1
+
+    def _get_metrics_response(self):
+        """
+        Returns the metrics in the Prometheus text format.
+
+        :return: The metrics response.
+        :rtype: Response
+        """
+        with self._lock:
+            requests, sections = dict(self._requests), dict(self._sections)
+            durations = {endpoint: {**values, "buckets": list(values["buckets"])}
+                         for endpoint, values in self._durations.items()}
+            profiles = self._profiles
+
+        lines = ["# HELP http_requests_total The number of handled requests.", "# TYPE http_requests_total counter"]
+        lines += [f'http_requests_total{{method="{method}",endpoint="{endpoint}",status="{status}"}} {count}'
+                  for (method, endpoint, status), count in sorted(requests.items())]
+
+        lines += ["# HELP http_request_duration_seconds The wall time of the requests.",
+                  "# TYPE http_request_duration_seconds histogram"]
+        for endpoint, values in sorted(durations.items()):
+            cumulative = 0
+            for upper_bound, count in zip(DURATION_BUCKETS, values["buckets"]):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{upper_bound}"}} '
+                             f'{cumulative}')
+            lines += [f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {values["count"]}',
+                      f'http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {values["sum"]}',
+                      f'http_request_duration_seconds_count{{endpoint="{endpoint}"}} {values["count"]}']
+
+        lines += ["# HELP db_queries_total The number of SQL statements executed by the requests.",
+                  "# TYPE db_queries_total counter"]
+        lines += [f'db_queries_total{{endpoint="{endpoint}"}} {values["sql_count"]}'
+                  for endpoint, values in sorted(durations.items())]
+        lines += ["# HELP db_query_duration_seconds_total The time of the SQL statements executed by the requests.",
+                  "# TYPE db_query_duration_seconds_total counter"]
+        lines += [f'db_query_duration_seconds_total{{endpoint="{endpoint}"}} {values["sql_time"]}'
+                  for endpoint, values in sorted(durations.items())]
+
+        lines += ["# HELP section_duration_seconds_total The time spent in the tracked sections, e.g. recsys.",
+                  "# TYPE section_duration_seconds_total counter"]
+        lines += [f'section_duration_seconds_total{{endpoint="{endpoint}",section="{section}"}} {section_time}'
+                  for (endpoint, section), section_time in sorted(sections.items())]
+
+        lines += ["# HELP profiles_written_total The number of written profiles of slow requests.",
+                  "# TYPE profiles_written_total counter", f"profiles_written_total {profiles}"]
+
+        for prefix, get_metrics in self.metrics_sources.items():
+            for key, value in get_metrics().items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines += [f"# TYPE {prefix}_{key} gauge", f"{prefix}_{key} {value}"]
+
+        return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """
+    Starts the measurement of an SQL statement of a request (SQLAlchemy engine event).
+    """
+    if has_request_context() and "instrumentation" in g:
+        conn.info.setdefault("instrumentation_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """
+    Finishes the measurement of an SQL statement of a request (SQLAlchemy engine event).
+    """
+    started = conn.info.get("instrumentation_started")
+    if not started or not has_request_context() or "instrumentation" not in g:
+        return
+
+    state = g.instrumentation
+    state["sql_count"] += 1
+    state["sql_time"] += time.perf_counter() - started.pop()
@@ -0,0 +1,91 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueue:
+    """
+    The in-process worker pool of the background jobs, e.g. the refresh of stale recommendations, so the request
+    thread does not wait for them. The jobs themselves are rows of the job table (see the Job model), which records
+    their status, so no external broker is needed: a job submitted to the pool is run by a worker thread inside
+    an application context, a job that was not submitted (e.g. queued by a command, or with JOB_WORKERS=0) stays
+    queued until flask jobs run processes it.
+
+    :ivar workers: The number of worker threads, the pool is disabled if 0.
+    :type workers: int
+
+    Usage:
+    job_queue = JobQueue()
+    job_queue.init_app(app)
+    job_queue.submit(Job.run, job_id)
+    """
+
+    def __init__(self, workers=0):
+        """
+        Initialize the JobQueue, the worker threads are started on the first submitted job.
+
+        :param workers: The number of worker threads, the pool is disabled if 0.
+        :type workers: int
+        """
+        self.workers = workers
+
+        self._app = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        Configures the pool from the Flask application config (JOB_WORKERS).
+
+        :param app: The Flask application.
+        :type app: Flask
+        """
+        self.workers = app.config.get("JOB_WORKERS", self.workers)
+        self._app = app
+
+    def is_enabled(self):
+        """
+        Whether the jobs are run by the worker pool of this process.
+
+        :return: True if the pool has at least one worker thread.
+        :rtype: bool
+        """
+        return self.workers > 0 and self._app is not None
+
+    def submit(self, function, *args):
+        """
+        Runs the function in a worker thread, inside an application context.
+
+        :param function: The function, e.g. Job.run.
+        :type function: callable
+
+        :param args: The arguments of the function, e.g. the job ID.
+
+        :return: True if the function was submitted, False if the pool is disabled.
+        :rtype: bool
+        """
+        if not self.is_enabled():
+            return False
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="job")
+
+        self._executor.submit(self._run, function, args)
+
+        return True
+
+    def _run(self, function, args):
+        """
+        Runs the function of a worker thread inside an application context.
+
+        :param function: The submitted function.
+        :type function: callable
+
+        :param args: The arguments of the function.
+        :type args: tuple
+        """
+        with self._app.app_context():
+            try:
+                function(*args)
+            except Exception:
+                self._app.logger.exception("A background job failed.")
@@ -0,0 +1,301 @@
+import bisect
+import re
+import threading
+import unicodedata
+
+
+# The characters between the words of a normalized title.
+SEPARATOR_PATTERN = re.compile(r"[\W_]+")
+
+
+class TitleIndex:
+    """
+    An in-process index of the movie titles for the typeahead (prefix) search, so a keystroke does not query the
+    database. The titles are normalized (case, diacritics and punctuation, see normalize_title()) and kept in sorted
+    lists, a prefix is found by a binary search: the titles starting with the prefix come first, then the titles with
+    a later word starting with it (e.g. "pot" matches "Harry Potter and the Goblet of Fire"), each in the alphabetical
+    order.
+
+    The index is loaded from the database on the first lookup (see load()) and updated incrementally when a movie is
+    saved or deleted (see Movie.save() and Movie.delete()). The index lives in the memory of one process and follows
+    a version of the titles shared by all processes (see sync()), so it is loaded again after the movies were changed
+    by another process (e.g. flask import).
+
+    :ivar titles: A dictionary, key: movie ID, value: a (normalized title, title) tuple.
+    :type titles: dict[int, tuple[str, str]]
+
+    :ivar version: The version of the titles the index follows, None before the first sync().
+    :type version: int or None
+
+    :ivar hits: The number of lookups.
+    :type hits: int
+
+    :ivar loads: The number of loads from the database.
+    :type loads: int
+
+    Usage:
+    title_index = TitleIndex()
+    title_index.sync(Counter.get(TITLES_VERSION))
+    if not title_index.is_loaded():
+        title_index.load(db.session.query(Movie.id, Movie.title))
+    matches = title_index.get_matches("harry pot", limit=10)
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty TitleIndex, it is loaded on the first lookup.
+        """
+        self.titles = {}
+        self.version = None
+        self.hits = 0
+        self.loads = 0
+
+        self._loaded = False
+        self._title_keys = []
+        self._word_keys = []
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        """
+        The number of movies in the index.
+
+        :return: The number of indexed movies.
+        :rtype: int
+        """
+        return len(self.titles)
+
+    def init_app(self, app):
+        """
+        Drops the entries of a previous application, the index is loaded from the database of this one.
+
+        :param app: The Flask application.
+        :type app: Flask
+        """
+        self.clear()
+
+    def is_loaded(self):
+        """
+        Whether the index holds the titles of the database.
+
+        :return: True if the index was loaded.
+        :rtype: bool
+        """
+        return self._loaded
+
+    def sync(self, version):
+        """
+        Follows the version of the titles shared by all processes, e.g. a counter in the database, which is
+        incremented whenever a movie is saved, deleted or imported in any process. The entries are dropped if
+        the version has changed since they were loaded, the index is loaded again on the next lookup. The version has
+        to be read before the titles are loaded.
+
+        :param version: The current version of the titles.
+        :type version: int
+        """
+        with self._lock:
+            if version != self.version:
+                self._drop()
+                self.version = version
+
+    def load(self, movies):
+        """
+        Replaces the entries with the titles of all movies.
+
+        :param movies: The (movie ID, title) pairs of all movies, e.g. the rows of a query.
+        :type movies: iterable[tuple[int, str]]
+        """
+        with self._lock:
+            self.titles = {movie_id: (normalize_title(title), title) for movie_id, title in movies}
+            self._title_keys = sorted((words, movie_id) for movie_id, (words, _) in self.titles.items())
+            self._word_keys = sorted(entry for movie_id, (words, _) in self.titles.items()
+                                     for entry in _get_word_entries(movie_id, words))
+            self._loaded = True
+            self.loads += 1
+
+    def put(self, movie_id, title, version=None):
+        """
+        Indexes the title of a new or changed movie. Nothing is done before the index is loaded, because the load
+        reads the title from the database.
+
+        :param movie_id: The movie ID.
+        :type movie_id: int
+
+        :param title: The title of the movie.
+        :type title: str
+
+        :param version: The version of the titles after the change (see sync()). If the index missed a change made
+                        by another process, i.e. it was not at the previous version, the entries are dropped instead.
+                        Optional.
+        :type version: int or None
+        """
+        with self._lock:
+            if not self._advance(version) or not self._loaded:
+                return
+
+            self.remove(movie_id)
+
+            words = normalize_title(title)
+            self.titles[movie_id] = (words, title)
+            bisect.insort(self._title_keys, (words, movie_id))
+            for entry in _get_word_entries(movie_id, words):
+                bisect.insort(self._word_keys, entry)
+
+    def remove(self, movie_id, version=None):
+        """
+        Drops the title of a deleted movie.
+
+        :param movie_id: The movie ID.
+        :type movie_id: int
+
+        :param version: The version of the titles after the change, as in put(). Optional.
+        :type version: int or None
+        """
+        with self._lock:
+            if not self._advance(version):
+                return
+
+            words, _ = self.titles.pop(movie_id, (None, None))
+            if words is None:
+                return
+
+            _remove_entry(self._title_keys, (words, movie_id))
+            for entry in _get_word_entries(movie_id, words):
+                _remove_entry(self._word_keys, entry)
+
+    def get_matches(self, prefix, limit):
+        """
+        Looks up the movies whose title, or a word of it, starts with the prefix. The titles starting with the prefix
+        come first.
+
+        :param prefix: The typed text, normalized like the titles, its last word may be incomplete.
+        :type prefix: str
+
+        :param limit: The maximum number of matches.
+        :type limit: int
+
+        :return: A list of (movie ID, title) tuples, empty if the prefix has no letters or digits.
+        :rtype: list[tuple[int, str]]
+        """
+        key = normalize_title(prefix)
+        if not key:
+            return []
+
+        with self._lock:
+            self.hits += 1
+            movie_ids = []
+
+            for keys in (self._title_keys, self._word_keys):
+                for index in range(bisect.bisect_left(keys, (key,)), len(keys)):
+                    if len(movie_ids) >= limit or not keys[index][0].startswith(key):
+                        break
+                    if keys[index][1] not in movie_ids:
+                        movie_ids.append(keys[index][1])
+
+            return [(movie_id, self.titles[movie_id][1]) for movie_id in movie_ids]
+
+    def clear(self):
+        """
+        Drops all entries and the version, the index is loaded again on the next lookup.
+        """
+        with self._lock:
+            self._drop()
+            self.version = None
+            self.hits = 0
+            self.loads = 0
+
+    def _drop(self):
+        """
+        Drops all entries, the index is loaded again on the next lookup.
+        """
+        self.titles = {}
+        self._loaded = False
+        self._title_keys = []
+        self._word_keys = []
+
+    def _advance(self, version):
+        """
+        Moves the index to the version of the titles after a change made by this process.
+
+        :param version: The version after the change, None if the version is not followed.
+        :type version: int or None
+
+        :return: False if the index missed a change of another process, its entries are dropped then.
+        :rtype: bool
+        """
+        if version is None:
+            return True
+
+        if self.version != version - 1:
+            self.sync(version)
+            return False
+
+        self.version = version
+        return True
+
+    def get_metrics(self):
+        """
+        Returns the index metrics.
+
+        :return: A dictionary with the following keys:
+                    - movies (int): The number of indexed movies.
+                    - version (int or None): The version of the titles.
+                    - entries (int): The number of sorted entries (titles and later words).
+                    - hits (int): The number of lookups.
+                    - loads (int): The number of loads from the database.
+        :rtype: dict[str, any]
+        """
+        return {
+            "movies": len(self.titles),
+            "version": self.version,
+            "entries": len(self._title_keys) + len(self._word_keys),
+            "hits": self.hits,
+            "loads": self.loads
+        }
+
+
+def normalize_title(title):
+    """
+    Normalizes a title for the prefix search: the diacritics are removed, the case is folded and the words are
+    separated by single spaces, e.g. "  Amélie: Le Fabuleux Destin" becomes "amelie le fabuleux destin".
+
+    :param title: The title or the typed text.
+    :type title: str or None
+
+    :return: The normalized title.
+    :rtype: str
+    """
+    decomposed = unicodedata.normalize("NFKD", title or "")
+    stripped = "".join(character for character in decomposed if not unicodedata.combining(character))
+
+    return SEPARATOR_PATTERN.sub(" ", stripped.casefold()).strip()
+
+
+def _get_word_entries(movie_id, words):
+    """
+    Returns the entries of the later words of a normalized title: the title from the second, the third, ... word on.
+
+    :param movie_id: The movie ID.
+    :type movie_id: int
+
+    :param words: The normalized title.
+    :type words: str
+
+    :return: A list of (normalized title suffix, movie ID) tuples.
+    :rtype: list[tuple[str, int]]
+    """
+    return [(words[match.end():], movie_id) for match in re.finditer(" ", words)]
+
+
+def _remove_entry(keys, entry):
+    """
+    Removes an entry from a sorted list of entries, if it is there.
+
+    :param keys: The sorted entries.
+    :type keys: list[tuple[str, int]]
+
+    :param entry: The removed entry.
+    :type entry: tuple[str, int]
+    """
+    index = bisect.bisect_left(keys, entry)
+    if index < len(keys) and keys[index] == entry:
+        del keys[index]
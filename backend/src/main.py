@@ -4,9 +4,11 @@ from flask_cors import CORS
 from flask_restx import Api
 from flask_migrate import Migrate
 
-from .exts import db
-from .models import User, Movie, Comment, Rating
-from .routes import auth_namespace, user_namespace, movies_namespace
+from .exts import db, neighbor_index, candidate_index, shared_snapshot, recommendation_cache, instrumentation, \
+    job_queue, title_index
+from .models import User, Movie, MovieFacetCount, Comment, Rating, Correlation, ImportProgress, Job, Counter
+from .routes import auth_namespace, user_namespace, movies_namespace, jobs_namespace
+from .commands import recsys_cli, import_cli, jobs_cli
 
 
 def create_app(config):
@@ -24,6 +26,19 @@ def create_app(config):
     app.config.from_object(config)  # Load configurations from the config object.
 
     db.init_app(app)  # Initialize the database with the app.
+    neighbor_index.init_app(app)  # Configure the in-process neighbor index.
+    candidate_index.init_app(app)  # Configure the MinHash candidate generation of the nearest neighbors.
+    shared_snapshot.init_app(app)  # Configure the ratings snapshot shared by the worker processes.
+    recommendation_cache.init_app(app)  # Configure the recommendation cache.
+    job_queue.init_app(app)  # Configure the in-process worker pool of the background jobs.
+    title_index.init_app(app)  # Reset the in-process title index of the typeahead.
+    Job.register_handler("recommendations", User.refresh_recommendations_by_id)
+    Job.register_handler("precompute", User.precompute_recommendations)
+    Job.register_handler("correlations", Rating.refresh_correlations_by_user_id)
+    instrumentation.init_app(app)  # Enable the opt-in request instrumentation and the /metrics endpoint.
+    instrumentation.add_metrics_source("recommendation_cache", recommendation_cache.get_metrics)
+    instrumentation.add_metrics_source("neighbor_index", neighbor_index.get_metrics)
+    instrumentation.add_metrics_source("title_index", title_index.get_metrics)
     Migrate(app, db)  # Enable database migration features.
     CORS(app, supports_credentials=True, origins=["http://localhost:3000", "http://127.0.0.1:3000"])
     JWTManager(app)  # Initialize the JWT Manager.
@@ -33,6 +48,11 @@ def create_app(config):
     api.add_namespace(auth_namespace)
     api.add_namespace(user_namespace)
     api.add_namespace(movies_namespace)
+    api.add_namespace(jobs_namespace)
+
+    app.cli.add_command(recsys_cli)  # Add the recommendation system CLI commands (flask recsys ...).
+    app.cli.add_command(import_cli)  # Add the bulk import CLI commands (flask import ...).
+    app.cli.add_command(jobs_cli)  # Add the background job CLI commands (flask jobs ...).
 
     @app.shell_context_processor
     def make_shell_context():
@@ -43,6 +63,8 @@ def create_app(config):
         :return: A dictionary with the database instance and models.
         :rtype: dict
         """
-        return {"db": db, "User": User, "Movie": Movie, "Comment": Comment, "Rating": Rating}
+        return {"db": db, "User": User, "Movie": Movie, "MovieFacetCount": MovieFacetCount, "Comment": Comment,
+                "Rating": Rating, "Correlation": Correlation, "ImportProgress": ImportProgress, "Job": Job,
+                "Counter": Counter}
 
     return app
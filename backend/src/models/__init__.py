@@ -1,6 +1,16 @@
 from .db_movie_model import Movie
+from .db_movie_facet_model import MovieFacetCount
 from .db_user_model import User
 from .db_rating_model import Rating
 from .db_comment_model import Comment
+from .db_correlation_model import Correlation
+from .db_import_progress_model import ImportProgress
+from .db_job_model import Job
+from .db_counter_model import Counter
+from . import search_index  # Registers the full-text search index with the comment table.
 from .serialization_models import create_login_model, create_user_model, create_movie_model, create_preview_model, \
-    create_rating_model, create_comment_model, create_recommendation_model, create_prediction_model
+    create_rating_model, create_comment_model, create_recommendation_model, create_prediction_model, \
+    create_batch_recommendations_model, create_predictions_model, create_predictions_request_model, \
+    create_preview_page_model, create_job_model, create_movie_rating_model, create_movie_comment_model, \
+    create_comment_page_model, create_search_result_model, create_search_page_model, \
+    create_title_match_model, create_facet_count_model, create_facets_model, create_sorted_page_model
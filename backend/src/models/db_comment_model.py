@@ -1,4 +1,15 @@
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
 from ..exts import db
+from .db_movie_model import Movie, encode_cursor, decode_cursor
+
+
+# The default and the maximum number of comments per page, see Comment.get_page().
+COMMENTS_PAGE_SIZE = 20
+COMMENTS_MAX_PAGE_SIZE = 100
+
+# The sort order of the comment pages, the oldest comment first.
+COMMENTS_SORT_COLUMNS = [("id", "asc")]
 
 
 class Comment(db.Model):
@@ -17,6 +28,11 @@ class Comment(db.Model):
     :ivar comment: The text of the comment made by the user.
     :type comment: str
     """
+    # A user comments a movie at most once, the unique index is the conflict target of upsert().
+    # The comments of a movie are paginated by their IDs (see get_page()).
+    __table_args__ = (db.Index("ux_comment_user_id_movie_id", "user_id", "movie_id", unique=True),
+                      db.Index("ix_comment_movie_id_id", "movie_id", "id"))
+
     id = db.Column(db.Integer, primary_key=True)
     movie_id = db.Column(db.Integer, db.ForeignKey("movie.id"), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -33,15 +49,22 @@ class Comment(db.Model):
 
     def save(self):
         """
-        Save the current instance of Comment to the database.
+        Save the current instance of Comment to the database. The movie's comment count is updated in the same
+        transaction.
         """
+        if not db.inspect(self).persistent:
+            Movie.update_comment_count(self.movie_id, 1)
+
         db.session.add(self)
         db.session.commit()
 
     def delete(self):
         """
-        Delete the current instance of Comment from the database.
+        Delete the current instance of Comment from the database. The movie's comment count is updated in the same
+        transaction.
         """
+        Movie.update_comment_count(self.movie_id, -1)
+
         db.session.delete(self)
         db.session.commit()
 
@@ -97,3 +120,71 @@ class Comment(db.Model):
             return comment_update
 
         return Comment(movie_id=movie_id, user_id=user_id, comment=comment)
+
+    @staticmethod
+    def upsert(movie_id, user_id, comment):
+        """
+        Stores the comment of the movie by the user with a single INSERT ... ON CONFLICT(user_id, movie_id) statement
+        and commits it, an existing comment of the movie by the user is updated, as in create(). The movie's comment
+        count is incremented in the same transaction, unless the comment exists.
+
+        :param movie_id: Identifier for the movie that the comment pertains to.
+        :type movie_id: int
+
+        :param user_id: Identifier for the user who made the comment.
+        :type user_id: int
+
+        :param comment: The text of the comment made by the user.
+        :type comment: str
+
+        :return: The number of comments of the movie after the change, None if the movie does not exist (nothing is
+                 stored then).
+        :rtype: int or None
+        """
+        exists = db.exists().where(Comment.user_id == user_id, Comment.movie_id == movie_id)
+        comment_count = Movie.update_comment_count(movie_id, db.case((exists, 0), else_=1))
+        if comment_count is None:
+            db.session.rollback()
+            return None
+
+        statement = sqlite_insert(Comment).values(movie_id=movie_id, user_id=user_id, comment=comment)
+        db.session.execute(statement.on_conflict_do_update(index_elements=["user_id", "movie_id"],
+                                                           set_={"comment": statement.excluded.comment}))
+        db.session.commit()
+
+        return comment_count
+
+    @staticmethod
+    def get_page(movie_id, limit=COMMENTS_PAGE_SIZE, cursor=None):
+        """
+        Returns a page of the comments of the movie with keyset pagination, the oldest comment first. A page continues
+        after the last comment of the previous page, which its cursor identifies, so with the (movie_id, id) index
+        the cost of a page depends neither on its position nor on the number of comments of the movie.
+
+        :param movie_id: The ID of the movie.
+        :type movie_id: int
+
+        :param limit: The maximum number of comments of the page.
+        :type limit: int
+
+        :param cursor: The next_cursor of the previous page, None for the first page.
+        :type cursor: str or None
+
+        :return: Dictionary, the page with the following keys:
+                    - comments (list[dict[str, any]]): The comments, each with the user_id and the user_comment.
+                    - next_cursor (str or None): The cursor of the next page, None on the last page.
+        :rtype: dict[str, any]
+
+        :raises ValueError: If the cursor is invalid.
+        """
+        query = db.session.query(Comment.id, Comment.user_id, Comment.comment).filter(Comment.movie_id == movie_id)
+        if cursor is not None:
+            last_id, = decode_cursor(cursor, COMMENTS_SORT_COLUMNS)
+            query = query.filter(Comment.id > last_id)
+
+        rows = query.order_by(Comment.id).limit(limit + 1).all()
+
+        return {
+            "comments": [{"user_id": row.user_id, "user_comment": row.comment} for row in rows[:limit]],
+            "next_cursor": encode_cursor(COMMENTS_SORT_COLUMNS, [rows[limit - 1].id]) if len(rows) > limit else None
+        }
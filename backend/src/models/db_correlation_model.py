@@ -0,0 +1,149 @@
+from ..exts import db
+from ..recsys import RecMechanism, get_parallel_neighbors
+from .db_counter_model import Counter, NEIGHBORS_VERSION
+
+
+# The number of correlation rows inserted at once by the batch job.
+INSERT_BATCH_SIZE = 10000
+
+
+class Correlation(db.Model):
+    """
+    The Correlation class is a database model that represents a precomputed Spearman's rank correlation coefficient
+    between two users. It is a materialized store of the coefficients, so the recommendation mechanism does not have
+    to recalculate them on every request.
+
+    Only the coefficients not lower than RecMechanism.MIN_CORRELATION are stored, because the lower ones are never
+    used. Every pair of users is stored in both directions, so reading the neighbors of a user is one indexed query,
+    which does not depend on the total user count.
+
+    :ivar id: Unique identifier for each correlation.
+    :type id: int
+
+    :ivar target_user_id: Identifier for the user whose neighbor is stored.
+    :type target_user_id: int
+
+    :ivar another_user_id: Identifier for the neighboring user.
+    :type another_user_id: int
+
+    :ivar correlation: The Spearman's rank correlation coefficient between the two users.
+    :type correlation: float
+    """
+    __table_args__ = (db.Index("ix_correlation_target_user_id_another_user_id", "target_user_id", "another_user_id"),
+                      db.Index("ix_correlation_another_user_id", "another_user_id"))
+
+    id = db.Column(db.Integer, primary_key=True)
+    target_user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    another_user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    correlation = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        """
+        String representation of the Correlation instance.
+
+        :return: String representing the correlation.
+        :rtype: correlation
+        """
+        return f"<Correlation-{self.target_user_id}-{self.another_user_id}>"
+
+    @staticmethod
+    def is_filled():
+        """
+        Checks whether the correlation store was filled by the batch job (see Correlation.rebuild()).
+        An empty store means that the correlation coefficients have to be calculated on request.
+
+        :return: True if at least one correlation is stored, False otherwise.
+        :rtype: bool
+        """
+        return db.session.query(Correlation.id).first() is not None
+
+    @staticmethod
+    def get_by_target_user_id(target_user_id):
+        """
+        Returns the stored correlation coefficients between the target user and his neighbors.
+
+        :param target_user_id: The target user ID.
+        :type target_user_id: int
+
+        :return: A dictionary ordered by the neighbor user IDs, key: neighbor user ID, value: correlation coefficient.
+        :rtype: dict[int, float]
+        """
+        rows = db.session.query(Correlation.another_user_id, Correlation.correlation) \
+            .filter(Correlation.target_user_id == target_user_id) \
+            .order_by(Correlation.another_user_id) \
+            .all()
+
+        return {another_user_id: correlation for another_user_id, correlation in rows}
+
+    @staticmethod
+    def rebuild(snapshot, processes=None, block_size=64):
+        """
+        The batch job, which replaces the whole correlation store with freshly calculated coefficients.
+        The coefficients are calculated in blocks of users on a pool of worker processes (see
+        get_parallel_neighbors()) and inserted block by block, in one transaction.
+
+        :param snapshot: The snapshot of the ratings of all users.
+        :type snapshot: RatingsSnapshot
+
+        :param processes: The number of worker processes, the number of CPUs if None.
+        :type processes: int or None
+
+        :param block_size: The number of users of a block.
+        :type block_size: int
+
+        :return: The number of stored correlations.
+        :rtype: int
+        """
+        db.session.query(Correlation).delete()
+
+        stored_count = 0
+        rows = []
+        for user_id, neighbors in get_parallel_neighbors(snapshot, processes=processes, block_size=block_size,
+                                                         min_correlation=RecMechanism.MIN_CORRELATION):
+            rows.extend({"target_user_id": user_id, "another_user_id": another_user_id, "correlation": correlation}
+                        for another_user_id, correlation in neighbors)
+
+            if len(rows) >= INSERT_BATCH_SIZE:
+                db.session.execute(db.insert(Correlation), rows)
+                stored_count += len(rows)
+                rows = []
+
+        if rows:
+            db.session.execute(db.insert(Correlation), rows)
+            stored_count += len(rows)
+        db.session.commit()
+
+        # The neighbor indexes of all processes are dropped.
+        Counter.increment(NEIGHBORS_VERSION)
+
+        return stored_count
+
+    @staticmethod
+    def refresh_user(user_id, correlations):
+        """
+        Replaces the row and the column of the correlation store belonging to the user, whose ratings have changed.
+        Nothing is done while the store is empty, the coefficients are calculated on request then.
+
+        :param user_id: The ID of the user whose ratings have changed.
+        :type user_id: int
+
+        :param correlations: The user's recalculated correlation coefficients, key: user ID,
+                             value: correlation coefficient.
+        :type correlations: dict[int, float]
+        """
+        if not Correlation.is_filled():
+            return
+
+        rows = []
+        for another_user_id, correlation in correlations.items():
+            if correlation >= RecMechanism.MIN_CORRELATION:
+                rows.append({"target_user_id": user_id, "another_user_id": another_user_id,
+                             "correlation": correlation})
+                rows.append({"target_user_id": another_user_id, "another_user_id": user_id,
+                             "correlation": correlation})
+
+        Correlation.query.filter(db.or_(Correlation.target_user_id == user_id,
+                                        Correlation.another_user_id == user_id)).delete()
+        if rows:
+            db.session.execute(db.insert(Correlation), rows)
+        db.session.commit()
@@ -0,0 +1,72 @@
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from ..exts import db
+
+
+# The counter of the refreshed correlation coefficients, the neighbor index of every process follows it.
+NEIGHBORS_VERSION = "neighbors_version"
+
+# The counter of the movie title changes, the typeahead title index of every process follows it.
+TITLES_VERSION = "titles_version"
+
+
+class Counter(db.Model):
+    """
+    The Counter class is a database model that represents a named counter shared by all processes, e.g. the version
+    of the users' neighbors, which the in-process neighbor index of every worker process compares with its own.
+
+    :ivar name: The name of the counter, e.g. NEIGHBORS_VERSION.
+    :type name: str
+
+    :ivar value: The value of the counter.
+    :type value: int
+    """
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        """
+        String representation of the Counter instance.
+
+        :return: String representing the counter.
+        :rtype: counter
+        """
+        return f"<Counter-{self.name}-{self.value}>"
+
+    @staticmethod
+    def get(name):
+        """
+        Returns the value of the counter.
+
+        :param name: The name of the counter.
+        :type name: str
+
+        :return: The value, 0 if the counter was never incremented.
+        :rtype: int
+        """
+        value = db.session.query(Counter.value).filter(Counter.name == name).scalar()
+
+        return value or 0
+
+    @staticmethod
+    def increment(name, commit=True):
+        """
+        Increments the counter with a single INSERT ... ON CONFLICT(name) statement and commits it.
+
+        :param name: The name of the counter.
+        :type name: str
+
+        :param commit: Whether to commit, False to leave the increment to the caller's transaction.
+        :type commit: bool
+
+        :return: The new value.
+        :rtype: int
+        """
+        statement = sqlite_insert(Counter).values(name=name, value=1)
+        value = db.session.execute(statement.on_conflict_do_update(index_elements=["name"],
+                                                                   set_={"value": Counter.value + 1})
+                                   .returning(Counter.value)).scalar_one()
+        if commit:
+            db.session.commit()
+
+        return value
@@ -0,0 +1,74 @@
+from ..exts import db
+
+
+class ImportProgress(db.Model):
+    """
+    The ImportProgress class is a database model that represents the progress of a bulk import of one input file
+    (see flask import). It is updated in the same transaction as every imported chunk, so an import interrupted by
+    a crash continues after the last committed chunk without importing any row twice.
+
+    :ivar id: Unique identifier for each import.
+    :type id: int
+
+    :ivar source: The kind of the import and the absolute path of the input file, e.g. "ratings:/data/ratings.csv".
+    :type source: str
+
+    :ivar rows: The number of input rows already processed.
+    :type rows: int
+
+    :ivar completed: Whether the whole input file was processed.
+    :type completed: bool
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(255), unique=True, nullable=False)
+    rows = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Boolean, nullable=False, default=False)
+
+    def __repr__(self):
+        """
+        String representation of the ImportProgress instance.
+
+        :return: String representing the import progress.
+        :rtype: import_progress
+        """
+        return f"<ImportProgress-{self.source}>"
+
+    def advance(self, rows, completed=False):
+        """
+        Adds the processed rows of a chunk. The change is committed together with the imported chunk.
+
+        :param rows: The number of processed rows.
+        :type rows: int
+
+        :param completed: Whether the input file was processed completely.
+        :type completed: bool
+        """
+        self.rows += rows
+        self.completed = completed
+
+    @staticmethod
+    def get_or_create(source, restart=False):
+        """
+        Returns the progress of the import of the source, a new progress is created and committed if there is none.
+
+        :param source: The kind of the import and the absolute path of the input file.
+        :type source: str
+
+        :param restart: Whether to discard the saved progress and start from the first row.
+        :type restart: bool
+
+        :return: The import progress.
+        :rtype: ImportProgress
+        """
+        progress = ImportProgress.query.filter_by(source=source).first()
+
+        if progress is None:
+            progress = ImportProgress(source=source, rows=0, completed=False)
+            db.session.add(progress)
+        elif restart:
+            progress.rows = 0
+            progress.completed = False
+
+        db.session.commit()
+
+        return progress
@@ -0,0 +1,250 @@
+import datetime
+import json
+
+from ..exts import db, job_queue
+
+
+# The handlers of the job kinds, key: job kind, value: a function called with the job payload as keyword arguments.
+# The handlers are registered by the application (see Job.register_handler()).
+JOB_HANDLERS = {}
+
+
+class Job(db.Model):
+    """
+    The Job class is a database model that represents a background job, e.g. the refresh of the stale
+    recommendations of a user or the precomputation after a bulk import. The job table is the queue: a job is
+    queued, claimed by one worker (running) and finished (done or failed). The jobs are run by the in-process worker
+    pool (see JobQueue), or by flask jobs run, so no external broker is needed.
+
+    :ivar id: Unique identifier for each job.
+    :type id: int
+
+    :ivar kind: The kind of the job, it selects the handler, e.g. "recommendations".
+    :type kind: str
+
+    :ivar key: The deduplication key, a job is not queued again while a job with the same key is queued.
+    :type key: str or None
+
+    :ivar payload: The JSON arguments of the handler.
+    :type payload: str
+
+    :ivar status: The status of the job: "queued", "running", "done" or "failed".
+    :type status: str
+
+    :ivar result: The JSON result of the handler, if the job is done.
+    :type result: str or None
+
+    :ivar error: The error message, if the job failed.
+    :type error: str or None
+
+    :ivar created_at: The time the job was queued (UTC).
+    :type created_at: datetime.datetime
+
+    :ivar started_at: The time the job was claimed by a worker (UTC).
+    :type started_at: datetime.datetime or None
+
+    :ivar finished_at: The time the job was finished (UTC).
+    :type finished_at: datetime.datetime or None
+    """
+    __table_args__ = (db.Index("ix_job_status_id", "status", "id"),
+                      db.Index("ix_job_key_status", "key", "status"))
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    key = db.Column(db.String(255), nullable=True)
+    payload = db.Column(db.Text(), nullable=False, default="{}")
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    result = db.Column(db.Text(), nullable=True)
+    error = db.Column(db.Text(), nullable=True)
+    created_at = db.Column(db.DateTime(), nullable=False)
+    started_at = db.Column(db.DateTime(), nullable=True)
+    finished_at = db.Column(db.DateTime(), nullable=True)
+
+    def __repr__(self):
+        """
+        String representation of the Job instance.
+
+        :return: String representing the job.
+        :rtype: job
+        """
+        return f"<Job-{self.id}-{self.kind}-{self.status}>"
+
+    def get_data(self):
+        """
+        Get the job data.
+
+        :return: A dictionary containing the job data with the following keys:
+                    - id (int): Job ID.
+                    - kind (str): The kind of the job.
+                    - key (str): The deduplication key.
+                    - status (str): "queued", "running", "done" or "failed".
+                    - payload (dict[str, any]): The arguments of the job.
+                    - result (any): The result of the job, if it is done.
+                    - error (str): The error message, if the job failed.
+                    - created_at (datetime.datetime): The time the job was queued.
+                    - started_at (datetime.datetime): The time the job was started.
+                    - finished_at (datetime.datetime): The time the job was finished.
+        :rtype: dict[str, any]
+        """
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "key": self.key,
+            "status": self.status,
+            "payload": json.loads(self.payload),
+            "result": None if self.result is None else json.loads(self.result),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+    @staticmethod
+    def register_handler(kind, handler):
+        """
+        Registers the handler of a job kind.
+
+        :param kind: The kind of the job, e.g. "recommendations".
+        :type kind: str
+
+        :param handler: The function called with the job payload as keyword arguments, its return value is stored
+                        as the JSON result of the job.
+        :type handler: callable
+        """
+        JOB_HANDLERS[kind] = handler
+
+    @staticmethod
+    def get_by_id(job_id):
+        """
+        Get a job by ID.
+
+        :param job_id: The ID of the job.
+        :type job_id: int
+
+        :return: The Job instance, None if there is no such job.
+        :rtype: Job or None
+        """
+        return db.session.get(Job, job_id)
+
+    @staticmethod
+    def enqueue(kind, payload=None, key=None, submit=True):
+        """
+        Queues a job and submits it to the worker pool of this process. If a job with the same key is already
+        queued, that job is returned instead of queueing a duplicate. A running job does not count, because it may
+        have read the data before the change that queues the new job.
+
+        :param kind: The kind of the job, a registered handler.
+        :type kind: str
+
+        :param payload: The arguments of the handler, JSON serializable.
+        :type payload: dict[str, any] or None
+
+        :param key: The deduplication key, e.g. "recommendations:42". Optional.
+        :type key: str or None
+
+        :param submit: Whether to submit the job to the worker pool, otherwise it stays queued until it is run
+                       (see run() and run_queued()).
+        :type submit: bool
+
+        :return: The queued job.
+        :rtype: Job
+        """
+        if key is not None:
+            job = Job.query.filter_by(key=key, status="queued").order_by(Job.id).first()
+            if job is not None:
+                return job
+
+        job = Job(kind=kind, key=key, payload=json.dumps(payload or {}), status="queued", created_at=_now())
+        db.session.add(job)
+        db.session.commit()
+
+        if submit:
+            job_queue.submit(Job.run, job.id)
+
+        return job
+
+    @staticmethod
+    def run(job_id):
+        """
+        Claims the queued job and runs its handler. The claim is a conditional update, so a job is run only once
+        even if several workers or processes try to run it.
+
+        :param job_id: The ID of the job.
+        :type job_id: int
+
+        :return: True if the job was claimed and run (whether it succeeded or failed), False otherwise.
+        :rtype: bool
+        """
+        claimed_count = Job.query.filter_by(id=job_id, status="queued") \
+            .update({"status": "running", "started_at": _now()}, synchronize_session=False)
+        db.session.commit()
+
+        if not claimed_count:
+            return False
+
+        kind, payload = db.session.query(Job.kind, Job.payload).filter(Job.id == job_id).one()
+        handler = JOB_HANDLERS.get(kind)
+
+        # The handler may use the session freely, the job row is finished with an update.
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown job kind '{kind}'.")
+
+            finished = {"status": "done", "result": json.dumps(handler(**json.loads(payload)))}
+        except Exception as error:
+            db.session.rollback()
+            finished = {"status": "failed", "error": f"{type(error).__name__}: {error}"}
+
+        Job.query.filter_by(id=job_id).update({**finished, "finished_at": _now()}, synchronize_session=False)
+        db.session.commit()
+
+        return True
+
+    @staticmethod
+    def run_queued(kind=None):
+        """
+        Runs the queued jobs one by one in the current process, the oldest first, e.g. the jobs queued without
+        a worker pool.
+
+        :param kind: Run only the jobs of this kind, all jobs if None.
+        :type kind: str or None
+
+        :return: The number of run jobs.
+        :rtype: int
+        """
+        run_count = 0
+        while True:
+            query = db.session.query(Job.id).filter(Job.status == "queued")
+            if kind is not None:
+                query = query.filter(Job.kind == kind)
+
+            row = query.order_by(Job.id).first()
+            if row is None:
+                return run_count
+
+            run_count += Job.run(row.id)
+
+    @staticmethod
+    def requeue_running():
+        """
+        Queues the running jobs again, e.g. the jobs of a process that was stopped while running them.
+        Call it only when no worker is running.
+
+        :return: The number of queued jobs.
+        :rtype: int
+        """
+        requeued_count = Job.query.filter_by(status="running") \
+            .update({"status": "queued", "started_at": None}, synchronize_session=False)
+        db.session.commit()
+
+        return requeued_count
+
+
+def _now():
+    """
+    Returns the current UTC time without the time zone, as stored by SQLite.
+
+    :return: The current time.
+    :rtype: datetime.datetime
+    """
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
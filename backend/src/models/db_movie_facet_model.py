@@ -0,0 +1,146 @@
+from ..exts import db
+
+
+# The filter parameters of the movie listings, key: parameter, value: the filtered column, see
+# Movie.parse_filter_parameters(). The years are an inclusive range. The prefix keeps them apart from the sort keys,
+# e.g. country=abc sorts by the country and filter_country=Japan filters by it.
+QUERY_FILTER_PARAMS = {
+    "filter_category": "category", "filter_country": "country",
+
+    "filter_year_from": "year", "filter_year_to": "year"
+}
+
+# The facets counted alongside the filtered movies, the filtered columns.
+FACET_COLUMNS = ("category", "country", "year")
+
+# The triggers that keep the facet counts in sync with the movie table (created with it, see db_movie_model.py),
+# including the bulk inserts of the importer that bypass the model methods. The update trigger fires only on the
+# faceted columns, so the rating and the comment aggregate updates do not touch the counts. A combination whose last
+# movie is gone is deleted.
+MOVIE_FACET_COUNT_DDL = (
+    """
+    CREATE TRIGGER IF NOT EXISTS movie_facet_count_insert AFTER INSERT ON movie BEGIN
+        INSERT INTO movie_facet_count(category, country, year, movie_count)
+        VALUES (new.category, new.country, new.year, 1)
+        ON CONFLICT(category, country, year) DO UPDATE SET movie_count = movie_count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movie_facet_count_delete AFTER DELETE ON movie BEGIN
+        UPDATE movie_facet_count SET movie_count = movie_count - 1
+        WHERE category = old.category AND country = old.country AND year = old.year;
+        DELETE FROM movie_facet_count
+        WHERE category = old.category AND country = old.country AND year = old.year AND movie_count <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movie_facet_count_update AFTER UPDATE OF category, country, year ON movie BEGIN
+        UPDATE movie_facet_count SET movie_count = movie_count - 1
+        WHERE category = old.category AND country = old.country AND year = old.year;
+        DELETE FROM movie_facet_count
+        WHERE category = old.category AND country = old.country AND year = old.year AND movie_count <= 0;
+        INSERT INTO movie_facet_count(category, country, year, movie_count)
+        VALUES (new.category, new.country, new.year, 1)
+        ON CONFLICT(category, country, year) DO UPDATE SET movie_count = movie_count + 1;
+    END
+    """
+)
+
+
+class MovieFacetCount(db.Model):
+    """
+    The MovieFacetCount class is a database model that represents the number of movies of one combination of the
+    faceted columns (category, country and year). It is a count table maintained by triggers on the movie table, so
+    the facet counts of a filtered listing are read from the combinations instead of grouping the whole movie table
+    on every request. There are far fewer combinations than movies, and their number does not grow with the size of
+    the catalogue once every combination is present.
+
+    :ivar category: Category of the movies.
+    :type category: str
+
+    :ivar country: Country where the movies were produced.
+    :type country: str
+
+    :ivar year: Year when the movies were released.
+    :type year: int
+
+    :ivar movie_count: The number of movies of the combination, always positive.
+    :type movie_count: int
+    """
+    __tablename__ = "movie_facet_count"
+
+    category = db.Column(db.String(30), primary_key=True)
+    country = db.Column(db.String(30), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    movie_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    def __repr__(self):
+        """
+        String representation of the MovieFacetCount instance.
+
+        :return: String representing the combination and its count.
+        :rtype: movie_facet_count
+        """
+        return f"<MovieFacetCount-{self.category}-{self.country}-{self.year}-{self.movie_count}>"
+
+    @staticmethod
+    def get_facet_counts(filters=None):
+        """
+        Counts the movies of every value of every facet. The counts of a facet are filtered by the filters of the
+        other facets only, so they show how many movies each value would select together with the other filters
+        (e.g. the counts of all countries of the selected category), which lets a client switch the value of a facet.
+
+        :param filters: Dictionary, parsed filter parameters (see Movie.parse_filter_parameters()), None for none.
+        :type filters: dict or None
+
+        :return: Dictionary, key: facet (category, country or year), value: list of dictionaries with the value and
+                 the count of the movies, ordered by the value. The values without movies are left out.
+        :rtype: dict[str, list[dict[str, any]]]
+        """
+        facet_counts = {}
+
+        for facet in FACET_COLUMNS:
+            column = getattr(MovieFacetCount, facet)
+            rows = db.session.query(column, db.func.sum(MovieFacetCount.movie_count)) \
+                .filter(*get_filter_conditions(MovieFacetCount, filters or {}, excluded_column=facet)) \
+                .group_by(column).order_by(column).all()
+
+            facet_counts[facet] = [{"value": value, "count": count} for value, count in rows]
+
+        return facet_counts
+
+
+def get_filter_conditions(entity, filters, excluded_column=None):
+    """
+    Returns the SQL conditions of the parsed filter parameters on the columns of an entity with the faceted
+    columns, the Movie or the MovieFacetCount model.
+
+    :param entity: The filtered model.
+    :type entity: Movie or MovieFacetCount
+
+    :param filters: Dictionary, parsed filter parameters (see Movie.parse_filter_parameters()).
+    :type filters: dict
+
+    :param excluded_column: A filtered column whose filters are left out, e.g. the counted facet.
+    :type excluded_column: str or None
+
+    :return: List of SQL conditions.
+    :rtype: list
+    """
+    conditions = []
+
+    for key, value in filters.items():
+        column_name = QUERY_FILTER_PARAMS[key]
+        if column_name == excluded_column:
+            continue
+
+        column = getattr(entity, column_name)
+        if key == "filter_year_from":
+            conditions.append(column >= value)
+        elif key == "filter_year_to":
+            conditions.append(column <= value)
+        else:
+            conditions.append(column == value)
+
+    return conditions
+
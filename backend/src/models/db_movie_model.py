@@ -1,6 +1,13 @@
-from sqlalchemy import text
+import base64
+import binascii
+import json
+import re
 
-from ..exts import db
+from sqlalchemy import DDL, event
+
+from ..exts import db, title_index
+from .db_counter_model import Counter, TITLES_VERSION
+from .db_movie_facet_model import QUERY_FILTER_PARAMS, MOVIE_FACET_COUNT_DDL, get_filter_conditions
 
 # Valid parameters for sorting.
 QUERY_SORT_PARAMS = {
@@ -11,6 +18,68 @@ QUERY_SORT_PARAMS = {
     "oldest": "asc", "latest": "desc"
 }
 
+# Valid keys for sorting, key: sort key, value: the sorted column.
+QUERY_SORT_COLUMNS = {"title": "title", "rating": "average_rating", "year": "year", "country": "country"}
+
+# The default and the maximum number of movies per page, see Movie.get_page().
+MOVIES_PAGE_SIZE = 100
+MOVIES_MAX_PAGE_SIZE = 1000
+
+# The number of rows fetched at once by the streamed listings, see Movie.iter_previews().
+STREAM_BATCH_SIZE = 1000
+
+# The default and the maximum number of typeahead matches, see Movie.get_title_matches().
+TYPEAHEAD_LIMIT = 10
+TYPEAHEAD_MAX_LIMIT = 50
+
+# The default and the maximum number of results per page of the full-text search, see Movie.search().
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
+# The sort order of the search results, the cursor holds the score and the ID of the last result.
+SEARCH_SORT_COLUMNS = [("score", "desc"), ("id", "asc")]
+
+# The BM25 weights of the indexed movie columns (title, description, main_actors).
+SEARCH_COLUMN_WEIGHTS = (5.0, 1.0, 2.0)
+
+# The score of the matching comments of a movie: the weight times the number of the comments, saturated like the term
+# frequency of BM25 (k1), so it approaches weight * (1 + k1) for many comments.
+SEARCH_COMMENT_WEIGHT = 1.0
+SEARCH_COMMENT_SATURATION = 1.2
+
+# The maximum number of search terms, the terms are the words of the query.
+SEARCH_MAX_TERMS = 16
+SEARCH_TERM_PATTERN = re.compile(r"\w+")
+
+# The movies matching the FTS5 query by their own columns or by their comments, ranked by the sum of the BM25 score
+# of the movie columns (bm25() returns negative values, a higher score is a better match) and the score of the matching
+# comments. The comments are only counted, the movie ID is the upper half of their rowid (see search_index.py).
+SEARCH_QUERY = """
+    WITH comment_matches(movie_id, comment_count) AS (
+        SELECT rowid >> 32, COUNT(*) FROM comment_fts WHERE comment_fts MATCH :query GROUP BY rowid >> 32
+    ), matches(movie_id, score) AS (
+        SELECT rowid, -bm25(movie_fts, :title_weight, :description_weight, :main_actors_weight)
+        FROM movie_fts WHERE movie_fts MATCH :query
+        UNION ALL
+        SELECT movie_id, :comment_weight * comment_count * (1 + :comment_saturation)
+            / (comment_count + :comment_saturation)
+        FROM comment_matches
+    ), ranked(movie_id, score) AS (
+        SELECT movie_id, SUM(score) AS score FROM matches GROUP BY movie_id
+    ), page(movie_id, score) AS (
+        SELECT movie_id, score FROM ranked
+        WHERE :after_score IS NULL OR score < :after_score OR (score = :after_score AND movie_id > :after_id)
+        ORDER BY score DESC, movie_id
+        LIMIT :limit
+    )
+    SELECT movie.id, movie.title, movie.category, page.score
+    FROM page JOIN movie ON movie.id = page.movie_id
+    ORDER BY page.score DESC, movie.id
+"""
+
+# The rating histogram columns, see get_rating_histogram_column().
+RATING_HISTOGRAM_COLUMNS = ("ratings_1", "ratings_2", "ratings_3", "ratings_4", "ratings_5")
+
 
 class Movie(db.Model):
     """
@@ -37,6 +106,35 @@ class Movie(db.Model):
     :ivar description: Description of the movie.
     :type description: str
 
+    :ivar rating_count: The number of ratings of the movie, maintained with every rating change.
+    :type rating_count: int
+
+    :ivar rating_sum: The sum of the rating values of the movie, maintained with every rating change.
+    :type rating_sum: float
+
+    :ivar ratings_1: The number of ratings rounded to 1 star (below 1.5), the histogram of the ratings
+                     (ratings_1 to ratings_5) is maintained with every rating change.
+    :type ratings_1: int
+
+    :ivar ratings_2: The number of ratings rounded to 2 stars (from 1.5 to below 2.5).
+    :type ratings_2: int
+
+    :ivar ratings_3: The number of ratings rounded to 3 stars (from 2.5 to below 3.5).
+    :type ratings_3: int
+
+    :ivar ratings_4: The number of ratings rounded to 4 stars (from 3.5 to below 4.5).
+    :type ratings_4: int
+
+    :ivar ratings_5: The number of ratings rounded to 5 stars (4.5 and above).
+    :type ratings_5: int
+
+    :ivar average_rating: The average rating of the movie (0 without ratings), maintained with every rating change
+                          and indexed for sorting by rating.
+    :type average_rating: float
+
+    :ivar comment_count: The number of comments of the movie, maintained with every new or deleted comment.
+    :type comment_count: int
+
     :ivar ratings: A list of Rating objects associated with the movie.
                    Each Rating object represents a user's rating for the movie.
     :type ratings: list[rating]
@@ -52,9 +150,21 @@ class Movie(db.Model):
     year = db.Column(db.Integer, nullable=False)
     main_actors = db.Column(db.Text(), nullable=False)
     description = db.Column(db.Text(), nullable=False)
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    rating_sum = db.Column(db.Float, nullable=False, default=0, server_default="0")
+    ratings_1 = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    ratings_2 = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    ratings_3 = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    ratings_4 = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    ratings_5 = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    average_rating = db.Column(db.Float, nullable=False, default=0, server_default="0")
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
     ratings = db.relationship("Rating", backref="movie", lazy=True)
     comments = db.relationship("Comment", backref="movie", lazy=True)
 
+    # Composite indexes for every sort key, the ID makes the order of movies with equal values stable.
+    __table_args__ = tuple(db.Index(f"ix_movie_{column}_id", column, "id") for column in QUERY_SORT_COLUMNS.values())
+
     def __repr__(self):
         """
         Returns a string representation of the Movie instance.
@@ -66,17 +176,25 @@ class Movie(db.Model):
 
     def save(self):
         """
-        Adds and commits the current Movie instance to the database.
+        Adds and commits the current Movie instance to the database, together with a new version of the titles,
+        and updates the typeahead title index.
         """
         db.session.add(self)
-        db.session.commit()
+        version = Counter.increment(TITLES_VERSION)
+
+        title_index.put(self.id, self.title, version)
 
     def delete(self):
         """
-        Deletes and commits the current Movie instance from the database.
+        Deletes and commits the current Movie instance from the database, together with a new version of the titles,
+        and drops it from the typeahead title index.
         """
+        movie_id = self.id
+
         db.session.delete(self)
-        db.session.commit()
+        version = Counter.increment(TITLES_VERSION)
+
+        title_index.remove(movie_id, version)
 
     def get_id(self):
         """
@@ -89,7 +207,8 @@ class Movie(db.Model):
 
     def get_data(self):
         """
-        Returns a dictionary of movie data including the calculated average rating and a list of comments.
+        Returns a dictionary of movie data including the calculated average rating and the number of comments.
+        The comments themselves are not loaded, they are paginated (see Comment.get_page()).
 
         :return: Dictionary, movie data. A dictionary containing movie data with the following keys:
                     - id (int): Movie ID.
@@ -99,7 +218,7 @@ class Movie(db.Model):
                     - main_actors (str): Main starring actors.
                     - description (str): Movie description.
                     - rating (float): Movie average calculated rating.
-                    - comments (list[dict[str, any]]): Movie comments list with dicts.
+                    - comment_count (int): The number of comments of the movie.
         :rtype: dict[str, any]
         """
         return {
@@ -111,7 +230,7 @@ class Movie(db.Model):
             "main_actors": self.main_actors,
             "description": self.description,
             "rating": self._get_rating(),
-            "comments": self._get_comments()
+            "comment_count": self.comment_count
         }
 
     def get_preview_data(self):
@@ -128,22 +247,12 @@ class Movie(db.Model):
 
     def _get_rating(self):
         """
-        Returns the average rating of the movie.
+        Returns the average rating of the movie from the maintained aggregate columns, without loading the ratings.
 
         :return: Float, average rating of the movie.
         :rtype: float
         """
-        return sum([rating.get_movie_rating() for rating in self.ratings]) / len(self.ratings) if self.ratings else 0
-
-    def _get_comments(self):
-        """
-        Returns a list of dictionaries where each dictionary contains a user_id and a user_comment.
-
-        :return: List of dictionaries, containing user_id and user_comment.
-        :rtype: list[dict[str, any]]
-        """
-        return [{"user_id": comment.get_user_id(), "user_comment": comment.get_user_comment()}
-                for comment in self.comments]
+        return self.average_rating
 
     @staticmethod
     def get_by_id(movie_id):
@@ -158,16 +267,30 @@ class Movie(db.Model):
         """
         return Movie.query.get(movie_id)
 
+    @staticmethod
+    def get_missing_ids(movie_ids):
+        """
+        Returns the provided movie ids that do not belong to any movie.
+
+        :param movie_ids: List of integers, unique identifiers of the movies.
+        :type movie_ids: list[int]
+
+        :return: List of integers, the ids without a movie in ascending order.
+        :rtype: list[int]
+        """
+        existing_ids = {movie_id for movie_id, in db.session.query(Movie.id).filter(Movie.id.in_(set(movie_ids))).all()}
+
+        return sorted(set(movie_ids) - existing_ids)
+
     @staticmethod
     def get_all():
         """
-        Retrieves all movies and returns their preview data.
+        Retrieves all movies and returns their preview data, only the preview columns are selected.
 
         :return: List of dictionaries, preview data of all movies.
         :rtype: list[dict[str, any]]
         """
-        movies = Movie.query.all()
-        return [movie.get_preview_data() for movie in movies]
+        return list(Movie.iter_previews())
 
     @staticmethod
     def validate_sort_parameters(sort_params):
@@ -181,24 +304,227 @@ class Movie(db.Model):
         :rtype: bool
         """
         for key, value in sort_params.items():
-            if key not in ["title", "rating", "year", "country"] or value not in QUERY_SORT_PARAMS.keys():
+            if key not in QUERY_SORT_COLUMNS.keys() or value not in QUERY_SORT_PARAMS.keys():
                 return False
         return True
 
     @staticmethod
-    def sort_all(sort_params):
+    def parse_filter_parameters(filter_params):
+        """
+        Validates and converts the filter parameters: the category and the country must be non-empty strings not
+        longer than their columns, the years (filter_year_from, filter_year_to) integers of an inclusive range.
+
+        :param filter_params: Dictionary, filter parameters provided by the user (keys of QUERY_FILTER_PARAMS).
+        :type filter_params: dict[str, str]
+
+        :return: Dictionary, the parsed filter parameters, or None if a parameter is invalid.
+        :rtype: dict[str, any] or None
         """
-        Sorts all movies based on the provided sort parameters and returns their preview data.
+        filters = {}
+
+        for key, value in filter_params.items():
+            if key not in QUERY_FILTER_PARAMS:
+                return None
+
+            column = getattr(Movie, QUERY_FILTER_PARAMS[key])
+            if isinstance(column.type, db.Integer):
+                try:
+                    filters[key] = int(value)
+                except ValueError:
+                    return None
+            elif value and len(value) <= column.type.length:
+                filters[key] = value
+            else:
+                return None
+
+        if filters.get("filter_year_from", float("-inf")) > filters.get("filter_year_to", float("inf")):
+            return None
+
+        return filters
+
+    @staticmethod
+    def sort_all(sort_params, filters=None):
+        """
+        Sorts all movies based on the provided sort parameters and returns their preview data. The movies are
+        ordered by the columns of the sort keys (the rating by the maintained average rating) and then by their IDs
+        in the direction of the last sort key, so a single key sort is served by its composite index. Only the
+        preview columns are selected.
 
         :param sort_params: Dictionary, validated sort parameters provided by the user.
         :type sort_params: dict
 
+        :param filters: Dictionary, parsed filter parameters (see parse_filter_parameters()), None for all movies.
+        :type filters: dict or None
+
         :return: List of dictionaries, sorted preview data of all movies.
         :rtype: list[dict[str, any]]
         """
-        query = ", ".join(f"{key} {QUERY_SORT_PARAMS[value]}" for key, value in sort_params.items())
-        movies_sorted = Movie.query.order_by(text(query)).all()
-        return [movie.get_preview_data() for movie in movies_sorted]
+        return list(Movie.iter_previews(sort_params, filters))
+
+    @staticmethod
+    def iter_previews(sort_params=None, filters=None, batch_size=STREAM_BATCH_SIZE):
+        """
+        Yields the preview data of all movies ordered like in sort_all() (by their IDs without sort parameters).
+        The rows are fetched from the database cursor in batches, so the memory does not grow with the number of
+        movies, e.g. for a streamed response.
+
+        :param sort_params: Dictionary, validated sort parameters provided by the user, None to order by IDs.
+        :type sort_params: dict or None
+
+        :param filters: Dictionary, parsed filter parameters (see parse_filter_parameters()), None for all movies.
+        :type filters: dict or None
+
+        :param batch_size: The number of rows fetched at once.
+        :type batch_size: int
+
+        :return: Generator of dictionaries, preview data of the movies (id, title, category).
+        :rtype: generator[dict[str, any]]
+        """
+        sort_columns = Movie._get_sort_columns(sort_params or {})
+
+        rows = db.session.query(Movie.id, Movie.title, Movie.category) \
+            .filter(*get_filter_conditions(Movie, filters or {})) \
+            .order_by(*[getattr(getattr(Movie, column), direction)() for column, direction in sort_columns]) \
+            .yield_per(batch_size)
+
+        for movie_id, title, category in rows:
+            yield {"id": movie_id, "title": title, "category": category}
+
+    @staticmethod
+    def get_page(sort_params=None, limit=MOVIES_PAGE_SIZE, cursor=None, filters=None):
+        """
+        Returns a page of movie previews with keyset pagination. The movies are ordered like in sort_all() (by their
+        IDs without sort parameters) and a page continues after the last movie of the previous page, which its cursor
+        identifies, so the cost of a page does not depend on its position and the pages stay consistent when movies
+        are added or removed. Only the preview and the sort columns are selected.
+
+        :param sort_params: Dictionary, validated sort parameters provided by the user, None to order by IDs.
+        :type sort_params: dict or None
+
+        :param limit: The maximum number of movies of the page.
+        :type limit: int
+
+        :param cursor: The next_cursor of the previous page, None for the first page.
+        :type cursor: str or None
+
+        :param filters: Dictionary, parsed filter parameters (see parse_filter_parameters()), None for all movies.
+        :type filters: dict or None
+
+        :return: Dictionary, the page with the following keys:
+                    - movies (list[dict[str, any]]): Preview data of the movies (id, title, category).
+                    - next_cursor (str or None): The cursor of the next page, None on the last page.
+        :rtype: dict[str, any]
+
+        :raises ValueError: If the cursor is invalid or belongs to a different sort order.
+        """
+        sort_columns = Movie._get_sort_columns(sort_params or {})
+        columns = [(getattr(Movie, column), direction) for column, direction in sort_columns]
+
+        query = db.session.query(Movie.id, Movie.title, Movie.category, *[column for column, _ in columns]) \
+            .filter(*get_filter_conditions(Movie, filters or {}))
+        if cursor is not None:
+            query = query.filter(_get_keyset_filter(columns, decode_cursor(cursor, sort_columns)))
+
+        rows = query.order_by(*[getattr(column, direction)() for column, direction in columns]).limit(limit + 1).all()
+        movies = [{"id": row[0], "title": row[1], "category": row[2]} for row in rows[:limit]]
+
+        return {
+            "movies": movies,
+            "next_cursor": encode_cursor(sort_columns, list(rows[limit - 1][3:])) if len(rows) > limit else None
+        }
+
+    @staticmethod
+    def get_title_matches(prefix, limit=TYPEAHEAD_LIMIT):
+        """
+        Returns the movies whose title, or a word of the title, starts with the typed prefix, for the typeahead.
+        The matches are looked up in the in-process title index (see TitleIndex), which is loaded from the database
+        by the first lookup of the process and again after another process has changed the movies, so a keystroke
+        only reads the version of the titles.
+
+        :param prefix: The typed text, the case, the diacritics and the punctuation are ignored.
+        :type prefix: str
+
+        :param limit: The maximum number of matches.
+        :type limit: int
+
+        :return: List of dictionaries with the id and the title of the matching movies, the titles starting with the
+                 prefix first, each in the alphabetical order.
+        :rtype: list[dict[str, any]]
+        """
+        title_index.sync(Counter.get(TITLES_VERSION))
+        if not title_index.is_loaded():
+            title_index.load(db.session.query(Movie.id, Movie.title))
+
+        return [{"id": movie_id, "title": title} for movie_id, title in title_index.get_matches(prefix, limit)]
+
+    @staticmethod
+    def search(text, limit=SEARCH_PAGE_SIZE, cursor=None):
+        """
+        Full-text search of the movies by their title, description and main actors and by their comments, with
+        the FTS5 search index (see search_index.py), so the cost of a query depends on the number of matches, not on
+        the size of the tables. Every word of the text has to match (in any indexed column, or in a single comment),
+        the movies are ranked by the BM25 score of their columns and the number of their matching comments (see
+        SEARCH_QUERY) and paginated with a keyset cursor.
+
+        :param text: The searched text.
+        :type text: str
+
+        :param limit: The maximum number of movies of the page.
+        :type limit: int
+
+        :param cursor: The next_cursor of the previous page, None for the first page.
+        :type cursor: str or None
+
+        :return: Dictionary, the page with the following keys:
+                    - movies (list[dict[str, any]]): The matching movies (id, title, category and score), the best
+                      match first.
+                    - next_cursor (str or None): The cursor of the next page, None on the last page.
+        :rtype: dict[str, any]
+
+        :raises ValueError: If the text has no words or the cursor is invalid.
+        """
+        terms = SEARCH_TERM_PATTERN.findall(text)[:SEARCH_MAX_TERMS]
+        if not terms:
+            raise ValueError("No search terms.")
+
+        after_score, after_id = decode_cursor(cursor, SEARCH_SORT_COLUMNS) if cursor is not None else (None, None)
+
+        # The terms are quoted, so the FTS5 query syntax of the text (operators, column filters) is not interpreted.
+        rows = db.session.execute(db.text(SEARCH_QUERY), {
+            "query": " ".join(f'"{term}"' for term in terms),
+            "title_weight": SEARCH_COLUMN_WEIGHTS[0],
+            "description_weight": SEARCH_COLUMN_WEIGHTS[1],
+            "main_actors_weight": SEARCH_COLUMN_WEIGHTS[2],
+            "comment_weight": SEARCH_COMMENT_WEIGHT,
+            "comment_saturation": SEARCH_COMMENT_SATURATION,
+            "after_score": after_score,
+            "after_id": after_id,
+            "limit": limit + 1
+        }).all()
+        movies = [{"id": row.id, "title": row.title, "category": row.category, "score": row.score}
+                  for row in rows[:limit]]
+
+        return {
+            "movies": movies,
+            "next_cursor": encode_cursor(SEARCH_SORT_COLUMNS, [rows[limit - 1].score, rows[limit - 1].id])
+            if len(rows) > limit else None
+        }
+
+    @staticmethod
+    def _get_sort_columns(sort_params):
+        """
+        Returns the sorted columns of the sort parameters, followed by the ID in the direction of the last sort key,
+        which makes the order stable.
+
+        :param sort_params: Dictionary, validated sort parameters provided by the user.
+        :type sort_params: dict
+
+        :return: List of (column name, direction) tuples, the direction is "asc" or "desc".
+        :rtype: list[tuple[str, str]]
+        """
+        sort_columns = [(QUERY_SORT_COLUMNS[key], QUERY_SORT_PARAMS[value]) for key, value in sort_params.items()]
+
+        return sort_columns + [("id", sort_columns[-1][1] if sort_columns else "asc")]
 
     @staticmethod
     def format_recommendations(recommendations):
@@ -211,8 +537,273 @@ class Movie(db.Model):
         :return: The formatted movie recommendations with additional movie details.
         :rtype: list[dict[str, any]]
         """
+        previews = Movie.get_previews_by_ids([rec["id"] for rec in recommendations])
+
         for rec in recommendations:
-            movie = Movie.get_by_id(rec["id"])
-            rec.update({"title": movie.title, "category": movie.category})
+            preview = previews[rec["id"]]
+            rec.update({"title": preview["title"], "category": preview["category"]})
 
         return recommendations
+
+    @staticmethod
+    def get_previews_by_ids(movie_ids):
+        """
+        Retrieves the preview data of the movies with the provided ids with a single query.
+
+        :param movie_ids: List of integers, unique identifiers of the movies.
+        :type movie_ids: list[int]
+
+        :return: Dictionary, key: movie ID, value: preview data of the movie (id, title, category).
+        :rtype: dict[int, dict[str, any]]
+        """
+        if not movie_ids:
+            return {}
+
+        rows = db.session.query(Movie.id, Movie.title, Movie.category).filter(Movie.id.in_(set(movie_ids))).all()
+
+        return {movie_id: {"id": movie_id, "title": title, "category": category} for movie_id, title, category in rows}
+
+    @staticmethod
+    def bulk_insert(movies):
+        """
+        Inserts a chunk of movies with a single executemany statement. The movies whose IDs already exist are skipped,
+        so a chunk can be imported again. The version of the titles is incremented in the same transaction, which
+        the caller commits, so the title index of every process is loaded again on its next lookup.
+
+        :param movies: List of dictionaries with the movie columns (id, title, category, country, year, main_actors,
+                       description).
+        :type movies: list[dict[str, any]]
+
+        :return: The number of inserted movies.
+        :rtype: int
+        """
+        existing_ids = {movie_id for movie_id, in db.session.query(Movie.id)
+                        .filter(Movie.id.in_([movie["id"] for movie in movies])).all()}
+        new_movies = list({movie["id"]: movie for movie in movies if movie["id"] not in existing_ids}.values())
+
+        if new_movies:
+            db.session.execute(db.insert(Movie), new_movies)
+            Counter.increment(TITLES_VERSION, commit=False)
+
+        return len(new_movies)
+
+    @staticmethod
+    def update_rating_aggregates(rating_changes):
+        """
+        Applies rating changes to the aggregate columns (rating_count, rating_sum, the ratings_1 to ratings_5
+        histogram and average_rating) with relative UPDATE statements, one per changed movie, in the caller's
+        transaction. The caller commits the transaction together with the rating changes.
+
+        :param rating_changes: List of (movie ID, old rating value, new rating value) tuples, the old value is None
+                               for a new rating and the new value is None for a deleted rating.
+        :type rating_changes: list[tuple[int, float or None, float or None]]
+        """
+        deltas = {}
+        for movie_id, old_rating, new_rating in rating_changes:
+            # The bound parameter names must differ from the updated column names.
+            delta = deltas.setdefault(movie_id, {"movie_id": movie_id, "delta_rating_count": 0, "delta_rating_sum": 0,
+                                                 **{f"delta_{column}": 0 for column in RATING_HISTOGRAM_COLUMNS}})
+            if old_rating is not None:
+                delta["delta_rating_count"] -= 1
+                delta["delta_rating_sum"] -= old_rating
+                delta[f"delta_{get_rating_histogram_column(old_rating)}"] -= 1
+            if new_rating is not None:
+                delta["delta_rating_count"] += 1
+                delta["delta_rating_sum"] += new_rating
+                delta[f"delta_{get_rating_histogram_column(new_rating)}"] += 1
+
+        if not deltas:
+            return
+
+        table = Movie.__table__
+        rating_count = table.c.rating_count + db.bindparam("delta_rating_count")
+        rating_sum = table.c.rating_sum + db.bindparam("delta_rating_sum")
+
+        statement = table.update().where(table.c.id == db.bindparam("movie_id")).values(
+            average_rating=db.case((rating_count > 0, rating_sum / rating_count), else_=0),
+            **{column: table.c[column] + db.bindparam(f"delta_{column}")
+               for column in ("rating_count", "rating_sum") + RATING_HISTOGRAM_COLUMNS}
+        )
+        db.session.execute(statement, list(deltas.values()))
+
+    @staticmethod
+    def update_rating_aggregates_for_upsert(movie_id, new_rating, old_rating):
+        """
+        Applies the upsert of a single rating to the aggregate columns with one relative UPDATE statement, in the
+        caller's transaction, like update_rating_aggregates(). The old rating value is an SQL expression evaluated by
+        the statement itself (e.g. a subquery of the stored rating), so reading the old value and updating
+        the aggregates are atomic and the rating does not have to be loaded first.
+
+        :param movie_id: The ID of the rated movie.
+        :type movie_id: int
+
+        :param new_rating: The new rating value.
+        :type new_rating: float
+
+        :param old_rating: SQL expression of the old rating value, NULL for a new rating.
+        :type old_rating: sqlalchemy.sql.expression.ColumnElement
+
+        :return: The rating count and the average rating of the movie after the change, None if the movie does
+                 not exist.
+        :rtype: tuple[int, float] or None
+        """
+        table = Movie.__table__
+        rating_count = table.c.rating_count + db.case((old_rating.is_(None), 1), else_=0)
+        rating_sum = table.c.rating_sum + new_rating - db.func.coalesce(old_rating, 0)
+        new_rating_column = get_rating_histogram_column(new_rating)
+
+        statement = table.update().where(table.c.id == movie_id).values(
+            rating_count=rating_count,
+            rating_sum=rating_sum,
+            average_rating=db.case((rating_count > 0, rating_sum / rating_count), else_=0),
+            **{column: table.c[column] + int(column == new_rating_column)
+               - db.case((get_rating_histogram_filter(old_rating, column), 1), else_=0)
+               for column in RATING_HISTOGRAM_COLUMNS}
+        ).returning(table.c.rating_count, table.c.average_rating)
+
+        row = db.session.execute(statement).first()
+
+        return None if row is None else tuple(row)
+
+    @staticmethod
+    def update_comment_count(movie_id, delta):
+        """
+        Applies a change of the number of comments of the movie with a relative UPDATE statement, in the caller's
+        transaction.
+
+        :param movie_id: The ID of the movie.
+        :type movie_id: int
+
+        :param delta: The change of the number of comments, or an SQL expression of it, which the statement evaluates
+                      (e.g. 1 unless the comment exists, see Comment.upsert()).
+        :type delta: int or sqlalchemy.sql.expression.ColumnElement
+
+        :return: The number of comments of the movie after the change, None if the movie does not exist.
+        :rtype: int or None
+        """
+        table = Movie.__table__
+        statement = table.update().where(table.c.id == movie_id) \
+            .values(comment_count=table.c.comment_count + delta).returning(table.c.comment_count)
+
+        return db.session.execute(statement).scalar()
+
+
+# The facet count triggers (see MovieFacetCount) are created by db.create_all() (e.g. the benchmarks) with the movie
+# table, SQLite resolves the count table of their bodies when they fire. The databases created by the migrations get
+# them from a migration.
+for statement in MOVIE_FACET_COUNT_DDL:
+    event.listen(Movie.__table__, "after_create", DDL(statement))
+
+
+def get_rating_histogram_column(rating):
+    """
+    Returns the histogram column of the rating value, the value is rounded half up to whole stars (1 to 5).
+
+    :param rating: The rating value.
+    :type rating: float
+
+    :return: The column name, ratings_1 to ratings_5.
+    :rtype: str
+    """
+    stars = 1 if rating < 1.5 else 2 if rating < 2.5 else 3 if rating < 3.5 else 4 if rating < 4.5 else 5
+
+    return f"ratings_{stars}"
+
+
+def get_rating_histogram_filter(rating, column):
+    """
+    Returns the SQL condition of the rating values of a histogram column, see get_rating_histogram_column().
+
+    :param rating: SQL expression of the rating value.
+    :type rating: sqlalchemy.sql.expression.ColumnElement
+
+    :param column: The column name, ratings_1 to ratings_5.
+    :type column: str
+
+    :return: The condition, NULL for a NULL rating.
+    :rtype: sqlalchemy.sql.expression.ColumnElement
+    """
+    stars = int(column.rsplit("_", 1)[1])
+    conditions = []
+    if stars > 1:
+        conditions.append(rating >= stars - 0.5)
+    if stars < 5:
+        conditions.append(rating < stars + 0.5)
+
+    return db.and_(*conditions)
+
+
+def _get_keyset_filter(columns, values):
+    """
+    Returns the condition that selects the rows after the row with the values of the sorted columns. If all columns
+    are sorted in the same direction, the condition is a single row value comparison, which the composite sort
+    indexes serve.
+
+    :param columns: List of (column, direction) tuples.
+    :type columns: list[tuple[sqlalchemy.Column, str]]
+
+    :param values: The values of the sorted columns of the last row of the previous page.
+    :type values: list[any]
+
+    :return: The filter condition.
+    :rtype: sqlalchemy.ColumnElement
+    """
+    if len({direction for _, direction in columns}) == 1:
+        row, last_row = db.tuple_(*[column for column, _ in columns]), db.tuple_(*values)
+        return row > last_row if columns[0][1] == "asc" else row < last_row
+
+    return db.or_(*[
+        db.and_(*[column == value for (column, _), value in zip(columns[:index], values)],
+                column > values[index] if direction == "asc" else column < values[index])
+        for index, (column, direction) in enumerate(columns)
+    ])
+
+
+def encode_cursor(sort_columns, values):
+    """
+    Encodes the cursor of a page, which holds the sort order and the values of the sorted columns of the last row
+    (a movie, or a comment, see Comment.get_page()).
+
+    :param sort_columns: List of (column name, direction) tuples, see Movie._get_sort_columns().
+    :type sort_columns: list[tuple[str, str]]
+
+    :param values: The values of the sorted columns.
+    :type values: list[any]
+
+    :return: The URL-safe cursor.
+    :rtype: str
+    """
+    data = json.dumps({"sort": sort_columns, "after": values}, separators=(",", ":"))
+
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort_columns):
+    """
+    Decodes the cursor of a page and returns the values of the sorted columns of the last row.
+
+    :param cursor: The cursor, see encode_cursor().
+    :type cursor: str
+
+    :param sort_columns: The sort order of the requested page, it must match the sort order of the cursor.
+    :type sort_columns: list[tuple[str, str]]
+
+    :return: The values of the sorted columns.
+    :rtype: list[any]
+
+    :raises ValueError: If the cursor is invalid or belongs to a different sort order.
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        sort, values = [tuple(column) for column in data["sort"]], data["after"]
+    except (binascii.Error, UnicodeDecodeError, TypeError, KeyError, ValueError) as error:
+        raise ValueError("Invalid cursor.") from error
+
+    if sort != sort_columns or not isinstance(values, list) or len(values) != len(sort_columns):
+        raise ValueError("Invalid cursor.")
+
+    # The values are bound as query parameters, so only the scalar values of the sorted columns are accepted.
+    if any(isinstance(value, bool) or not isinstance(value, (str, int, float, type(None))) for value in values):
+        raise ValueError("Invalid cursor.")
+
+    return values
@@ -1,4 +1,11 @@
-from ..exts import db
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from ..exts import db, neighbor_index, recommendation_cache, job_queue
+from ..recsys import RatingsSnapshot, RecMechanism
+from .db_correlation_model import Correlation
+from .db_counter_model import Counter, NEIGHBORS_VERSION
+from .db_job_model import Job
+from .db_movie_model import Movie
 
 
 class Rating(db.Model):
@@ -18,6 +25,11 @@ class Rating(db.Model):
     :type rating: float
     """
 
+    # A user rates a movie at most once, the unique index is the conflict target of upsert(). The movie index finds
+    # the users who rated the same movies (see get_related_snapshot()).
+    __table_args__ = (db.Index("ux_rating_user_id_movie_id", "user_id", "movie_id", unique=True),
+                      db.Index("ix_rating_movie_id_user_id", "movie_id", "user_id"))
+
     id = db.Column(db.Integer, primary_key=True)
     movie_id = db.Column(db.Integer, db.ForeignKey("movie.id"), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -34,18 +46,33 @@ class Rating(db.Model):
 
     def save(self):
         """
-        Save the current instance of Rating to the database.
+        Save the current instance of Rating to the database (a new rating, or the rating updated by create())
+        and refresh the user's neighbors and cached recommendations. The movie's rating aggregates are updated
+        in the same transaction.
         """
+        state = db.inspect(self)
+        if not state.persistent:
+            Movie.update_rating_aggregates([(self.movie_id, None, self.rating)])
+        elif state.attrs.rating.history.deleted:
+            Movie.update_rating_aggregates([(self.movie_id, state.attrs.rating.history.deleted[0], self.rating)])
+
         db.session.add(self)
         db.session.commit()
 
+        Rating._on_ratings_changed(self.user_id)
+
     def delete(self):
         """
-        Delete the current instance of Rating from the database.
+        Delete the current instance of Rating from the database and refresh the user's neighbors and cached
+        recommendations. The movie's rating aggregates are updated in the same transaction.
         """
+        Movie.update_rating_aggregates([(self.movie_id, self.rating, None)])
+
         db.session.delete(self)
         db.session.commit()
 
+        Rating._on_ratings_changed(self.user_id)
+
     def get_movie_id(self):
         """
         Get the movie ID of the current instance.
@@ -66,14 +93,19 @@ class Rating(db.Model):
 
     def update_rating(self, new_rating):
         """
-        Update the rating for the current instance.
+        Update the rating for the current instance and refresh the user's neighbors and cached recommendations.
+        The movie's rating aggregates are updated in the same transaction.
 
         :param new_rating: The new rating value.
         :type new_rating: float
         """
+        Movie.update_rating_aggregates([(self.movie_id, self.rating, new_rating)])
+
         self.rating = new_rating
         db.session.commit()
 
+        Rating._on_ratings_changed(self.user_id)
+
     @staticmethod
     def create(movie_id, user_id, rating):
         """
@@ -88,13 +120,182 @@ class Rating(db.Model):
         :param rating: The numerical rating value given by the user for the movie.
         :type rating: float
 
-        :return: A new Rating instance or updated rating instance.
+        :return: A new Rating instance or updated rating instance, both are stored by calling save().
         :rtype: rating
         """
         rating_update = Rating.query.filter_by(movie_id=movie_id, user_id=user_id).first()
         if rating_update is not None:
-            rating_update.update_rating(rating)
+            rating_update.rating = rating
 
             return rating_update
 
         return Rating(movie_id=movie_id, user_id=user_id, rating=rating)
+
+    @staticmethod
+    def upsert(movie_id, user_id, rating):
+        """
+        Stores the rating of the movie by the user with a single INSERT ... ON CONFLICT(user_id, movie_id) statement,
+        an existing rating of the movie by the user is updated, as in create(). The movie's rating aggregates are
+        updated by a statement that reads the old rating itself (see Movie.update_rating_aggregates_for_upsert()),
+        so no rating is loaded and both statements are committed together. Then the user's neighbors and cached
+        recommendations are refreshed, as in save().
+
+        :param movie_id: Identifier for the movie that the rating pertains to.
+        :type movie_id: int
+
+        :param user_id: Identifier for the user who made the rating.
+        :type user_id: int
+
+        :param rating: The numerical rating value given by the user for the movie.
+        :type rating: float
+
+        :return: The rating count and the average rating of the movie after the change, None if the movie does
+                 not exist (nothing is stored then).
+        :rtype: tuple[int, float] or None
+        """
+        old_rating = db.select(Rating.rating).where(Rating.user_id == user_id, Rating.movie_id == movie_id) \
+            .scalar_subquery()
+
+        # The aggregates are updated first, the statement locks the database before the old rating is read.
+        aggregates = Movie.update_rating_aggregates_for_upsert(movie_id, rating, old_rating)
+        if aggregates is None:
+            db.session.rollback()
+            return None
+
+        statement = sqlite_insert(Rating).values(movie_id=movie_id, user_id=user_id, rating=rating)
+        db.session.execute(statement.on_conflict_do_update(index_elements=["user_id", "movie_id"],
+                                                           set_={"rating": statement.excluded.rating}))
+        db.session.commit()
+
+        Rating._on_ratings_changed(user_id)
+
+        return aggregates
+
+    @staticmethod
+    def bulk_upsert(ratings):
+        """
+        Stores a chunk of ratings with executemany statements: the existing (user, movie) ratings are updated,
+        as in create(), and the others are inserted. Within the chunk the last rating of a (user, movie) pair wins.
+        The ratings of movies that do not exist are skipped. The movies' rating aggregates are updated in the same
+        transaction, which the caller commits.
+
+        The correlation store and the neighbor index are not refreshed, they have to be rebuilt after a bulk import
+        (see flask recsys correlations).
+
+        :param ratings: List of (user ID, movie ID, rating value) tuples.
+        :type ratings: list[tuple[int, int, float]]
+
+        :return: The number of inserted and updated ratings.
+        :rtype: tuple[int, int]
+        """
+        movie_ids = {movie_id for _, movie_id, _ in ratings}
+        existing_movie_ids = {movie_id for movie_id, in db.session.query(Movie.id)
+                              .filter(Movie.id.in_(movie_ids)).all()}
+        chunk_ratings = {(user_id, movie_id): rating for user_id, movie_id, rating in ratings
+                         if movie_id in existing_movie_ids}
+
+        existing_ratings = {(user_id, movie_id): (rating_id, rating) for rating_id, user_id, movie_id, rating
+                            in db.session.query(Rating.id, Rating.user_id, Rating.movie_id, Rating.rating)
+                            .filter(db.tuple_(Rating.user_id, Rating.movie_id).in_(list(chunk_ratings))).all()}
+
+        new_ratings = [{"user_id": key[0], "movie_id": key[1], "rating": rating}
+                       for key, rating in chunk_ratings.items() if key not in existing_ratings]
+        updated_ratings = [{"id": existing_ratings[key][0], "rating": rating}
+                           for key, rating in chunk_ratings.items() if key in existing_ratings]
+
+        Movie.update_rating_aggregates([(key[1], existing_ratings[key][1] if key in existing_ratings else None, rating)
+                                        for key, rating in chunk_ratings.items()])
+
+        if new_ratings:
+            db.session.execute(db.insert(Rating), new_ratings)
+        if updated_ratings:
+            db.session.execute(db.update(Rating), updated_ratings)
+
+        return len(new_ratings), len(updated_ratings)
+
+    @staticmethod
+    def _on_ratings_changed(user_id):
+        """
+        Refreshes everything derived from the ratings of the user after they have changed and were committed.
+
+        The cached recommendations of the user are invalidated at once, together with the recommendations of the users
+        whose neighbor sets included the user. The user's row and column in the correlation store and in the neighbor
+        index are refreshed by a "correlations" job (see refresh_correlations_by_user_id()), or in the request if
+        the job queue is disabled. Nothing is calculated while the store, the index and the cache are empty, only
+        the version of the neighbors is incremented, so the other processes drop their neighbor indexes.
+
+        :param user_id: The ID of the user whose ratings have changed.
+        :type user_id: int
+        """
+        recommendation_cache.invalidate_user(user_id)
+
+        if len(neighbor_index) or len(recommendation_cache) or Correlation.is_filled():
+            if job_queue.is_enabled():
+                Job.enqueue("correlations", {"user_id": user_id}, key=f"correlations:{user_id}")
+            else:
+                Rating.refresh_correlations_by_user_id(user_id)
+        else:
+            Counter.increment(NEIGHBORS_VERSION)
+
+    @staticmethod
+    def refresh_correlations_by_user_id(user_id):
+        """
+        The handler of the "correlations" jobs: the correlation coefficients of the user, whose ratings have changed,
+        are recalculated to refresh the user's row and column in the correlation store and in the neighbor index.
+        The version of the neighbors is incremented, so the other processes drop their neighbor indexes (see
+        NeighborIndex.sync()), and the cached recommendations of the user's new neighbors are invalidated.
+
+        :param user_id: The ID of the user whose ratings have changed.
+        :type user_id: int
+
+        :return: The number of the user's neighbors.
+        :rtype: int
+        """
+        correlations = Rating.get_related_snapshot(user_id).get_correlations(user_id)
+
+        Correlation.refresh_user(user_id, correlations)
+        neighbor_index.update_user(user_id, correlations, Counter.increment(NEIGHBORS_VERSION))
+        neighbor_ids = [another_user_id for another_user_id, correlation in correlations.items()
+                        if correlation >= RecMechanism.MIN_CORRELATION]
+
+        recommendation_cache.invalidate_user(user_id, neighbor_ids)
+
+        return len(neighbor_ids)
+
+    @staticmethod
+    def get_snapshot(user_ids=None):
+        """
+        Loads the ratings into a RatingsSnapshot with a single columnar query (user_id, movie_id, rating).
+
+        :param user_ids: IDs of the users whose ratings are loaded, or a query selecting them, all users if None.
+        :type user_ids: list[int] or sqlalchemy.Select or None
+
+        :return: The snapshot of the ratings, the users are ordered by their IDs.
+        :rtype: RatingsSnapshot
+        """
+        query = db.session.query(Rating.user_id, Rating.movie_id, Rating.rating)
+        if user_ids is not None:
+            query = query.filter(Rating.user_id.in_(user_ids))
+
+        rows = query.order_by(Rating.user_id, Rating.id).all()
+
+        user_ids, movie_ids, ratings = zip(*rows) if rows else ((), (), ())
+
+        return RatingsSnapshot.from_columns(user_ids, movie_ids, ratings)
+
+    @staticmethod
+    def get_related_snapshot(user_id):
+        """
+        Loads the ratings of the user and of the users who rated any of the user's movies into a RatingsSnapshot,
+        with a single query. The user's correlation coefficients are the same as in the snapshot of all users,
+        the users left out have no common movies with the user, so their correlation is 0.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :return: The snapshot of the ratings, the users are ordered by their IDs.
+        :rtype: RatingsSnapshot
+        """
+        movie_ids = db.select(Rating.movie_id).where(Rating.user_id == user_id)
+
+        return Rating.get_snapshot(db.select(Rating.user_id).where(Rating.movie_id.in_(movie_ids)))
@@ -1,7 +1,14 @@
+import secrets
+
 from flask_jwt_extended import create_access_token
 
-from ..exts import db
-from ..recsys import RecMechanism
+from ..exts import db, neighbor_index, candidate_index, shared_snapshot, recommendation_cache, instrumentation, \
+    job_queue
+from ..recsys import RecMechanism, UserProfile, get_batch_recommendations
+from .db_correlation_model import Correlation
+from .db_counter_model import Counter, NEIGHBORS_VERSION
+from .db_job_model import Job
+from .db_rating_model import Rating
 
 
 class User(db.Model):
@@ -110,10 +117,15 @@ class User(db.Model):
         Get movie recommendations for the user based on their preferences and the Spearman's correlation coefficients.
 
         This method utilizes a recommendation mechanism to calculate movie recommendations for the user.
-        It first creates an instance of the RecMechanism class, passing in self (the current user)
-        and all users in the system.
-        The RecMechanism class calculates the Spearman's correlation coefficients between the current user
-        and other users, and updates the correlations attribute of the current user.
+        It first creates an instance of the RecMechanism class (see _get_rec_mechanism()), which reads
+        the Spearman's correlation coefficients between the current user and other users from the correlation store,
+        or calculates them if the store is empty.
+
+        The recommendations are cached until the ratings of the user or of one of the user's neighbors (the users
+        with a correlation not lower than RecMechanism.MIN_CORRELATION) change, see RecommendationCache. With the job
+        worker pool (JOB_WORKERS), stale recommendations are returned at once and their refresh is queued as
+        a background job, whose ID is set as refresh_job_id. The recommendations are calculated in the request only
+        if none are cached.
 
         :return: A list of movie recommendations for the user. Each recommendation is represented as a dictionary
                  with the following keys:
@@ -124,16 +136,30 @@ class User(db.Model):
                                                         and another user.
         :rtype: list[dict[str, any]]
         """
-        rec_mechanism = RecMechanism(self, User.get_all())
+        def queue_refresh():
+            self.refresh_job_id = Job.enqueue("recommendations", {"user_id": self.id},
+                                              key=f"recommendations:{self.id}").id
 
-        return rec_mechanism.get_recommendations()
+        return recommendation_cache.get_or_calculate(self.id, self._calculate_recommendations,
+                                                     queue_refresh if job_queue.is_enabled() else None)
+
+    def refresh_recommendations(self):
+        """
+        Calculates the recommendations of the user and stores them in the recommendation cache, e.g. in
+        a background job.
+
+        :return: The number of recommendations.
+        :rtype: int
+        """
+        return len(recommendation_cache.refresh(self.id, self._calculate_recommendations))
 
     def get_predicted_movie_rating_by_movie_id(self, movie_id):
         """
         This method retrieves a predicted movie rating for a specified movie ID. The prediction is based on
         a recommendation mechanism that leverages ratings from all users.
 
-        Here's how it works: a RecMechanism object is initialized with the current user and the list of all users.
+        Here's how it works: a RecMechanism object is initialized with the current user and the stored correlation
+        coefficients (or the list of all users, see _get_rec_mechanism()).
         The RecMechanism's get_predicted_rating_for_movie() method is called with the specified movie ID.
 
         The RecMechanism's get_predicted_rating_for_movie() method calculates the predicted rating based on
@@ -147,12 +173,34 @@ class User(db.Model):
                     - user_predicted_rating (float): The prediction value.
         :rtype: dict[str, any]
         """
-        rec_mechanism = RecMechanism(self, User.get_all())
-        prediction = {"user_id": self.get_id(),
-                      "user_predicted_rating": rec_mechanism.get_predicted_rating_for_movie(movie_id)}
+        with instrumentation.track("recsys"):
+            rec_mechanism, _ = self._get_rec_mechanism()
+            prediction = {"user_id": self.get_id(),
+                          "user_predicted_rating": rec_mechanism.get_predicted_rating_for_movie(movie_id)}
 
         return prediction
 
+    def get_predicted_movie_ratings_by_movie_ids(self, movie_ids):
+        """
+        Retrieves the predicted ratings for many movies at once, e.g. for a movie list page. The recommendation
+        mechanism is created once (see _get_rec_mechanism()) and the nearest neighbors are selected once for all
+        movies, instead of repeating both for every movie as get_predicted_movie_rating_by_movie_id() does.
+
+        :param movie_ids: The IDs of the movies for which the predicted ratings are to be retrieved.
+        :type movie_ids: list[int]
+
+        :return: The predicted ratings in dict with following keys:
+                    - user_id (int): The user's ID.
+                    - user_predicted_ratings (dict[int, float]): The prediction values, key: movie ID.
+        :rtype: dict[str, any]
+        """
+        with instrumentation.track("recsys"):
+            rec_mechanism, _ = self._get_rec_mechanism()
+            predictions = {"user_id": self.get_id(),
+                           "user_predicted_ratings": rec_mechanism.get_predicted_ratings_for_movies(movie_ids)}
+
+        return predictions
+
     def get_ratings(self):
         """
         Get the user's ratings.
@@ -162,6 +210,26 @@ class User(db.Model):
         """
         return {rating.get_movie_id(): rating.get_movie_rating() for rating in self.ratings}
 
+    def iter_ratings(self, batch_size=1000):
+        """
+        Yields the user's ratings ordered by movie IDs, e.g. for a streamed export. The ratings are fetched from the
+        database cursor in batches instead of loading the ratings relationship, so the memory does not grow with the
+        number of ratings.
+
+        :param batch_size: The number of rows fetched at once.
+        :type batch_size: int
+
+        :return: Generator of dictionaries with the following keys:
+                    - movie_id (int): ID of the rated movie.
+                    - movie_rating (float): Rating of the movie.
+        :rtype: generator[dict[str, any]]
+        """
+        rows = db.session.query(Rating.movie_id, Rating.rating).filter(Rating.user_id == self.id) \
+            .order_by(Rating.movie_id).yield_per(batch_size)
+
+        for movie_id, rating in rows:
+            yield {"movie_id": movie_id, "movie_rating": rating}
+
     def get_mean_rating(self):
         """
         Calculates and returns the mean rating that the user has given to all rated movies.
@@ -184,6 +252,28 @@ class User(db.Model):
         """
         return User.get_by_id(neighbor_id)
 
+    @staticmethod
+    def bulk_create_missing(user_ids):
+        """
+        Creates placeholder users for the IDs that do not exist yet, e.g. the users of an imported rating dump.
+        The placeholders get a random password, so nobody can log in as them. The caller commits the transaction.
+
+        :param user_ids: The user IDs.
+        :type user_ids: set[int]
+
+        :return: The number of created users.
+        :rtype: int
+        """
+        existing_ids = {user_id for user_id, in db.session.query(User.id).filter(User.id.in_(user_ids)).all()}
+        new_users = [{"id": user_id, "name": "Imported", "surname": f"User {user_id}",
+                      "email": f"imported-{user_id}@example.invalid", "password": secrets.token_hex(16)}
+                     for user_id in sorted(set(user_ids) - existing_ids)]
+
+        if new_users:
+            db.session.execute(db.insert(User), new_users)
+
+        return len(new_users)
+
     def validate_password(self, password):
         """
         Validate the user's password.
@@ -196,6 +286,101 @@ class User(db.Model):
         """
         return self.password == password
 
+    def _calculate_recommendations(self):
+        """
+        Calculates the recommendations of the user for the recommendation cache.
+
+        :return: The recommendations (see get_recommendations()) and the IDs of the user's neighbors, whose rating
+                 changes invalidate them.
+        :rtype: tuple[list[dict[str, any]], list[int]]
+        """
+        with instrumentation.track("recsys"):
+            rec_mechanism, truncated = self._get_rec_mechanism()
+            recommendations = rec_mechanism.get_recommendations()
+
+            # The indexed nearest neighbors come first among all neighbors, so they give the same recommendations
+            # unless they give fewer than MAX_RECOMMENDATIONS and the entry leaves out further neighbors.
+            if truncated and len(recommendations) < RecMechanism.MAX_RECOMMENDATIONS:
+                rec_mechanism, _ = self._get_rec_mechanism(all_neighbors=True)
+                recommendations = rec_mechanism.get_recommendations()
+
+            neighbor_ids = [user_id for user_id, correlation
+                            in rec_mechanism.get_spearman_correlation_coefficients().items()
+                            if correlation >= RecMechanism.MIN_CORRELATION]
+
+            return recommendations, neighbor_ids
+
+    def _get_rec_mechanism(self, all_neighbors=False):
+        """
+        Creates the recommendation mechanism for the user. The user's nearest neighbors are taken from the neighbor
+        index. If the user is not indexed yet, the neighbors are read from the correlation store, if the store was
+        filled by the batch job, or the correlation coefficients are calculated from the ratings of all users.
+        The neighbors are indexed afterwards. The index of this process follows the version of the neighbors in
+        the database (see NeighborIndex.sync()), so its entries are dropped after another process has refreshed
+        the correlation coefficients of a user.
+
+        An index entry holds the nearest NEIGHBOR_INDEX_SIZE neighbors only, which are enough for the predictions
+        (the index rejects a size below RecMechanism.MAX_NEIGHBORS, see NeighborIndex.configure()), but
+        the recommendations may need further neighbors. With all_neighbors, a full entry is not used, all neighbors
+        are read from the correlation store or calculated instead.
+
+        The mechanism works with a RatingsSnapshot: the snapshot shared by the worker processes, if it is written
+        (see RATINGS_SNAPSHOT_DIR and RATINGS_SNAPSHOT_NAME), otherwise a snapshot of the ratings it needs (the user's
+        and the neighbors', or all ratings), loaded with a single query, so the number of queries does not depend on
+        the user count. The shared snapshot does not hold the rating changes made after it was written, so the user's
+        own ratings are loaded with one more query and overlaid on it: the user's rating changes are taken into
+        account at once, the other users' changes when the snapshot is written again.
+
+        With the shared snapshot and the MinHash candidate generation enabled (see RECSYS_CANDIDATES), the correlation
+        coefficients are calculated only for the user's candidate neighbors instead of all users.
+
+        :param all_neighbors: Whether the mechanism needs all neighbors not lower than RecMechanism.MIN_CORRELATION.
+        :type all_neighbors: bool
+
+        :return: The recommendation mechanism for the user, and whether its neighbors are a full index entry, which
+                 may leave out further neighbors.
+        :rtype: tuple[RecMechanism, bool]
+        """
+        snapshot = shared_snapshot.get()
+        if snapshot is not None:
+            user_snapshot = Rating.get_snapshot([self.id])
+            target_user = UserProfile.from_ratings(self.id, user_snapshot.get_ratings(self.id),
+                                                   user_snapshot.get_mean_rating(self.id), snapshot.get_user)
+
+        # The version is read first, the neighbors calculated from the ratings read afterwards are not older.
+        version = Counter.get(NEIGHBORS_VERSION)
+        neighbor_index.sync(version)
+
+        neighbors = neighbor_index.get(self.id)
+        if neighbors is not None and all_neighbors and \
+                neighbor_index.is_truncated(neighbors, RecMechanism.MIN_CORRELATION):
+            neighbors = None
+
+        if neighbors is None and Correlation.is_filled():
+            correlations = Correlation.get_by_target_user_id(self.id)
+            indexed_neighbors = neighbor_index.put(self.id, correlations, version)
+            neighbors = list(correlations.items()) if all_neighbors else indexed_neighbors
+
+        if neighbors is not None:
+            if snapshot is None:
+                snapshot = Rating.get_snapshot([self.id] + [neighbor_id for neighbor_id, _ in neighbors])
+                target_user = snapshot.get_user(self.id)
+
+            return RecMechanism(target_user, spearman_correlation_coefficients=dict(neighbors)), \
+                not all_neighbors and neighbor_index.is_truncated(neighbors, RecMechanism.MIN_CORRELATION)
+
+        if snapshot is None:
+            snapshot = Rating.get_snapshot()
+            target_user = snapshot.get_user(self.id)
+            correlations = snapshot.get_correlations(self.id)
+        elif candidate_index.is_enabled():
+            correlations = candidate_index.get_correlations(snapshot, self.id, target_user.get_ratings())
+        else:
+            correlations = snapshot.get_correlations(self.id, target_user.get_ratings())
+        neighbor_index.put(self.id, correlations, version)
+
+        return RecMechanism(target_user, spearman_correlation_coefficients=correlations), False
+
     def _get_ratings(self):
         """
         Get the user's ratings in a formatted way.
@@ -245,3 +430,102 @@ class User(db.Model):
         :type: list[user]
         """
         return User.query.all()
+
+    @staticmethod
+    def get_all_ids():
+        """
+        Returns the IDs of all users in the database.
+
+        :return: List of the user IDs in ascending order.
+        :type: list[int]
+        """
+        return [user_id for user_id, in db.session.query(User.id).order_by(User.id).all()]
+
+    @staticmethod
+    def get_missing_ids(user_ids):
+        """
+        Returns the provided user IDs that do not belong to any user.
+
+        :param user_ids: The user IDs.
+        :type user_ids: list[int]
+
+        :return: The IDs without a user in ascending order.
+        :type: list[int]
+        """
+        existing_ids = {user_id for user_id, in db.session.query(User.id).filter(User.id.in_(set(user_ids))).all()}
+
+        return sorted(set(user_ids) - existing_ids)
+
+    @staticmethod
+    def refresh_recommendations_by_id(user_id):
+        """
+        The handler of the "recommendations" jobs, it refreshes the cached recommendations of a user.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :return: The number of recommendations, None if the user does not exist.
+        :rtype: int or None
+        """
+        user = User.get_by_id(user_id)
+
+        return None if user is None else user.refresh_recommendations()
+
+    @staticmethod
+    def precompute_recommendations(processes=None, block_size=64):
+        """
+        The handler of the "precompute" jobs, e.g. after a bulk import: the correlation store is rebuilt (see
+        Correlation.rebuild()), the neighbor index is cleared and the recommendations of all users with ratings are
+        calculated into the recommendation cache, so the next requests do not calculate them.
+
+        :param processes: The number of worker processes of the correlation store, the number of CPUs if None.
+        :type processes: int or None
+
+        :param block_size: The number of users per block of the correlation store.
+        :type block_size: int
+
+        :return: A dictionary with the following keys:
+                    - correlations (int): The number of stored correlations.
+                    - users (int): The number of users whose recommendations were calculated.
+        :rtype: dict[str, int]
+        """
+        snapshot = Rating.get_snapshot()
+        stored_count = Correlation.rebuild(snapshot, processes, block_size)
+        neighbor_index.clear()
+
+        user_ids = snapshot.get_user_ids()
+        for user_id in user_ids:
+            User.refresh_recommendations_by_id(user_id)
+            db.session.expunge_all()
+
+        return {"correlations": stored_count, "users": len(user_ids)}
+
+    @staticmethod
+    def get_batch_recommendations(user_ids, processes=None):
+        """
+        Get the movie recommendations of many users in one pass over a ratings snapshot, instead of creating
+        a recommendation mechanism for every user. The snapshot shared by the worker processes is used, if it is
+        written, otherwise the ratings of all users are loaded with a single query. The shared snapshot does not hold
+        the rating changes made after it was written, so the users' own ratings are loaded with one more query and
+        overlaid on it, as in _get_rec_mechanism().
+
+        :param user_ids: The IDs of the users.
+        :type user_ids: list[int]
+
+        :param processes: The number of worker processes, the number of CPUs if None.
+        :type processes: int or None
+
+        :return: A generator of dictionaries with the following keys, in the order of the user IDs:
+                    - user_id (int): The user's ID.
+                    - recommendations (list[dict[str, any]]): The user's recommendations, the same as
+                      get_recommendations() returns.
+        :rtype: generator[dict[str, any]]
+        """
+        snapshot = shared_snapshot.get()
+        target_snapshot = None if snapshot is None else Rating.get_snapshot(user_ids)
+        if snapshot is None:
+            snapshot = Rating.get_snapshot()
+
+        for user_id, recommendations in get_batch_recommendations(snapshot, user_ids, processes,
+                                                                  target_snapshot=target_snapshot):
+            yield {"user_id": user_id, "recommendations": recommendations}
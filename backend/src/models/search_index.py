@@ -0,0 +1,79 @@
+from sqlalchemy import DDL, event
+
+from .db_comment_model import Comment
+
+
+# The full-text search index of the movies (title, description and main actors) and of the comments: FTS5 tables,
+# which the triggers keep in sync with the movie and the comment tables, including the bulk inserts and the upserts
+# that bypass the model methods. The movie triggers fire only on the indexed columns, so the rating aggregate updates
+# do not touch the index.
+#
+# The movie index reads the text from the movie table (external content). The comment index is contentless, its rowid
+# holds the movie ID in the upper 32 bits and the comment ID in the lower ones, so the movies of the matching comments
+# are known without reading the comment table.
+SEARCH_INDEX_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS movie_fts USING fts5(
+        title, description, main_actors, content='movie', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movie_fts_insert AFTER INSERT ON movie BEGIN
+        INSERT INTO movie_fts(rowid, title, description, main_actors)
+        VALUES (new.id, new.title, new.description, new.main_actors);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movie_fts_delete AFTER DELETE ON movie BEGIN
+        INSERT INTO movie_fts(movie_fts, rowid, title, description, main_actors)
+        VALUES ('delete', old.id, old.title, old.description, old.main_actors);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movie_fts_update AFTER UPDATE OF title, description, main_actors ON movie BEGIN
+        INSERT INTO movie_fts(movie_fts, rowid, title, description, main_actors)
+        VALUES ('delete', old.id, old.title, old.description, old.main_actors);
+        INSERT INTO movie_fts(rowid, title, description, main_actors)
+        VALUES (new.id, new.title, new.description, new.main_actors);
+    END
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS comment_fts USING fts5(
+        comment, content='', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS comment_fts_insert AFTER INSERT ON comment BEGIN
+        INSERT INTO comment_fts(rowid, comment) VALUES ((new.movie_id << 32) + new.id, new.comment);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS comment_fts_delete AFTER DELETE ON comment BEGIN
+        INSERT INTO comment_fts(comment_fts, rowid, comment)
+        VALUES ('delete', (old.movie_id << 32) + old.id, old.comment);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS comment_fts_update AFTER UPDATE OF comment, movie_id ON comment BEGIN
+        INSERT INTO comment_fts(comment_fts, rowid, comment)
+        VALUES ('delete', (old.movie_id << 32) + old.id, old.comment);
+        INSERT INTO comment_fts(rowid, comment) VALUES ((new.movie_id << 32) + new.id, new.comment);
+    END
+    """
+)
+
+# The virtual tables are not part of the metadata, they are dropped together with the comment table.
+SEARCH_INDEX_DROP_DDL = (
+    "DROP TABLE IF EXISTS comment_fts",
+    "DROP TABLE IF EXISTS movie_fts"
+)
+
+
+# The search index is created by db.create_all() (e.g. the benchmarks) after the comment table, which is created
+# after the movie table. The databases created by the migrations get it from a migration.
+for statement in SEARCH_INDEX_DDL:
+    event.listen(Comment.__table__, "after_create", DDL(statement))
+
+for statement in SEARCH_INDEX_DROP_DDL:
+    event.listen(Comment.__table__, "before_drop", DDL(statement))
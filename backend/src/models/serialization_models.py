@@ -35,6 +35,34 @@ def create_prediction_model(user_namespace):
     )
 
 
+# Creates a movie ratings predictions model for API endpoints.
+def create_predictions_model(user_namespace):
+    return user_namespace.model(
+        "Predictions", {
+            "user_id": fields.Integer(),
+            "user_predicted_ratings": fields.Raw(description="Predicted ratings, key: movie ID.")
+        }
+    )
+
+
+# Creates a movie ratings predictions request model for API endpoints.
+def create_predictions_request_model(user_namespace):
+    return user_namespace.model(
+        "PredictionsRequest", {
+            "movie_ids": fields.List(fields.Integer(), example=[1, 2, 3])
+        }
+    )
+
+
+# Creates a batch recommendations request model for API endpoints.
+def create_batch_recommendations_model(user_namespace):
+    return user_namespace.model(
+        "BatchRecommendations", {
+            "user_ids": fields.Raw(description='A list of user IDs or "all".', example=[1, 2, 3])
+        }
+    )
+
+
 # Creates a movie model for API endpoints.
 def create_movie_model(movies_namespace):
     return movies_namespace.model(
@@ -47,7 +75,9 @@ def create_movie_model(movies_namespace):
             "main_actors": fields.String(),
             "description": fields.String(),
             "rating": fields.Float(),
-            "comments": fields.List(fields.Raw())
+            "comment_count": fields.Integer(),
+            "comments": fields.List(fields.Raw(), description="The first page of the comments."),
+            "comments_next_cursor": fields.String(description="The cursor of the next page of the comments.")
         }
     )
 
@@ -63,6 +93,81 @@ def create_preview_model(movies_namespace):
     )
 
 
+# Creates a page of movie previews model for API endpoints.
+def create_preview_page_model(movies_namespace, preview_model):
+    return movies_namespace.model(
+        "PreviewPage", {
+            "movies": fields.List(fields.Nested(preview_model)),
+            "next_cursor": fields.String(description="The cursor of the next page, null on the last page.")
+        }
+    )
+
+
+# Creates a facet value count model for API endpoints.
+def create_facet_count_model(movies_namespace):
+    return movies_namespace.model(
+        "FacetCount", {
+            "value": fields.Raw(description="The value of the facet, a string or a year."),
+            "count": fields.Integer(description="The number of movies with the value.")
+        }
+    )
+
+
+# Creates a model of the facet counts of the movie listings for API endpoints.
+def create_facets_model(movies_namespace, facet_count_model):
+    return movies_namespace.model(
+        "Facets", {
+            "category": fields.List(fields.Nested(facet_count_model)),
+            "country": fields.List(fields.Nested(facet_count_model)),
+            "year": fields.List(fields.Nested(facet_count_model))
+        }
+    )
+
+
+# Creates a page of sorted and filtered movie previews model with the facet counts for API endpoints.
+def create_sorted_page_model(movies_namespace, preview_model, facets_model):
+    return movies_namespace.model(
+        "SortedPreviewPage", {
+            "movies": fields.List(fields.Nested(preview_model)),
+            "next_cursor": fields.String(description="The cursor of the next page, null on the last page."),
+            "facets": fields.Nested(facets_model, description="The movie counts of the values of every facet, "
+                                                              "filtered by the filters of the other facets.")
+        }
+    )
+
+
+# Creates a typeahead title match model for API endpoints.
+def create_title_match_model(movies_namespace):
+    return movies_namespace.model(
+        "TitleMatch", {
+            "id": fields.Integer(),
+            "title": fields.String()
+        }
+    )
+
+
+# Creates a movie search result model for API endpoints.
+def create_search_result_model(movies_namespace):
+    return movies_namespace.model(
+        "SearchResult", {
+            "id": fields.Integer(),
+            "title": fields.String(),
+            "category": fields.String(),
+            "score": fields.Float(description="The relevance of the movie, higher is better.")
+        }
+    )
+
+
+# Creates a page of movie search results model for API endpoints.
+def create_search_page_model(movies_namespace, search_result_model):
+    return movies_namespace.model(
+        "SearchPage", {
+            "movies": fields.List(fields.Nested(search_result_model)),
+            "next_cursor": fields.String(description="The cursor of the next page, null on the last page.")
+        }
+    )
+
+
 # Creates a movie preview recommendation model for API endpoints.
 def create_recommendation_model(movies_namespace):
     return movies_namespace.model(
@@ -95,3 +200,58 @@ def create_comment_model(movies_namespace):
             "user_comment": fields.String()
         }
     )
+
+
+# Creates a page of movie comments model for API endpoints.
+def create_comment_page_model(movies_namespace, comment_model):
+    return movies_namespace.model(
+        "CommentPage", {
+            "comments": fields.List(fields.Nested(comment_model)),
+            "next_cursor": fields.String(description="The cursor of the next page, null on the last page.")
+        }
+    )
+
+
+# Creates a movie rating response model for API endpoints.
+def create_movie_rating_model(movies_namespace):
+    return movies_namespace.model(
+        "MovieRating", {
+            "id": fields.Integer(),
+            "title": fields.String(),
+            "rating": fields.Float(),
+            "rating_count": fields.Integer(),
+            "user_id": fields.Integer(),
+            "user_rating": fields.Float()
+        }
+    )
+
+
+# Creates a movie comment response model for API endpoints.
+def create_movie_comment_model(movies_namespace):
+    return movies_namespace.model(
+        "MovieComment", {
+            "id": fields.Integer(),
+            "title": fields.String(),
+            "comment_count": fields.Integer(),
+            "user_id": fields.Integer(),
+            "user_comment": fields.String()
+        }
+    )
+
+
+# Creates a background job model for API endpoints.
+def create_job_model(jobs_namespace):
+    return jobs_namespace.model(
+        "Job", {
+            "id": fields.Integer(),
+            "kind": fields.String(),
+            "key": fields.String(),
+            "status": fields.String(),
+            "payload": fields.Raw(),
+            "result": fields.Raw(),
+            "error": fields.String(),
+            "created_at": fields.DateTime(),
+            "started_at": fields.DateTime(),
+            "finished_at": fields.DateTime()
+        }
+    )
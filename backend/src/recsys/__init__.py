@@ -1 +1,10 @@
 from .rec_mechanism import RecMechanism
+from .spearman_matrix import SpearmanMatrix
+from .spearman_mechanism import SpearmanMechanism
+from .neighbor_index import NeighborIndex, select_nearest_neighbors
+from .minhash_index import MinHashIndex, CandidateIndex
+from .user_profile import UserProfile, RecsysUser
+from .ratings_snapshot import RatingsSnapshot, RatingsSnapshotStore, SharedRatingsSnapshot
+from .batch_recommendations import get_batch_recommendations
+from .parallel_correlations import get_parallel_neighbors
+from .recommendation_cache import RecommendationCache, LRUCacheBackend, SQLiteCacheBackend
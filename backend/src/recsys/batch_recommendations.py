@@ -0,0 +1,110 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .ratings_snapshot import RatingsSnapshot
+from .rec_mechanism import RecMechanism
+from .user_profile import UserProfile
+
+
+# The snapshots of a worker process of the pool, see _init_worker().
+_worker_snapshot = None
+_worker_target_snapshot = None
+
+
+def get_batch_recommendations(snapshot, user_ids, processes=None, chunk_size=32, target_snapshot=None):
+    """
+    Calculates the recommendations of many users in one pass over a ratings snapshot. The users are spread across
+    a pool of worker processes, every worker gets the snapshot arrays once, when it starts.
+
+    The recommendations of every user are the same as RecMechanism.get_recommendations() returns for the user.
+
+    :param snapshot: The snapshot of the ratings of all users.
+    :type snapshot: RatingsSnapshot
+
+    :param user_ids: The IDs of the users.
+    :type user_ids: list[int]
+
+    :param processes: The number of worker processes, the number of CPUs if None. With a single process,
+                      the recommendations are calculated in the current process.
+    :type processes: int or None
+
+    :param chunk_size: The number of users sent to a worker at once.
+    :type chunk_size: int
+
+    :param target_snapshot: The snapshot of the users' own ratings, e.g. newer than a shared snapshot, whose
+                            ratings are overlaid on the snapshot for each user. The snapshot's ratings if None.
+    :type target_snapshot: RatingsSnapshot or None
+
+    :return: A generator of (user ID, recommendations) tuples in the order of the user IDs, the recommendations are
+             yielded as soon as they are calculated.
+    :rtype: generator[tuple[int, list[dict[str, any]]]]
+    """
+    processes = min(processes or os.cpu_count() or 1, len(user_ids))
+
+    if processes <= 1:
+        for user_id in user_ids:
+            yield user_id, _get_recommendations(snapshot, user_id, target_snapshot)
+        return
+
+    arrays = {array_name: getattr(snapshot, array_name) for array_name in RatingsSnapshot.ARRAY_NAMES}
+    target_arrays = None if target_snapshot is None else \
+        {array_name: getattr(target_snapshot, array_name) for array_name in RatingsSnapshot.ARRAY_NAMES}
+
+    with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(arrays, target_arrays)) as executor:
+        yield from zip(user_ids, executor.map(_get_worker_recommendations, user_ids, chunksize=chunk_size))
+
+
+def _get_recommendations(snapshot, user_id, target_snapshot=None):
+    """
+    Calculates the recommendations of a user from the snapshot.
+
+    :param snapshot: The snapshot of the ratings of all users.
+    :type snapshot: RatingsSnapshot
+
+    :param user_id: The user ID.
+    :type user_id: int
+
+    :param target_snapshot: The snapshot of the user's own ratings, the snapshot's ratings if None.
+    :type target_snapshot: RatingsSnapshot or None
+
+    :return: The recommendations, see RecMechanism.get_recommendations().
+    :rtype: list[dict[str, any]]
+    """
+    if target_snapshot is None:
+        target_user = snapshot.get_user(user_id)
+    else:
+        target_user = UserProfile.from_ratings(user_id, target_snapshot.get_ratings(user_id),
+                                               target_snapshot.get_mean_rating(user_id), snapshot.get_user)
+
+    rec_mechanism = RecMechanism(target_user, spearman_correlation_coefficients=snapshot.get_correlations(
+        user_id, target_user.get_ratings()))
+
+    return rec_mechanism.get_recommendations()
+
+
+def _init_worker(arrays, target_arrays=None):
+    """
+    Creates the snapshots of the worker process from the snapshot arrays.
+
+    :param arrays: The snapshot arrays, key: array name (see RatingsSnapshot.ARRAY_NAMES).
+    :type arrays: dict[str, numpy.ndarray]
+
+    :param target_arrays: The arrays of the snapshot of the users' own ratings, if any.
+    :type target_arrays: dict[str, numpy.ndarray] or None
+    """
+    global _worker_snapshot, _worker_target_snapshot
+    _worker_snapshot = RatingsSnapshot(**arrays)
+    _worker_target_snapshot = None if target_arrays is None else RatingsSnapshot(**target_arrays)
+
+
+def _get_worker_recommendations(user_id):
+    """
+    Calculates the recommendations of a user in a worker process.
+
+    :param user_id: The user ID.
+    :type user_id: int
+
+    :return: The recommendations, see RecMechanism.get_recommendations().
+    :rtype: list[dict[str, any]]
+    """
+    return _get_recommendations(_worker_snapshot, user_id, _worker_target_snapshot)
@@ -0,0 +1,272 @@
+import threading
+
+import numpy as np
+
+from .spearman_matrix import SpearmanMatrix
+
+
+# The Mersenne prime 2^31 - 1, the modulus of the MinHash hash functions.
+_PRIME = (1 << 31) - 1
+
+
+class MinHashIndex:
+    """
+    A candidate generator for the nearest neighbors of a user. The set of the rated movies of every user of
+    a RatingsSnapshot is summarized by a MinHash signature (the minimum of num_hashes random hash functions over the
+    movies), the share of equal signature values of two users estimates the Jaccard similarity of their rated movies.
+
+    The signatures are split into bands of band_size values (locality-sensitive hashing), the users with an equal
+    band share a bucket. The candidates of a user are the users sharing a bucket in any band, ranked by the estimated
+    Jaccard similarity, so the exact Spearman's correlation is calculated only for a shortlist instead of every user.
+    Users who rated no common movies have no correlation, users with a large overlap are found with a high
+    probability: more hashes per band find fewer but more similar candidates, more bands find more candidates.
+
+    :ivar snapshot: The snapshot of the ratings of all users.
+    :type snapshot: RatingsSnapshot
+
+    :ivar num_hashes: The number of hash functions (the signature length), a multiple of band_size.
+    :type num_hashes: int
+
+    :ivar band_size: The number of signature values per band.
+    :type band_size: int
+
+    :ivar signatures: The signature of every snapshot row, rows × num_hashes.
+    :type signatures: numpy.ndarray
+
+    Usage:
+    minhash_index = MinHashIndex(snapshot, num_hashes=32, band_size=1)
+    correlations = minhash_index.get_correlations(target_user_id, max_candidates=300)
+    """
+
+    def __init__(self, snapshot, num_hashes=32, band_size=1, seed=0):
+        """
+        Initialize the MinHashIndex, the signatures and the buckets of all snapshot users are calculated.
+
+        :param snapshot: The snapshot of the ratings of all users.
+        :type snapshot: RatingsSnapshot
+
+        :param num_hashes: The number of hash functions, a multiple of band_size.
+        :type num_hashes: int
+
+        :param band_size: The number of signature values per band.
+        :type band_size: int
+
+        :param seed: The seed of the random hash functions.
+        :type seed: int
+        """
+        if num_hashes < band_size or num_hashes % band_size:
+            raise ValueError("The number of hashes must be a multiple of the band size.")
+
+        self.snapshot = snapshot
+        self.num_hashes = num_hashes
+        self.band_size = band_size
+
+        self.signatures = self._calculate_signatures(snapshot, num_hashes, seed)
+        self._bands = [self._get_band_buckets(self.signatures[:, start:start + band_size])
+                       for start in range(0, num_hashes, band_size)]
+
+    def get_candidates(self, user_id, max_candidates):
+        """
+        Returns the candidate neighbors of the user, the users sharing a bucket with the user in any band, ordered by
+        the estimated Jaccard similarity of their rated movies in descending order (ties by the user ID).
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :param max_candidates: The maximum number of candidates.
+        :type max_candidates: int
+
+        :return: The candidate user IDs, an empty list if the user is not in the snapshot.
+        :rtype: list[int]
+        """
+        row = self.snapshot._get_row(user_id)
+        if row is None:
+            return []
+
+        rows = []
+        for keys, order, sorted_keys in self._bands:
+            start = np.searchsorted(sorted_keys, keys[row], side="left")
+            end = np.searchsorted(sorted_keys, keys[row], side="right")
+            rows.append(order[start:end])
+
+        rows = np.unique(np.concatenate(rows))
+        rows = rows[rows != row]
+        if not len(rows):
+            return []
+
+        similarities = (self.signatures[rows] == self.signatures[row]).mean(axis=1)
+        user_ids = self.snapshot.user_ids[rows]
+        best = np.lexsort((user_ids, -similarities))[:max_candidates]
+
+        return user_ids[best].tolist()
+
+    def get_correlations(self, user_id, max_candidates, ratings=None):
+        """
+        Calculates the exact Spearman's rank correlation coefficients between the user and its candidate neighbors
+        only, see get_candidates(). The candidates are scored by SpearmanMatrix over a sub-snapshot of their ratings,
+        which gives the same coefficients as SpearmanMechanism.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :param max_candidates: The maximum number of candidates, the knob between the recall of the nearest
+                               neighbors and the latency.
+        :type max_candidates: int
+
+        :param ratings: The user's current ratings, which are scored instead of the snapshot's ratings, e.g. after
+                        the user's ratings have changed. The candidates are still found by the snapshot's ratings.
+        :type ratings: dict[int, float] or None
+
+        :return: Key: candidate user ID, value: correlation coefficient.
+        :rtype: dict[int, float]
+        """
+        candidates = self.snapshot.get_sub_snapshot(self.get_candidates(user_id, max_candidates))
+
+        return SpearmanMatrix(candidates).get_correlations(
+            self.snapshot.get_ratings(user_id) if ratings is None else ratings, user_id)
+
+    @staticmethod
+    def _calculate_signatures(snapshot, num_hashes, seed):
+        """
+        Calculates the MinHash signatures of all snapshot rows, the hash functions are (a * x + b) mod 2^31 - 1
+        over the movie indices.
+
+        :param snapshot: The snapshot of the ratings of all users.
+        :type snapshot: RatingsSnapshot
+
+        :param num_hashes: The number of hash functions.
+        :type num_hashes: int
+
+        :param seed: The seed of the random hash functions.
+        :type seed: int
+
+        :return: The signatures, rows × num_hashes.
+        :rtype: numpy.ndarray
+        """
+        rng = np.random.default_rng(seed)
+        multipliers = rng.integers(1, _PRIME, size=num_hashes, dtype=np.int64)
+        increments = rng.integers(0, _PRIME, size=num_hashes, dtype=np.int64)
+
+        signatures = np.empty((len(snapshot.user_ids), num_hashes), dtype=np.uint32)
+        if not len(snapshot.user_ids):
+            return signatures
+
+        # Every snapshot row has at least one rating, so every reduceat segment is non-empty.
+        movie_indices = snapshot.movie_indices.astype(np.int64)
+        for column, (multiplier, increment) in enumerate(zip(multipliers, increments)):
+            hashes = (movie_indices * multiplier + increment) % _PRIME
+            signatures[:, column] = np.minimum.reduceat(hashes, snapshot.indptr[:-1])
+
+        return signatures
+
+    @staticmethod
+    def _get_band_buckets(band):
+        """
+        Hashes the band of every row into a bucket key and sorts the rows by their keys.
+
+        :param band: The band of the signatures, rows × band_size.
+        :type band: numpy.ndarray
+
+        :return: The bucket key of every row, the rows ordered by their keys and the sorted keys.
+        :rtype: tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        """
+        keys = np.zeros(len(band), dtype=np.uint64)
+        for column in range(band.shape[1]):
+            keys = keys * np.uint64(_PRIME) + band[:, column].astype(np.uint64)
+
+        order = np.argsort(keys, kind="stable")
+
+        return keys, order, keys[order]
+
+
+class CandidateIndex:
+    """
+    The application-wide MinHash candidate generation (see MinHashIndex), configured from the Flask application
+    config. The MinHashIndex of a snapshot is built on the first request and reused until the snapshot changes,
+    so it pays off with a long-lived snapshot, e.g. the snapshot shared by the worker processes.
+
+    :ivar max_candidates: The maximum number of candidates scored exactly, 0 disables the candidate generation.
+    :type max_candidates: int
+
+    :ivar num_hashes: The number of MinHash hash functions.
+    :type num_hashes: int
+
+    :ivar band_size: The number of signature values per band.
+    :type band_size: int
+    """
+
+    def __init__(self, max_candidates=0, num_hashes=32, band_size=1):
+        """
+        Initialize the CandidateIndex.
+
+        :param max_candidates: The maximum number of candidates scored exactly, 0 disables the candidate generation.
+        :type max_candidates: int
+
+        :param num_hashes: The number of MinHash hash functions.
+        :type num_hashes: int
+
+        :param band_size: The number of signature values per band.
+        :type band_size: int
+        """
+        self.max_candidates = max_candidates
+        self.num_hashes = num_hashes
+        self.band_size = band_size
+
+        self._lock = threading.Lock()
+        self._minhash_index = None
+
+    def init_app(self, app):
+        """
+        Configures the candidate generation from the Flask application config (RECSYS_CANDIDATES,
+        RECSYS_MINHASH_HASHES and RECSYS_MINHASH_BAND_SIZE).
+
+        :param app: The Flask application.
+        :type app: Flask
+        """
+        self.max_candidates = app.config.get("RECSYS_CANDIDATES", self.max_candidates)
+        self.num_hashes = app.config.get("RECSYS_MINHASH_HASHES", self.num_hashes)
+        self.band_size = app.config.get("RECSYS_MINHASH_BAND_SIZE", self.band_size)
+        self._minhash_index = None
+
+    def is_enabled(self):
+        """
+        Whether the candidate generation is enabled.
+
+        :return: True if the correlations are calculated for the candidates only.
+        :rtype: bool
+        """
+        return self.max_candidates > 0
+
+    def get_correlations(self, snapshot, user_id, ratings=None):
+        """
+        Calculates the Spearman's rank correlation coefficients between the user and its candidate neighbors.
+
+        :param snapshot: The snapshot of the ratings of all users.
+        :type snapshot: RatingsSnapshot
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :param ratings: The user's current ratings, the snapshot's ratings if None, see MinHashIndex.get_correlations().
+        :type ratings: dict[int, float] or None
+
+        :return: Key: candidate user ID, value: correlation coefficient.
+        :rtype: dict[int, float]
+        """
+        return self.get_minhash_index(snapshot).get_correlations(user_id, self.max_candidates, ratings)
+
+    def get_minhash_index(self, snapshot):
+        """
+        Returns the MinHashIndex of the snapshot, it is built if the snapshot changed.
+
+        :param snapshot: The snapshot of the ratings of all users.
+        :type snapshot: RatingsSnapshot
+
+        :return: The MinHashIndex of the snapshot.
+        :rtype: MinHashIndex
+        """
+        with self._lock:
+            if self._minhash_index is None or self._minhash_index.snapshot is not snapshot:
+                self._minhash_index = MinHashIndex(snapshot, self.num_hashes, self.band_size)
+
+            return self._minhash_index
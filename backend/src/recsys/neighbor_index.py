@@ -0,0 +1,343 @@
+import heapq
+import sys
+
+
+class NeighborIndex:
+    """
+    An in-process index of the nearest neighbors of every user. Instead of the full dictionary of the Spearman's
+    correlation coefficients, only the top MAX_NEIGHBORS neighbors with a correlation not lower than MIN_CORRELATION
+    are kept for each user, ordered by the correlation in descending order (ties by the user ID).
+
+    The index is filled on request (a user without an entry is "cold") and updated when a user's ratings change,
+    see update_user(). The index lives in the memory of one process, so it follows a version of the neighbors shared
+    by all processes (see sync()): a rating change updates the index of the process that refreshed the user's
+    correlation coefficients, the other worker processes (e.g. of gunicorn) drop their entries on their next lookup.
+
+    :ivar max_neighbors: The maximum number of neighbors kept for each user (K).
+    :type max_neighbors: int
+
+    :ivar min_correlation: The minimum correlation of a kept neighbor.
+    :type min_correlation: float
+
+    :ivar required_neighbors: The smallest allowed size (K), the entries must hold the neighbors of a prediction.
+    :type required_neighbors: int
+
+    :ivar required_min_correlation: The highest allowed minimum correlation of a kept neighbor.
+    :type required_min_correlation: float
+
+    :ivar neighbors: A dictionary, key: user ID, value: a list of (neighbor user ID, correlation) tuples.
+    :type neighbors: dict[int, list[tuple[int, float]]]
+
+    :ivar version: The version of the neighbors the entries were calculated at, None before the first sync().
+    :type version: int or None
+
+    :ivar hits: The number of lookups that found the user in the index.
+    :type hits: int
+
+    :ivar misses: The number of lookups of cold users.
+    :type misses: int
+
+    Usage:
+    neighbor_index = NeighborIndex(max_neighbors=50)
+    neighbor_index.sync(version)
+    neighbors = neighbor_index.get(user_id)
+    if neighbors is None:
+        neighbors = neighbor_index.put(user_id, correlation_coefficients, version)
+    """
+
+    def __init__(self, max_neighbors=50, min_correlation=0.7, required_neighbors=0, required_min_correlation=1.0):
+        """
+        Initialize an empty NeighborIndex.
+
+        :param max_neighbors: The maximum number of neighbors kept for each user (K).
+        :type max_neighbors: int
+
+        :param min_correlation: The minimum correlation of a kept neighbor, the same as RecMechanism.MIN_CORRELATION
+                                by default.
+        :type min_correlation: float
+
+        :param required_neighbors: The smallest allowed size (K), e.g. RecMechanism.MAX_NEIGHBORS, see configure().
+        :type required_neighbors: int
+
+        :param required_min_correlation: The highest allowed minimum correlation, e.g. RecMechanism.MIN_CORRELATION.
+        :type required_min_correlation: float
+        """
+        self.max_neighbors = max_neighbors
+        self.min_correlation = min_correlation
+        self.required_neighbors = required_neighbors
+        self.required_min_correlation = required_min_correlation
+
+        self.neighbors = {}
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        """
+        The number of users in the index.
+
+        :return: The number of indexed users.
+        :rtype: int
+        """
+        return len(self.neighbors)
+
+    def init_app(self, app):
+        """
+        Configures the index from the Flask application config (NEIGHBOR_INDEX_SIZE, NEIGHBOR_INDEX_MIN_CORRELATION).
+
+        :param app: The Flask application.
+        :type app: Flask
+        """
+        self.configure(app.config.get("NEIGHBOR_INDEX_SIZE", self.max_neighbors),
+                       app.config.get("NEIGHBOR_INDEX_MIN_CORRELATION", self.min_correlation))
+
+    def configure(self, max_neighbors, min_correlation):
+        """
+        Sets the size (K) and the minimum correlation of the index and clears it. The predictions are served from
+        the index entries, so an entry must hold the nearest required_neighbors neighbors not lower than
+        required_min_correlation.
+
+        :param max_neighbors: The maximum number of neighbors kept for each user (K).
+        :type max_neighbors: int
+
+        :param min_correlation: The minimum correlation of a kept neighbor.
+        :type min_correlation: float
+
+        :raises ValueError: If the entries could not hold the neighbors of a prediction.
+        """
+        if max_neighbors < self.required_neighbors:
+            raise ValueError(f"The neighbor index size must be at least {self.required_neighbors}.")
+
+        if min_correlation > self.required_min_correlation:
+            raise ValueError(f"The minimum correlation of the neighbor index must not be higher than "
+                             f"{self.required_min_correlation}.")
+
+        self.max_neighbors = max_neighbors
+        self.min_correlation = min_correlation
+        self.clear()
+
+    def sync(self, version):
+        """
+        Follows the version of the neighbors shared by all processes, e.g. a counter in the database, which is
+        incremented whenever the correlation coefficients of a user are refreshed in any process. All entries are
+        dropped if the version has changed since they were calculated. The version has to be read before
+        the neighbors to be indexed are calculated (see put()).
+
+        :param version: The current version of the neighbors.
+        :type version: int
+        """
+        if version != self.version:
+            self.neighbors = {}
+            self.version = version
+
+    def get(self, user_id):
+        """
+        Looks up the nearest neighbors of a user.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :return: A list of (neighbor user ID, correlation) tuples, or None if the user is not indexed yet.
+        :rtype: list[tuple[int, float]] or None
+        """
+        neighbors = self.neighbors.get(user_id)
+
+        if neighbors is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return neighbors
+
+    def put(self, user_id, correlation_coefficients, version=None):
+        """
+        Indexes the nearest neighbors of a user.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :param correlation_coefficients: The user's correlation coefficients, key: user ID, value: correlation.
+        :type correlation_coefficients: dict[int, float]
+
+        :param version: The version of the neighbors read before the coefficients were calculated (see sync()),
+                        the entry is not stored if the index has moved to another version meanwhile. Optional.
+        :type version: int or None
+
+        :return: The nearest neighbors, a list of (neighbor user ID, correlation) tuples.
+        :rtype: list[tuple[int, float]]
+        """
+        neighbors = select_nearest_neighbors(correlation_coefficients, self.max_neighbors, self.min_correlation)
+        if version is None or version == self.version:
+            self.neighbors[user_id] = neighbors
+
+        return neighbors
+
+    def is_truncated(self, neighbors, min_correlation):
+        """
+        Checks whether an index entry may leave out some neighbors not lower than min_correlation: the entry is full
+        (the nearest max_neighbors neighbors), or the index keeps only the neighbors above min_correlation.
+
+        :param neighbors: The index entry, a list of (neighbor user ID, correlation) tuples.
+        :type neighbors: list[tuple[int, float]]
+
+        :param min_correlation: The minimum correlation of the needed neighbors, e.g. RecMechanism.MIN_CORRELATION.
+        :type min_correlation: float
+
+        :return: True if the entry may not hold all neighbors not lower than min_correlation.
+        :rtype: bool
+        """
+        return len(neighbors) >= self.max_neighbors or self.min_correlation > min_correlation
+
+    def update_user(self, user_id, correlation_coefficients, version=None):
+        """
+        Updates the index after the user's ratings have changed. The user's own entry is replaced and the user is
+        moved within the entries of the other indexed users. A full entry, where the user moved below its last
+        neighbor, is dropped, because the next nearest neighbor is not known.
+
+        :param user_id: The ID of the user whose ratings have changed.
+        :type user_id: int
+
+        :param correlation_coefficients: The user's new correlation coefficients, key: user ID, value: correlation.
+        :type correlation_coefficients: dict[int, float]
+
+        :param version: The version of the neighbors after the change (see sync()). If the index missed a change
+                        made by another process, i.e. it was not at the previous version, all entries are dropped
+                        instead. Optional.
+        :type version: int or None
+        """
+        if version is not None and self.version != version - 1:
+            self.sync(version)
+            return
+
+        for another_user_id in list(self.neighbors):
+            if another_user_id == user_id:
+                continue
+
+            neighbors = self.neighbors[another_user_id]
+            was_full = len(neighbors) >= self.max_neighbors
+            kept_neighbors = [neighbor for neighbor in neighbors if neighbor[0] != user_id]
+            removed = len(kept_neighbors) != len(neighbors)
+
+            correlation = correlation_coefficients.get(another_user_id, 0)
+            if removed and was_full and (correlation < self.min_correlation or
+                                         _neighbor_order((user_id, correlation)) > _neighbor_order(neighbors[-1])):
+                del self.neighbors[another_user_id]
+                continue
+
+            if correlation >= self.min_correlation:
+                kept_neighbors.append((user_id, correlation))
+                kept_neighbors.sort(key=_neighbor_order)
+                del kept_neighbors[self.max_neighbors:]
+
+            self.neighbors[another_user_id] = kept_neighbors
+
+        if user_id in self.neighbors:
+            self.put(user_id, correlation_coefficients)
+
+        if version is not None:
+            self.version = version
+
+    def invalidate(self, user_id):
+        """
+        Drops the user's entry and all entries that contain the user.
+
+        :param user_id: The user ID.
+        :type user_id: int
+        """
+        self.neighbors.pop(user_id, None)
+
+        for another_user_id in [another_user_id for another_user_id, neighbors in self.neighbors.items()
+                                if any(neighbor[0] == user_id for neighbor in neighbors)]:
+            del self.neighbors[another_user_id]
+
+    def clear(self):
+        """
+        Drops all entries and resets the version and the metrics.
+        """
+        self.neighbors = {}
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+
+    def get_metrics(self):
+        """
+        Returns the index metrics, which help to choose the index size (K) that fits the memory budget.
+
+        :return: A dictionary with the following keys:
+                    - max_neighbors (int): The configured K.
+                    - min_correlation (float): The configured correlation threshold.
+                    - version (int or None): The version of the neighbors the entries were calculated at.
+                    - users (int): The number of indexed users.
+                    - neighbors (int): The total number of indexed neighbors.
+                    - size_bytes (int): The approximate memory used by the entries.
+                    - hits (int): The number of lookups of indexed users.
+                    - misses (int): The number of lookups of cold users.
+                    - hit_rate (float): The ratio of hits to all lookups.
+        :rtype: dict[str, any]
+        """
+        lookups = self.hits + self.misses
+
+        return {
+            "max_neighbors": self.max_neighbors,
+            "min_correlation": self.min_correlation,
+            "version": self.version,
+            "users": len(self.neighbors),
+            "neighbors": sum(len(neighbors) for neighbors in self.neighbors.values()),
+            "size_bytes": sum(_get_entry_size(neighbors) for neighbors in self.neighbors.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0
+        }
+
+
+def select_nearest_neighbors(correlation_coefficients, max_neighbors=None, min_correlation=None):
+    """
+    Selects the nearest neighbors with a heap instead of sorting all correlation coefficients.
+
+    :param correlation_coefficients: The correlation coefficients, key: user ID, value: correlation.
+    :type correlation_coefficients: dict[int, float]
+
+    :param max_neighbors: The maximum number of selected neighbors, all of them if None.
+    :type max_neighbors: int or None
+
+    :param min_correlation: The minimum correlation of a selected neighbor, no limit if None.
+    :type min_correlation: float or None
+
+    :return: A list of (neighbor user ID, correlation) tuples ordered by the correlation in descending order,
+             ties by the user ID.
+    :rtype: list[tuple[int, float]]
+    """
+    neighbors = correlation_coefficients.items() if min_correlation is None else \
+        [neighbor for neighbor in correlation_coefficients.items() if neighbor[1] >= min_correlation]
+
+    if max_neighbors is None:
+        return sorted(neighbors, key=_neighbor_order)
+
+    return heapq.nsmallest(max_neighbors, neighbors, key=_neighbor_order)
+
+
+def _neighbor_order(neighbor):
+    """
+    The sort key of the neighbors: correlation in descending order, then user ID in ascending order.
+
+    :param neighbor: A (neighbor user ID, correlation) tuple.
+    :type neighbor: tuple[int, float]
+
+    :return: The sort key.
+    :rtype: tuple[float, int]
+    """
+    return -neighbor[1], neighbor[0]
+
+
+def _get_entry_size(neighbors):
+    """
+    Approximates the memory used by one index entry.
+
+    :param neighbors: A list of (neighbor user ID, correlation) tuples.
+    :type neighbors: list[tuple[int, float]]
+
+    :return: The approximate size in bytes.
+    :rtype: int
+    """
+    return sys.getsizeof(neighbors) + sum(sys.getsizeof(neighbor) + sys.getsizeof(neighbor[0]) +
+                                          sys.getsizeof(neighbor[1]) for neighbor in neighbors)
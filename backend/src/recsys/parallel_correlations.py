@@ -0,0 +1,143 @@
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .ratings_snapshot import RatingsSnapshot
+
+
+# The snapshot of a worker process of the pool, see _init_worker().
+_worker_snapshot = None
+
+
+def get_parallel_neighbors(snapshot, user_ids=None, processes=None, block_size=64, max_neighbors=None,
+                           min_correlation=None):
+    """
+    Calculates the nearest neighbors of many users, e.g. for the correlation store or the neighbor index, on a pool
+    of worker processes. The users are split into blocks of block_size users, a worker calculates the block of the
+    correlation matrix between the block users and all snapshot users (see SpearmanMatrix.get_block_correlations())
+    and selects the nearest neighbors of every block user, so only the top-K neighbors are sent back.
+
+    The snapshot is published into a shared memory block for the run, the workers attach it read-only instead of
+    receiving a copy of the arrays. The block is removed afterwards.
+
+    The neighbors of every user are the same as select_nearest_neighbors() selects from the user's coefficients
+    (RatingsSnapshot.get_correlations()). The blocks are independent, so the run time scales near-linearly with the
+    number of processes as long as there are more blocks than processes.
+
+    :param snapshot: The snapshot of the ratings of all users.
+    :type snapshot: RatingsSnapshot
+
+    :param user_ids: The IDs of the users, all snapshot users if None.
+    :type user_ids: list[int] or None
+
+    :param processes: The number of worker processes, the number of CPUs if None. With a single process,
+                      the neighbors are calculated in the current process.
+    :type processes: int or None
+
+    :param block_size: The number of users of a block, the unit of work of a worker.
+    :type block_size: int
+
+    :param max_neighbors: The maximum number of neighbors of a user (K), all users if None.
+    :type max_neighbors: int or None
+
+    :param min_correlation: The minimum correlation of a neighbor, no limit if None.
+    :type min_correlation: float or None
+
+    :return: A generator of (user ID, neighbors) tuples in the order of the user IDs, the neighbors are a list of
+             (neighbor user ID, correlation) tuples ordered by the correlation in descending order, ties by the user
+             ID. The neighbors of a block are yielded as soon as the block is calculated.
+    :rtype: generator[tuple[int, list[tuple[int, float]]]]
+    """
+    user_ids = snapshot.get_user_ids() if user_ids is None else list(user_ids)
+    blocks = [user_ids[start:start + block_size] for start in range(0, len(user_ids), block_size)]
+    processes = min(processes or os.cpu_count() or 1, len(blocks))
+
+    if processes <= 1:
+        for block in blocks:
+            yield from _get_block_neighbors(snapshot, block, max_neighbors, min_correlation)
+        return
+
+    name = f"ratings-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    snapshot.publish(name)
+    try:
+        with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(name,)) as executor:
+            block_count = len(blocks)
+            for block_neighbors in executor.map(_get_worker_block_neighbors, blocks, [max_neighbors] * block_count,
+                                                [min_correlation] * block_count):
+                yield from block_neighbors
+    finally:
+        RatingsSnapshot.unpublish(name)
+
+
+def _get_block_neighbors(snapshot, user_ids, max_neighbors, min_correlation):
+    """
+    Calculates the block of the correlation matrix of the users and selects their nearest neighbors.
+
+    :param snapshot: The snapshot of the ratings of all users.
+    :type snapshot: RatingsSnapshot
+
+    :param user_ids: The IDs of the block users.
+    :type user_ids: list[int]
+
+    :param max_neighbors: The maximum number of neighbors of a user (K), all users if None.
+    :type max_neighbors: int or None
+
+    :param min_correlation: The minimum correlation of a neighbor, no limit if None.
+    :type min_correlation: float or None
+
+    :return: A list of (user ID, neighbors) tuples, see get_parallel_neighbors().
+    :rtype: list[tuple[int, list[tuple[int, float]]]]
+    """
+    block = snapshot.get_spearman_matrix().get_block_correlations([snapshot.get_ratings(user_id)
+                                                                   for user_id in user_ids])
+    snapshot_user_ids = snapshot.user_ids
+
+    block_neighbors = []
+    for user_id, correlations in zip(user_ids, block):
+        candidates = np.flatnonzero(snapshot_user_ids != user_id)
+        if min_correlation is not None:
+            candidates = candidates[correlations[candidates] >= min_correlation]
+
+        # Only the candidates not below the K-th highest correlation can be neighbors, the rest is not sorted.
+        if max_neighbors is not None and len(candidates) > max_neighbors:
+            threshold = np.partition(correlations[candidates], len(candidates) - max_neighbors)[-max_neighbors]
+            candidates = candidates[correlations[candidates] >= threshold]
+
+        order = np.lexsort((snapshot_user_ids[candidates], -correlations[candidates]))[:max_neighbors]
+        neighbors = candidates[order]
+        block_neighbors.append((user_id, list(zip(snapshot_user_ids[neighbors].tolist(),
+                                                  correlations[neighbors].tolist()))))
+
+    return block_neighbors
+
+
+def _init_worker(name):
+    """
+    Attaches the snapshot published for the run in the worker process.
+
+    :param name: The name of the shared memory block of the snapshot.
+    :type name: str
+    """
+    global _worker_snapshot
+    _worker_snapshot = RatingsSnapshot.attach(name)
+
+
+def _get_worker_block_neighbors(user_ids, max_neighbors, min_correlation):
+    """
+    Calculates the nearest neighbors of a block of users in a worker process.
+
+    :param user_ids: The IDs of the block users.
+    :type user_ids: list[int]
+
+    :param max_neighbors: The maximum number of neighbors of a user (K), all users if None.
+    :type max_neighbors: int or None
+
+    :param min_correlation: The minimum correlation of a neighbor, no limit if None.
+    :type min_correlation: float or None
+
+    :return: A list of (user ID, neighbors) tuples, see get_parallel_neighbors().
+    :rtype: list[tuple[int, list[tuple[int, float]]]]
+    """
+    return _get_block_neighbors(_worker_snapshot, user_ids, max_neighbors, min_correlation)
@@ -0,0 +1,727 @@
+import json
+import mmap
+import os
+import re
+import tempfile
+import time
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from .spearman_matrix import SpearmanMatrix
+from .user_profile import UserProfile
+
+
+class RatingsSnapshot:
+    """
+    A compact, read-only snapshot of the rating table, which is the data source of the recommendation mechanism
+    instead of the ORM User and Rating objects.
+
+    The ratings are stored as CSR (compressed sparse row) arrays: the ratings of the user in row i are the entries
+    indptr[i]:indptr[i + 1] of the movie_indices, ratings and rating_ranks arrays. The snapshot can be published into
+    a shared memory block once and attached read-only by every worker process, so the workers do not have to load
+    the ratings on every request (see publish() and attach()), or saved into a binary file, which is memory-mapped
+    instead of loading the rating table on a cold start (see save() and load()).
+
+    :ivar user_ids: The user IDs of the rows.
+    :type user_ids: numpy.ndarray
+
+    :ivar indptr: The row pointers, the ratings of row i are the entries indptr[i]:indptr[i + 1].
+    :type indptr: numpy.ndarray
+
+    :ivar movie_ids: The sorted IDs of all rated movies, the movie_indices point into it.
+    :type movie_ids: numpy.ndarray
+
+    :ivar movie_indices: The movie index of every rating entry.
+    :type movie_indices: numpy.ndarray
+
+    :ivar ratings: The rating value of every rating entry, float32 if the values fit into it exactly.
+    :type ratings: numpy.ndarray
+
+    :ivar rating_ranks: The rank of every rating entry's value among all distinct rating values (starting with 1).
+                        SpearmanMatrix derives the Spearman's ranks from them.
+    :type rating_ranks: numpy.ndarray
+
+    :ivar mean_ratings: The mean rating of every row.
+    :type mean_ratings: numpy.ndarray
+
+    Usage:
+    snapshot = RatingsSnapshot.from_columns(user_ids, movie_ids, ratings)
+    rec_mechanism = RecMechanism(snapshot.get_user(target_user_id), snapshot.get_users())
+
+    Sharing the snapshot between processes:
+    snapshot.publish("ratings")                     # once, e.g. in the master process
+    snapshot = RatingsSnapshot.attach("ratings")    # in every worker
+    snapshot.is_retired()                           # True after RatingsSnapshot.unpublish("ratings")
+
+    Saving the snapshot into a file:
+    snapshot.save("ratings.snapshot")
+    snapshot = RatingsSnapshot.load("ratings.snapshot")
+    """
+
+    FORMAT_VERSION = 1
+    ARRAY_NAMES = ("user_ids", "indptr", "movie_ids", "movie_indices", "ratings", "rating_ranks", "mean_ratings")
+
+    def __init__(self, user_ids, indptr, movie_ids, movie_indices, ratings, rating_ranks, mean_ratings,
+                 buffer=None):
+        """
+        Initialize the RatingsSnapshot with its CSR arrays (see the class attributes). Use from_columns(),
+        from_users_ratings(), attach() or load() to create a snapshot.
+
+        :param buffer: The shared memory block or the memory-mapped file the arrays are views of, if any.
+        :type buffer: shared_memory.SharedMemory or numpy.memmap or None
+        """
+        self.user_ids = user_ids
+        self.indptr = indptr
+        self.movie_ids = movie_ids
+        self.movie_indices = movie_indices
+        self.ratings = ratings
+        self.rating_ranks = rating_ranks
+        self.mean_ratings = mean_ratings
+
+        self._buffer = buffer
+        self._user_rows = None
+        self._spearman_matrix = None
+
+    @classmethod
+    def from_columns(cls, user_ids, movie_ids, ratings):
+        """
+        Creates the snapshot from the (user ID, movie ID, rating) columns of the rating table. The rows are in the
+        order the users first appear in the columns, the ratings of a user keep their order. If a user rated a movie
+        more than once, the last rating is kept, while the mean rating counts all of them (as User.get_mean_rating()).
+
+        :param user_ids: The user ID column.
+        :type user_ids: list[int]
+
+        :param movie_ids: The movie ID column.
+        :type movie_ids: list[int]
+
+        :param ratings: The rating value column.
+        :type ratings: list[float]
+
+        :return: The snapshot.
+        :rtype: RatingsSnapshot
+        """
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        ratings = np.asarray(ratings, dtype=np.float64)
+
+        # Rows in the order of the first appearance of the users.
+        unique_user_ids, first_positions, entry_users = np.unique(user_ids, return_index=True, return_inverse=True)
+        user_order = np.argsort(first_positions, kind="stable")
+        user_rows = np.empty(len(user_order), dtype=np.int64)
+        user_rows[user_order] = np.arange(len(user_order))
+        entry_rows = user_rows[entry_users.ravel()]
+
+        ratings_counts = np.bincount(entry_rows, minlength=len(user_order))
+        mean_ratings = np.bincount(entry_rows, weights=ratings, minlength=len(user_order)) / \
+            np.maximum(ratings_counts, 1)
+
+        unique_movie_ids, movie_indices = np.unique(movie_ids, return_inverse=True)
+        movie_indices = movie_indices.ravel()
+
+        # Only the last rating of a (user, movie) pair is kept, the order of the entries is preserved.
+        pair_keys = entry_rows * max(len(unique_movie_ids), 1) + movie_indices
+        _, last_positions = np.unique(pair_keys[::-1], return_index=True)
+        kept = np.sort(len(pair_keys) - 1 - last_positions)
+        kept = kept[np.argsort(entry_rows[kept], kind="stable")]
+
+        unique_ratings, rating_ranks = np.unique(ratings[kept], return_inverse=True)
+        compact_ratings = ratings[kept].astype(np.float32)
+        if not np.array_equal(compact_ratings, ratings[kept]):
+            compact_ratings = ratings[kept]
+
+        return cls(
+            user_ids=unique_user_ids[user_order],
+            indptr=np.concatenate(([0], np.cumsum(np.bincount(entry_rows[kept], minlength=len(user_order))))),
+            movie_ids=unique_movie_ids,
+            movie_indices=movie_indices[kept].astype(np.int32),
+            ratings=compact_ratings,
+            rating_ranks=(rating_ranks.ravel() + 1).astype(np.min_scalar_type(len(unique_ratings))),
+            mean_ratings=mean_ratings
+        )
+
+    @classmethod
+    def from_users_ratings(cls, users_ratings):
+        """
+        Creates the snapshot from the ratings of the users.
+
+        :param users_ratings: Key: user ID, value: a dictionary of the user's ratings (key: movie ID,
+                              value: rating value).
+        :type users_ratings: dict[int, dict[int, float]]
+
+        :return: The snapshot, the rows are in the order of the dictionary.
+        :rtype: RatingsSnapshot
+        """
+        user_ids, movie_ids, ratings = [], [], []
+        for user_id, user_ratings in users_ratings.items():
+            user_ids.extend([user_id] * len(user_ratings))
+            movie_ids.extend(user_ratings.keys())
+            ratings.extend(user_ratings.values())
+
+        return cls.from_columns(user_ids, movie_ids, ratings)
+
+    def publish(self, name):
+        """
+        Copies the snapshot into a new shared memory block, which the worker processes attach with attach().
+        The block is not removed when this process exits, it has to be removed with unpublish().
+
+        :param name: The name of the shared memory block.
+        :type name: str
+        """
+        header_bytes, size = self._get_layout()
+
+        block = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _untrack(block)
+
+        self._write_into(block.buf, header_bytes)
+        block.close()
+
+    @classmethod
+    def attach(cls, name):
+        """
+        Attaches the snapshot published into the shared memory block. The arrays are read-only views of the block,
+        nothing is copied. The block stays mapped as long as any of the arrays is used, even after the snapshot
+        object is dropped.
+
+        :param name: The name of the shared memory block.
+        :type name: str
+
+        :raises FileNotFoundError: If no snapshot is published under the name, or it is being published or removed.
+
+        :return: The attached snapshot.
+        :rtype: RatingsSnapshot
+        """
+        block = shared_memory.SharedMemory(name=name)
+        _untrack(block)
+
+        if not any(block.buf[:8]):
+            block.close()
+            raise FileNotFoundError(f"The ratings snapshot '{name}' is not published.")
+
+        # The arrays are views of a single array of the block, which closes the block when it is garbage collected.
+        # Closing the block while an array is still in use would unmap the memory under it.
+        buffer = np.ndarray((block.size,), dtype=np.uint8, buffer=block.buf)
+        weakref.finalize(buffer, block.close)
+
+        return cls._read_from(buffer, block)
+
+    def save(self, path):
+        """
+        Writes the snapshot into a binary file, which can be memory-mapped with load(). The file has the same layout
+        as the shared memory block: the header length, the JSON header (format version, the dtype, shape and offset of
+        every array) and the 64-byte aligned CSR arrays, including the user ID map (user_ids) and the movie ID map
+        (movie_ids).
+
+        The file is written under a temporary name and renamed, so a reader never sees a partially written file.
+
+        :param path: The path of the snapshot file.
+        :type path: str
+        """
+        header_bytes, size = self._get_layout()
+
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "w+b") as file:
+                file.truncate(size)
+                buffer = mmap.mmap(file.fileno(), size)
+                self._write_into(buffer, header_bytes)
+                buffer.flush()
+                buffer.close()
+                os.fsync(file.fileno())
+
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-maps the snapshot file written by save(). The arrays are read-only views of the mapped file,
+        nothing is read until it is used.
+
+        :param path: The path of the snapshot file.
+        :type path: str
+
+        :return: The mapped snapshot.
+        :rtype: RatingsSnapshot
+        """
+        buffer = np.memmap(path, dtype=np.uint8, mode="r")
+
+        return cls._read_from(buffer, buffer)
+
+    @staticmethod
+    def unpublish(name):
+        """
+        Removes the shared memory block of a published snapshot. Attached processes keep their mapping, but the
+        block is marked as retired (see is_retired()), so they can attach the snapshot published next.
+
+        :param name: The name of the shared memory block.
+        :type name: str
+        """
+        # unlink() unregisters the block from the resource tracker itself.
+        block = shared_memory.SharedMemory(name=name)
+        # The header length is never 0, zeroing it marks the block retired and leaves the arrays intact.
+        block.buf[:8] = bytes(8)
+        block.close()
+        block.unlink()
+
+    def is_retired(self):
+        """
+        Checks whether the shared memory block of an attached snapshot was removed by unpublish(), e.g. to publish a
+        new snapshot under the same name. The check reads the mapped block only, it costs no system call.
+
+        :return: True if the snapshot was attached and its block was unpublished since.
+        :rtype: bool
+        """
+        return isinstance(self._buffer, shared_memory.SharedMemory) and not any(self._buffer.buf[:8])
+
+    def _get_layout(self):
+        """
+        Calculates the binary layout of the snapshot.
+
+        :return: The encoded header and the total size in bytes.
+        :rtype: tuple[bytes, int]
+        """
+        header = {"format_version": self.FORMAT_VERSION, "arrays": {}}
+        offset = 0
+        for array_name in self.ARRAY_NAMES:
+            array = getattr(self, array_name)
+            header["arrays"][array_name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset += _align(array.nbytes)
+
+        header_bytes = json.dumps(header).encode()
+
+        return header_bytes, _align(8 + len(header_bytes)) + offset
+
+    def _write_into(self, buffer, header_bytes):
+        """
+        Writes the header and the arrays into a buffer of the size calculated by _get_layout().
+
+        :param buffer: The writable buffer.
+        :type buffer: memoryview or mmap.mmap
+
+        :param header_bytes: The encoded header.
+        :type header_bytes: bytes
+        """
+        header = json.loads(header_bytes)
+        data_offset = _align(8 + len(header_bytes))
+
+        buffer[:8] = len(header_bytes).to_bytes(8, "little")
+        buffer[8:8 + len(header_bytes)] = header_bytes
+        for array_name in self.ARRAY_NAMES:
+            array = getattr(self, array_name)
+            array_offset = data_offset + header["arrays"][array_name]["offset"]
+            np.ndarray(array.shape, dtype=array.dtype, buffer=buffer, offset=array_offset)[...] = array
+
+    @classmethod
+    def _read_from(cls, buffer, owner):
+        """
+        Creates the snapshot from the header and the arrays in a buffer, the arrays are read-only views of it.
+
+        :param buffer: The buffer written by _write_into().
+        :type buffer: numpy.ndarray
+
+        :param owner: The object that keeps the buffer mapped.
+        :type owner: shared_memory.SharedMemory or numpy.memmap
+
+        :return: The snapshot.
+        :rtype: RatingsSnapshot
+        """
+        header_length = int.from_bytes(bytes(buffer[:8]), "little")
+        header = json.loads(bytes(buffer[8:8 + header_length]))
+        if header.get("format_version") != cls.FORMAT_VERSION:
+            raise ValueError(f"Unsupported ratings snapshot format version: {header.get('format_version')}.")
+
+        data_offset = _align(8 + header_length)
+
+        arrays = {}
+        for array_name, array_header in header["arrays"].items():
+            array = np.ndarray(array_header["shape"], dtype=np.dtype(array_header["dtype"]), buffer=buffer,
+                               offset=data_offset + array_header["offset"])
+            array.flags.writeable = False
+            arrays[array_name] = array
+
+        return cls(buffer=owner, **arrays)
+
+    def get_user_ids(self):
+        """
+        Getter for the IDs of all users who rated at least one movie.
+
+        :return: The user IDs in the order of the rows.
+        :rtype: list[int]
+        """
+        return self.user_ids.tolist()
+
+    def get_ratings(self, user_id):
+        """
+        Returns the ratings of the user.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :return: Key: movie ID, value: rating value. Empty if the user is not in the snapshot.
+        :rtype: dict[int, float]
+        """
+        row = self._get_row(user_id)
+        if row is None:
+            return {}
+
+        start, end = self.indptr[row], self.indptr[row + 1]
+
+        return dict(zip(self.movie_ids[self.movie_indices[start:end]].tolist(), self.ratings[start:end].tolist()))
+
+    def get_mean_rating(self, user_id):
+        """
+        Returns the mean rating of the user.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :return: The mean rating, 0 if the user is not in the snapshot.
+        :rtype: float
+        """
+        row = self._get_row(user_id)
+
+        return 0 if row is None else float(self.mean_ratings[row])
+
+    def get_sub_snapshot(self, user_ids):
+        """
+        Creates a snapshot of the ratings of some users only, e.g. the candidate neighbors of a user. The movie
+        columns and the rating ranks are shared with this snapshot, so SpearmanMatrix calculates the same
+        correlation coefficients over the sub-snapshot.
+
+        :param user_ids: The user IDs, the users who are not in the snapshot are left out.
+        :type user_ids: list[int]
+
+        :return: The snapshot of the users' ratings, the rows are in the order of the user IDs.
+        :rtype: RatingsSnapshot
+        """
+        rows = np.array([row for row in map(self._get_row, user_ids) if row is not None], dtype=np.int64)
+        starts, ends = self.indptr[rows], self.indptr[rows + 1]
+        lengths = ends - starts
+
+        # The entry indices of the rows, the ranges starts[i]:ends[i] concatenated.
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        entries = np.arange(indptr[-1], dtype=np.int64) - np.repeat(indptr[:-1] - starts, lengths)
+
+        return RatingsSnapshot(
+            user_ids=self.user_ids[rows],
+            indptr=indptr,
+            movie_ids=self.movie_ids,
+            movie_indices=self.movie_indices[entries],
+            ratings=self.ratings[entries],
+            rating_ranks=self.rating_ranks[entries],
+            mean_ratings=self.mean_ratings[rows]
+        )
+
+    def get_user(self, user_id):
+        """
+        Returns the profile of the user with the provided ID, its neighbors are resolved from this snapshot.
+        A user without ratings is returned as well.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :return: The user profile.
+        :rtype: UserProfile
+        """
+        return UserProfile.from_ratings(user_id, self.get_ratings(user_id), self.get_mean_rating(user_id),
+                                        self.get_user)
+
+    def get_users(self):
+        """
+        Returns the profiles of all users who rated at least one movie.
+
+        :return: The user profiles in the order of the rows.
+        :rtype: list[UserProfile]
+        """
+        return [self.get_user(user_id) for user_id in self.get_user_ids()]
+
+    def get_spearman_matrix(self):
+        """
+        Returns the vectorized Spearman's correlation engine of the snapshot, it is created on the first call.
+
+        :return: The Spearman's correlation engine over the ratings of all users of the snapshot.
+        :rtype: SpearmanMatrix
+        """
+        if self._spearman_matrix is None:
+            self._spearman_matrix = SpearmanMatrix(self)
+
+        return self._spearman_matrix
+
+    def get_correlations(self, user_id, ratings=None):
+        """
+        Calculates the Spearman's rank correlation coefficients between the user and all other users of the snapshot.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :param ratings: The user's current ratings, e.g. newer than the snapshot, the snapshot's ratings if None.
+        :type ratings: dict[int, float] or None
+
+        :return: Key: user ID, value: correlation coefficient.
+        :rtype: dict[int, float]
+        """
+        return self.get_spearman_matrix().get_correlations(self.get_ratings(user_id) if ratings is None else ratings,
+                                                           user_id)
+
+    def _get_row(self, user_id):
+        """
+        Looks up the row of the user.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :return: The row index, None if the user is not in the snapshot.
+        :rtype: int or None
+        """
+        if self._user_rows is None:
+            self._user_rows = {user_id: row for row, user_id in enumerate(self.user_ids.tolist())}
+
+        return self._user_rows.get(user_id)
+
+
+def _align(size, alignment=64):
+    """
+    Rounds the size up to a multiple of the alignment, so every array in a shared memory block is aligned.
+
+    :param size: The size in bytes.
+    :type size: int
+
+    :param alignment: The alignment in bytes.
+    :type alignment: int
+
+    :return: The aligned size.
+    :rtype: int
+    """
+    return (size + alignment - 1) // alignment * alignment
+
+
+def _untrack(block):
+    """
+    Stops the resource tracker of this process from removing the shared memory block when the process exits,
+    the published snapshot outlives the process that published or attached it.
+
+    :param block: The shared memory block.
+    :type block: shared_memory.SharedMemory
+    """
+    resource_tracker.unregister(block._name, "shared_memory")
+
+
+class RatingsSnapshotStore:
+    """
+    A directory of versioned snapshot files (ratings-<version>.snapshot). Every new version is written atomically
+    (see RatingsSnapshot.save()), so the readers always map a complete file, and only the newest versions are kept.
+
+    :ivar directory: The directory of the snapshot files.
+    :type directory: str
+
+    Usage:
+    store = RatingsSnapshotStore("snapshots")
+    store.write(Rating.get_snapshot())
+    snapshot = store.load_latest()
+    """
+
+    FILE_NAME_PATTERN = re.compile(r"^ratings-(\d+)\.snapshot$")
+
+    def __init__(self, directory):
+        """
+        Initialize the RatingsSnapshotStore.
+
+        :param directory: The directory of the snapshot files, it is created if it does not exist.
+        :type directory: str
+        """
+        self.directory = directory
+
+    def get_path(self, version):
+        """
+        Returns the path of the snapshot file of the version.
+
+        :param version: The snapshot version.
+        :type version: int
+
+        :return: The path of the snapshot file.
+        :rtype: str
+        """
+        return os.path.join(self.directory, f"ratings-{version:020d}.snapshot")
+
+    def get_versions(self):
+        """
+        Returns the versions of all snapshot files in the directory.
+
+        :return: The versions in ascending order, empty if the directory does not exist.
+        :rtype: list[int]
+        """
+        if not os.path.isdir(self.directory):
+            return []
+
+        return sorted(int(match.group(1)) for match in map(self.FILE_NAME_PATTERN.match, os.listdir(self.directory))
+                      if match)
+
+    def get_latest_version(self):
+        """
+        Returns the newest snapshot version.
+
+        :return: The newest version, None if no snapshot was written.
+        :rtype: int or None
+        """
+        versions = self.get_versions()
+
+        return versions[-1] if versions else None
+
+    def write(self, snapshot, keep=2):
+        """
+        Writes the snapshot as a new version and removes the old versions. The processes that have mapped an old
+        version keep their mapping until they switch to the new one.
+
+        :param snapshot: The snapshot to write.
+        :type snapshot: RatingsSnapshot
+
+        :param keep: The number of the newest versions to keep, including the new one.
+        :type keep: int
+
+        :return: The new version.
+        :rtype: int
+        """
+        os.makedirs(self.directory, exist_ok=True)
+
+        versions = self.get_versions()
+        version = max(time.time_ns() // 1000, versions[-1] + 1 if versions else 0)
+        snapshot.save(self.get_path(version))
+
+        for old_version in (versions + [version])[:-max(keep, 1)]:
+            try:
+                os.unlink(self.get_path(old_version))
+            except FileNotFoundError:
+                pass
+
+        return version
+
+    def load(self, version):
+        """
+        Memory-maps the snapshot of the version.
+
+        :param version: The snapshot version.
+        :type version: int
+
+        :return: The mapped snapshot.
+        :rtype: RatingsSnapshot
+        """
+        return RatingsSnapshot.load(self.get_path(version))
+
+    def load_latest(self):
+        """
+        Memory-maps the newest snapshot.
+
+        :return: The mapped snapshot, None if no snapshot was written.
+        :rtype: RatingsSnapshot or None
+        """
+        version = self.get_latest_version()
+
+        return None if version is None else self.load(version)
+
+
+class SharedRatingsSnapshot:
+    """
+    Provides the worker process with a RatingsSnapshot shared with the other workers: the newest version of the
+    snapshot store in the configured directory (RATINGS_SNAPSHOT_DIR), or the snapshot published into shared memory
+    under the configured name (RATINGS_SNAPSHOT_NAME). The snapshot is mapped on the first use and then reused by
+    all requests.
+
+    When a new version is written into the snapshot directory, the worker switches to it on the next request,
+    without a restart. Noticing a new version costs a single stat() call of the directory. Likewise, when the shared
+    memory snapshot is published again, the worker notices that its block was retired and attaches the new one.
+
+    The snapshot is a read-only copy of the rating table from the time it was written, it has to be written (or
+    published) again to include newer ratings.
+
+    :ivar directory: The snapshot store directory, the snapshot files are not used if None.
+    :type directory: str or None
+
+    :ivar name: The name of the shared memory block, the shared memory is not used if None.
+    :type name: str or None
+
+    :ivar version: The version of the snapshot file in use, None if no file is used.
+    :type version: int or None
+    """
+
+    def __init__(self, directory=None, name=None):
+        """
+        Initialize the SharedRatingsSnapshot.
+
+        :param directory: The snapshot store directory.
+        :type directory: str or None
+
+        :param name: The name of the shared memory block.
+        :type name: str or None
+        """
+        self.directory = directory
+        self.name = name
+        self.version = None
+
+        self._snapshot = None
+        self._directory_mtime = None
+
+    def init_app(self, app):
+        """
+        Configures the snapshot source from the Flask application config (RATINGS_SNAPSHOT_DIR, RATINGS_SNAPSHOT_NAME).
+
+        :param app: The Flask application.
+        :type app: Flask
+        """
+        self.directory = app.config.get("RATINGS_SNAPSHOT_DIR", self.directory)
+        self.name = app.config.get("RATINGS_SNAPSHOT_NAME", self.name)
+        self.version = None
+
+        self._snapshot = None
+        self._directory_mtime = None
+
+    def get(self):
+        """
+        Returns the shared snapshot, switches to the newest snapshot file or the newly published shared memory
+        snapshot first if a new one was written.
+
+        :return: The mapped snapshot, None if no source is configured or no snapshot was written.
+        :rtype: RatingsSnapshot or None
+        """
+        if self.directory:
+            self._load_latest_version()
+            if self.version is not None:
+                return self._snapshot
+
+        if self.name and (self._snapshot is None or self._snapshot.is_retired()):
+            try:
+                self._snapshot = RatingsSnapshot.attach(self.name)
+            except FileNotFoundError:
+                # Unpublished, or not published again yet, the block is attached again on the next request.
+                self._snapshot = None
+                return None
+
+        return self._snapshot
+
+    def _load_latest_version(self):
+        """
+        Maps the newest snapshot file, if the snapshot directory has changed since the last check.
+        """
+        try:
+            directory_mtime = os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            return
+
+        if directory_mtime == self._directory_mtime:
+            return
+
+        store = RatingsSnapshotStore(self.directory)
+        version = store.get_latest_version()
+        if version is not None and version != self.version:
+            try:
+                self._snapshot = store.load(version)
+            except FileNotFoundError:
+                # The version was removed meanwhile, the directory is checked again on the next request.
+                return
+            self.version = version
+
+        self._directory_mtime = directory_mtime
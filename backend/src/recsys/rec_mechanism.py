@@ -1,29 +1,33 @@
-from .spearman_mechanism import SpearmanMechanism
+import numpy as np
+
+from .ratings_snapshot import RatingsSnapshot
+from .neighbor_index import select_nearest_neighbors
 
 
 class RecMechanism:
     """
     This class recommends movies to a target user based on the Spearman's rank correlation coefficient
-    calculated between the target user and all other users.
+    calculated between the target user and all other users. The users are RecsysUser objects: UserProfile instances
+    (e.g. from a RatingsSnapshot), or any object with the same methods, such as User instances.
 
     :ivar target_user: The target user for whom the recommendations are made.
-    :type target_user: user
+    :type target_user: RecsysUser
 
     :ivar all_users: A list of all other users in the dataset.
-    :type all_users: list[user]
+    :type all_users: list[RecsysUser]
 
-    :ivar MIN_CORRELATION: The minimum correlation value. Only users with a Spearman's correlation value
+    :cvar MIN_CORRELATION: The minimum correlation value. Only users with a Spearman's correlation value
                            not lower than this will be considered when making recommendations.
     :type MIN_CORRELATION: float
 
-    :ivar MIN_RATING: The minimum movie rating. Only movies with a rating not lower than this will be
+    :cvar MIN_RATING: The minimum movie rating. Only movies with a rating not lower than this will be
                       recommended to the target user.
     :type MIN_RATING: float
 
-    :ivar MAX_RECOMMENDATIONS: The maximum number of movie recommendations to return.
+    :cvar MAX_RECOMMENDATIONS: The maximum number of movie recommendations to return.
     :type MAX_RECOMMENDATIONS: int
 
-    :ivar MAX_NEIGHBORS: The maximum number of nearest neighbors to consider when calculating the predicted
+    :cvar MAX_NEIGHBORS: The maximum number of nearest neighbors to consider when calculating the predicted
                          rating for a movie.
     :type MAX_NEIGHBORS: int
 
@@ -38,33 +42,46 @@ class RecMechanism:
     Then, call the get_recommendations() method to get the list of recommended movies.
 
     Example:
-    target_user = User(...)
-    all_users = [User(...), User(...), ...]
+    target_user = snapshot.get_user(target_user_id)
+    all_users = snapshot.get_users()
     rec_mechanism = RecMechanism(target_user, all_users)
     correlation_coefficients = rec_mechanism.get_spearman_correlation_coefficients()
     recommended_movies = rec_mechanism.get_recommended_movies()
     predicted_movie_rating = rec_mechanism.get_predicted_movie_rating(movie_id)
+    predicted_movie_ratings = rec_mechanism.get_predicted_ratings_for_movies(movie_ids)
+
+    When the correlation coefficients were calculated earlier (e.g. read from a correlation store), they can be
+    passed to the constructor instead of all users:
+    rec_mechanism = RecMechanism(target_user, spearman_correlation_coefficients=stored_correlations)
     """
 
-    def __init__(self, target_user, all_users):
+    MIN_CORRELATION = 0.7
+    MIN_RATING = 4.5
+    MAX_RECOMMENDATIONS = 20
+    MAX_NEIGHBORS = 5
+
+    def __init__(self, target_user, all_users=None, spearman_correlation_coefficients=None):
         """
         The recommendation mechanism constructor.
 
         :param target_user: The target user for whom the recommendations are made.
-        :type target_user: user
+        :type target_user: RecsysUser
 
-        :param all_users: A list of all other users in the dataset.
-        :type all_users: list[user]
-        """
-        self.MIN_CORRELATION = 0.7
-        self.MIN_RATING = 4.5
-        self.MAX_RECOMMENDATIONS = 20
-        self.MAX_NEIGHBORS = 5
+        :param all_users: A list of all other users in the dataset. Not needed if the correlation coefficients
+                          are provided.
+        :type all_users: list[RecsysUser] or None
 
+        :param spearman_correlation_coefficients: Precalculated Spearman's rank correlation coefficients between
+                                                  the target user and other users, key: user ID, value: correlation
+                                                  coefficient. Only the coefficients not lower than MIN_CORRELATION
+                                                  are required. Optional.
+        :type spearman_correlation_coefficients: dict[int, float] or None
+        """
         self.target_user = target_user
-        self.all_users = all_users
+        self.all_users = all_users if all_users is not None else []
 
-        self.spearman_correlation_coefficients = self._calculate_spearman_correlation_coefficients()
+        self.spearman_correlation_coefficients = spearman_correlation_coefficients \
+            if spearman_correlation_coefficients is not None else self._calculate_spearman_correlation_coefficients()
 
     def get_spearman_correlation_coefficients(self):
         """
@@ -107,6 +124,21 @@ class RecMechanism:
 
         return predicted_rating
 
+    def get_predicted_ratings_for_movies(self, movie_ids):
+        """
+        Getter of the predicted ratings for many movies at once. The nearest neighbors are selected once for all
+        movies, the predictions are the same as get_predicted_rating_for_movie() returns for every movie.
+
+        :param movie_ids: The IDs of the movies for which the predicted ratings will be calculated.
+        :type movie_ids: list[int]
+
+        :return: A dictionary with the predicted ratings, key: movie ID, value: predicted rating.
+        :rtype: dict[int, float]
+        """
+        predicted_ratings = self._calculate_predicted_ratings_for_movies(movie_ids)
+
+        return predicted_ratings
+
     def _calculate_spearman_correlation_coefficients(self):
         """
         Calculates the Spearman's rank correlation coefficients for the target user and all other users.
@@ -115,16 +147,20 @@ class RecMechanism:
                  target user and all other users, key: user ID, value: correlation coefficient.
         :rtype: dict[int, float]
         """
-        return {user.get_id(): SpearmanMechanism(self.target_user, user).get_spearman_correlation_coefficient()
-                for user in self.all_users if user != self.target_user}
+        # The whole ratings matrix is ranked once instead of creating a SpearmanMechanism for every user pair.
+        spearman_matrix = RatingsSnapshot.from_users_ratings(
+            {user.get_id(): user.get_ratings() for user in self.all_users}
+        ).get_spearman_matrix()
+
+        return spearman_matrix.get_correlations(self.target_user.get_ratings(), self.target_user.get_id())
 
     def _calculate_recommended_movies(self):
         """
         Calculates movie recommendations for the target user based on the Spearman's rank correlation coefficient
         between the target user and all other users.
 
-        This method sorts the Spearman correlation coefficients in descending order,
-        then for each user, it sorts their movie ratings in descending order.
+        This method selects the users with a Spearman correlation coefficient not lower than MIN_CORRELATION
+        in descending order, then for each user, it sorts their movie ratings in descending order.
         It then adds the movie to the recommendation list if it was not rated by the target user
         and if its rating is 4.5 or more.
         The process continues until it reaches the maximum number of recommendations.
@@ -140,8 +176,10 @@ class RecMechanism:
         # A list to store the recommended movies.
         recommendations = []
 
-        # Users sorted by their Spearman correlation coefficients in descending order.
-        sorted_users = sorted(self.spearman_correlation_coefficients.items(), key=lambda x: x[1], reverse=True)
+        # Users with correlation not lower than MIN_CORRELATION sorted by their Spearman correlation coefficients
+        # in descending order. The users below MIN_CORRELATION are filtered out before sorting.
+        sorted_users = select_nearest_neighbors(self.spearman_correlation_coefficients,
+                                                min_correlation=self.MIN_CORRELATION)
 
         # A set of movie IDs that the target user has rated.
         target_user_rated_movies = set(self.target_user.get_ratings().keys())
@@ -150,10 +188,6 @@ class RecMechanism:
         added_movies = set()
 
         for user_id, correlation in sorted_users:
-            # Only consider users with correlation not lower than MIN_CORRELATION.
-            if correlation < self.MIN_CORRELATION:
-                continue
-
             # The current user from the sorted list of users.
             user = self.target_user.get_neighbor(user_id)
 
@@ -197,22 +231,21 @@ class RecMechanism:
         :return: The predicted rating for the movie.
         :rtype: float
         """
-        # Sorting correlation coefficients in descending order and taking top MAX_NEIGHBORS.
-        sorted_correlations = sorted(self.spearman_correlation_coefficients.items(),
-                                     key=lambda x: x[1], reverse=True)[:self.MAX_NEIGHBORS]
+        # Selecting top MAX_NEIGHBORS correlation coefficients not lower than MIN_CORRELATION with a heap.
+        sorted_correlations = select_nearest_neighbors(self.spearman_correlation_coefficients,
+                                                       self.MAX_NEIGHBORS, self.MIN_CORRELATION)
         sum_numerator = 0
         sum_denominator = 0
         target_user_mean_rating = self.target_user.get_mean_rating()
 
         for user_id, correlation in sorted_correlations:
-            if correlation >= self.MIN_CORRELATION:
-                user = self.target_user.get_neighbor(user_id)
-                user_ratings = user.get_ratings()
+            user = self.target_user.get_neighbor(user_id)
+            user_ratings = user.get_ratings()
 
-                if movie_id in user_ratings:
-                    user_mean_rating = user.get_mean_rating()
-                    sum_numerator += (user_ratings[movie_id] - user_mean_rating) * correlation
-                    sum_denominator += abs(correlation)
+            if movie_id in user_ratings:
+                user_mean_rating = user.get_mean_rating()
+                sum_numerator += (user_ratings[movie_id] - user_mean_rating) * correlation
+                sum_denominator += abs(correlation)
 
         # If all correlation coefficients are below MIN_CORRELATION or the nearest neighbors haven't rated the movie.
         if sum_denominator == 0:
@@ -224,3 +257,51 @@ class RecMechanism:
             if predicted_rating > 5:
                 predicted_rating = 5
             return predicted_rating
+
+    def _calculate_predicted_ratings_for_movies(self, movie_ids):
+        """
+        Vectorized form of _calculate_predicted_rating_for_movie() for many movies. The sums of the formula are
+        accumulated for all requested movies at once, neighbor by neighbor in the same order as the calculation
+        for a single movie, so the results are identical.
+
+        :param movie_ids: The IDs of the movies for which the predicted ratings will be calculated.
+        :type movie_ids: list[int]
+
+        :return: A dictionary with the predicted ratings, key: movie ID, value: predicted rating.
+        :rtype: dict[int, float]
+        """
+        movie_ids = list(dict.fromkeys(movie_ids))
+        movie_positions = {movie_id: position for position, movie_id in enumerate(movie_ids)}
+
+        # Selecting top MAX_NEIGHBORS correlation coefficients not lower than MIN_CORRELATION once for all movies.
+        sorted_correlations = select_nearest_neighbors(self.spearman_correlation_coefficients,
+                                                       self.MAX_NEIGHBORS, self.MIN_CORRELATION)
+        sum_numerators = np.zeros(len(movie_ids))
+        sum_denominators = np.zeros(len(movie_ids))
+        target_user_mean_rating = self.target_user.get_mean_rating()
+
+        for user_id, correlation in sorted_correlations:
+            user = self.target_user.get_neighbor(user_id)
+
+            # The positions and the ratings of the requested movies rated by the neighbor.
+            rated_movies = [(movie_positions[movie_id], rating) for movie_id, rating in user.get_ratings().items()
+                            if movie_id in movie_positions]
+            if not rated_movies:
+                continue
+
+            positions, ratings = (np.array(values) for values in zip(*rated_movies))
+            sum_numerators[positions] += (ratings - user.get_mean_rating()) * correlation
+            sum_denominators[positions] += abs(correlation)
+
+        predicted_ratings = {}
+        for movie_id, sum_numerator, sum_denominator in zip(movie_ids, sum_numerators.tolist(),
+                                                            sum_denominators.tolist()):
+            # If no nearest neighbor (with correlation not lower than MIN_CORRELATION) has rated the movie.
+            if sum_denominator == 0:
+                predicted_ratings[movie_id] = target_user_mean_rating
+            else:
+                predicted_rating = target_user_mean_rating + sum_numerator / sum_denominator
+                predicted_ratings[movie_id] = 1 if predicted_rating < 1 else 5 if predicted_rating > 5 else \
+                    predicted_rating
+
+        return predicted_ratings
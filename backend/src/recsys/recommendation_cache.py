@@ -0,0 +1,588 @@
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class RecommendationCache:
+    """
+    A cache of the recommendations of every user. Recommendations only change when ratings change, so they are
+    calculated once and served from the cache until the user's entry is invalidated.
+
+    The entries are keyed by the user ID and the user's version counter. A rating change of a user invalidates
+    the user's entry and the entries of all users whose neighbor sets include the user, before or after the change:
+    their version counters are incremented, so a result calculated before the change is never stored under
+    the new version. An invalidated entry is kept as the user's stale value, which can be served while its refresh
+    runs in the background (see get_or_calculate()).
+    A global ratings version counts all rating changes.
+
+    The entries are stored in a backend, the in-process LRUCacheBackend by default, or the SQLiteCacheBackend shared
+    by all worker processes (RECOMMENDATION_CACHE_BACKEND). A backend provides the methods get(), get_version(),
+    get_stale(), put(), invalidate(), clear(), get_ratings_version() and __len__() (see LRUCacheBackend).
+
+    :ivar backend: The cache backend, the cache is disabled if None.
+    :type backend: LRUCacheBackend or SQLiteCacheBackend or None
+
+    :ivar hits: The number of lookups served from the cache.
+    :type hits: int
+
+    :ivar misses: The number of lookups that had to calculate the recommendations.
+    :type misses: int
+
+    :ivar stale_hits: The number of lookups served with a stale value while a refresh was queued.
+    :type stale_hits: int
+
+    :ivar invalidations: The number of invalidated entries.
+    :type invalidations: int
+
+    Usage:
+    recommendations = recommendation_cache.get_or_calculate(user_id, calculate_recommendations)
+    recommendations = recommendation_cache.get_or_calculate(user_id, calculate_recommendations, queue_refresh)  # stale
+    recommendation_cache.refresh(user_id, calculate_recommendations)  # e.g. in a background job
+    recommendation_cache.invalidate_user(user_id, neighbor_ids)  # after the user's ratings have changed
+    """
+
+    def __init__(self, backend=None):
+        """
+        Initialize the RecommendationCache.
+
+        :param backend: The cache backend, an LRUCacheBackend with 1024 entries by default.
+        :type backend: LRUCacheBackend or SQLiteCacheBackend or None
+        """
+        self.backend = backend if backend is not None else LRUCacheBackend()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        """
+        The number of cached entries.
+
+        :return: The number of entries, 0 if the cache is disabled.
+        :rtype: int
+        """
+        return len(self.backend) if self.backend is not None else 0
+
+    def init_app(self, app):
+        """
+        Configures the cache from the Flask application config. RECOMMENDATION_CACHE_BACKEND is "memory" for
+        the in-process LRU cache with RECOMMENDATION_CACHE_SIZE entries, the path of a SQLite file for the cache
+        shared by all worker processes, or "none" to disable the cache.
+
+        :param app: The Flask application.
+        :type app: Flask
+        """
+        backend = app.config.get("RECOMMENDATION_CACHE_BACKEND", "memory")
+
+        if backend == "none":
+            self.backend = None
+        elif backend == "memory":
+            self.backend = LRUCacheBackend(app.config.get("RECOMMENDATION_CACHE_SIZE", 1024))
+        else:
+            self.backend = SQLiteCacheBackend(backend)
+
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.invalidations = 0
+
+    def get_or_calculate(self, user_id, calculate, queue_refresh=None):
+        """
+        Returns the cached recommendations of the user, or calculates and caches them. If queue_refresh is provided
+        and the user's entry is stale, the stale recommendations are returned at once and queue_refresh is called,
+        which has to refresh the entry later (see refresh()). The recommendations are calculated in the request only
+        if there is no entry at all.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :param calculate: A function without arguments, which calculates the user's recommendations and returns them
+                          with the IDs of the user's neighbors: a tuple (recommendations, neighbor IDs).
+        :type calculate: callable
+
+        :param queue_refresh: A function without arguments, which queues the refresh of the user's entry. Optional.
+        :type queue_refresh: callable or None
+
+        :return: The user's recommendations, a new copy on every call.
+        :rtype: list[dict[str, any]]
+        """
+        if self.backend is None:
+            return calculate()[0]
+
+        version = self.backend.get_version(user_id)
+        value = self.backend.get(user_id, version)
+
+        if value is not None:
+            self.hits += 1
+            return json.loads(value)
+
+        if queue_refresh is not None:
+            value = self.backend.get_stale(user_id)
+            if value is not None:
+                self.stale_hits += 1
+                queue_refresh()
+                return json.loads(value)
+
+        self.misses += 1
+        recommendations, neighbor_ids = calculate()
+        self.backend.put(user_id, version, json.dumps(recommendations), neighbor_ids)
+
+        return recommendations
+
+    def refresh(self, user_id, calculate):
+        """
+        Calculates the recommendations of the user and stores them, e.g. in a background job. If the user's version
+        changes during the calculation, the result is not stored.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :param calculate: A function without arguments, which calculates the user's recommendations and returns them
+                          with the IDs of the user's neighbors: a tuple (recommendations, neighbor IDs).
+        :type calculate: callable
+
+        :return: The user's recommendations.
+        :rtype: list[dict[str, any]]
+        """
+        if self.backend is None:
+            return calculate()[0]
+
+        version = self.backend.get_version(user_id)
+        recommendations, neighbor_ids = calculate()
+        self.backend.put(user_id, version, json.dumps(recommendations), neighbor_ids)
+
+        return recommendations
+
+    def invalidate_user(self, user_id, neighbor_ids=()):
+        """
+        Invalidates the entries affected by a rating change of the user: the user's entry, the entries of the users
+        whose neighbor sets included the user and the entries of the user's new neighbors. The entries become stale.
+
+        :param user_id: The ID of the user whose ratings have changed.
+        :type user_id: int
+
+        :param neighbor_ids: The IDs of the user's neighbors after the change, if they are known.
+        :type neighbor_ids: list[int]
+        """
+        if self.backend is not None:
+            self.invalidations += self.backend.invalidate(user_id, neighbor_ids)
+
+    def clear(self):
+        """
+        Drops all entries, e.g. after a bulk import of ratings.
+        """
+        if self.backend is not None:
+            self.backend.clear()
+
+    def get_metrics(self):
+        """
+        Returns the cache metrics.
+
+        :return: A dictionary with the following keys:
+                    - backend (str): The backend name.
+                    - entries (int): The number of cached entries.
+                    - ratings_version (int): The number of rating changes seen by the backend.
+                    - hits (int): The number of lookups served from the cache.
+                    - misses (int): The number of lookups that calculated the recommendations.
+                    - stale_hits (int): The number of lookups served with a stale value while a refresh was queued.
+                    - evictions (int): The number of entries evicted by the LRU backend.
+                    - invalidations (int): The number of invalidated entries, the entries that became stale.
+                    - hit_rate (float): The ratio of hits to all lookups, stale hits excluded.
+        :rtype: dict[str, any]
+        """
+        lookups = self.hits + self.misses + self.stale_hits
+
+        return {
+            "backend": type(self.backend).__name__ if self.backend is not None else "none",
+            "entries": len(self),
+            "ratings_version": self.backend.get_ratings_version() if self.backend is not None else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "evictions": getattr(self.backend, "evictions", 0),
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0
+        }
+
+
+class LRUCacheBackend:
+    """
+    An in-process cache backend, which keeps the most recently used entries.
+
+    :ivar max_size: The maximum number of entries.
+    :type max_size: int
+
+    :ivar evictions: The number of entries evicted because the cache was full.
+    :type evictions: int
+    """
+
+    def __init__(self, max_size=1024):
+        """
+        Initialize an empty LRUCacheBackend.
+
+        :param max_size: The maximum number of entries.
+        :type max_size: int
+        """
+        self.max_size = max_size
+        self.evictions = 0
+
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._neighbor_ids = {}
+        self._dependent_ids = {}
+        self._ratings_version = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """
+        The number of entries.
+
+        :return: The number of cached entries.
+        :rtype: int
+        """
+        return len(self._entries)
+
+    def get_version(self, user_id):
+        """
+        Returns the user's version counter.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :return: The version counter.
+        :rtype: int
+        """
+        return self._versions.get(user_id, 0)
+
+    def get_ratings_version(self):
+        """
+        Returns the global ratings version counter.
+
+        :return: The number of invalidated rating changes.
+        :rtype: int
+        """
+        return self._ratings_version
+
+    def get(self, user_id, version):
+        """
+        Looks up the entry of the user.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :param version: The user's version counter.
+        :type version: int
+
+        :return: The cached JSON value, None if there is no entry of the version.
+        :rtype: str or None
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] != version:
+                return None
+
+            self._entries.move_to_end(user_id)
+
+            return entry[1]
+
+    def get_stale(self, user_id):
+        """
+        Looks up the entry of the user regardless of its version, e.g. a stale entry.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :return: The cached JSON value, None if there is no entry.
+        :rtype: str or None
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+
+            return None if entry is None else entry[1]
+
+    def put(self, user_id, version, value, neighbor_ids):
+        """
+        Stores the entry of the user, unless the user's version has changed meanwhile. The least recently used entry
+        is evicted if the cache is full.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :param version: The user's version counter read before the value was calculated.
+        :type version: int
+
+        :param value: The JSON value.
+        :type value: str
+
+        :param neighbor_ids: The IDs of the user's neighbors, their rating changes invalidate the entry.
+        :type neighbor_ids: list[int]
+        """
+        if self.max_size < 1:
+            return
+
+        with self._lock:
+            if self._versions.get(user_id, 0) != version:
+                return
+
+            self._remove(user_id)
+            self._entries[user_id] = (version, value)
+            self._neighbor_ids[user_id] = set(neighbor_ids)
+            for neighbor_id in neighbor_ids:
+                self._dependent_ids.setdefault(neighbor_id, set()).add(user_id)
+
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, user_id, neighbor_ids=()):
+        """
+        Invalidates the entry of the user, the entries that depend on the user and the entries of the user's
+        new neighbors: their versions are incremented, the entries are kept as stale values.
+
+        :param user_id: The ID of the user whose ratings have changed.
+        :type user_id: int
+
+        :param neighbor_ids: The IDs of the user's neighbors after the change.
+        :type neighbor_ids: list[int]
+
+        :return: The number of entries that became stale.
+        :rtype: int
+        """
+        with self._lock:
+            self._ratings_version += 1
+
+            user_ids = {user_id} | self._dependent_ids.get(user_id, set()) | set(neighbor_ids)
+            stale_count = 0
+            for invalidated_user_id in user_ids:
+                version = self._versions.get(invalidated_user_id, 0)
+                entry = self._entries.get(invalidated_user_id)
+                stale_count += entry is not None and entry[0] == version
+                self._versions[invalidated_user_id] = version + 1
+
+            return stale_count
+
+    def clear(self):
+        """
+        Drops all entries, the versions of all users are incremented by dropping the entries.
+        """
+        with self._lock:
+            for user_id in list(self._entries):
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+                self._remove(user_id)
+            self._ratings_version += 1
+
+    def _remove(self, user_id):
+        """
+        Removes the entry of the user and its neighbor references.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :return: 1 if an entry was removed, 0 otherwise.
+        :rtype: int
+        """
+        for neighbor_id in self._neighbor_ids.pop(user_id, ()):
+            dependent_ids = self._dependent_ids.get(neighbor_id)
+            if dependent_ids is not None:
+                dependent_ids.discard(user_id)
+                if not dependent_ids:
+                    del self._dependent_ids[neighbor_id]
+
+        return 0 if self._entries.pop(user_id, None) is None else 1
+
+
+class SQLiteCacheBackend:
+    """
+    A cache backend stored in a SQLite file, shared by all processes that use the same file. The versions,
+    the entries and the neighbor references are changed in one transaction, so concurrent processes always see
+    a consistent cache.
+
+    :ivar path: The path of the SQLite file.
+    :type path: str
+    """
+
+    def __init__(self, path):
+        """
+        Initialize the SQLiteCacheBackend, the tables are created if they do not exist.
+
+        :param path: The path of the SQLite file.
+        :type path: str
+        """
+        self.path = path
+
+        self._local = threading.local()
+
+        with self._get_connection() as connection:
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS entry (user_id INTEGER PRIMARY KEY, version INTEGER NOT NULL,
+                                                  value TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS version (user_id INTEGER PRIMARY KEY, version INTEGER NOT NULL);
+                CREATE TABLE IF NOT EXISTS neighbor (neighbor_id INTEGER NOT NULL, user_id INTEGER NOT NULL,
+                                                     PRIMARY KEY (neighbor_id, user_id)) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS ix_neighbor_user_id ON neighbor (user_id);
+                CREATE TABLE IF NOT EXISTS counter (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            """)
+
+    def __len__(self):
+        """
+        The number of entries.
+
+        :return: The number of cached entries.
+        :rtype: int
+        """
+        return self._get_connection().execute("SELECT COUNT(*) FROM entry").fetchone()[0]
+
+    def get_version(self, user_id):
+        """
+        Returns the user's version counter.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :return: The version counter.
+        :rtype: int
+        """
+        row = self._get_connection().execute("SELECT version FROM version WHERE user_id = ?", (user_id,)).fetchone()
+
+        return row[0] if row else 0
+
+    def get_ratings_version(self):
+        """
+        Returns the global ratings version counter.
+
+        :return: The number of invalidated rating changes.
+        :rtype: int
+        """
+        row = self._get_connection().execute("SELECT value FROM counter WHERE name = 'ratings_version'").fetchone()
+
+        return row[0] if row else 0
+
+    def get(self, user_id, version):
+        """
+        Looks up the entry of the user.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :param version: The user's version counter.
+        :type version: int
+
+        :return: The cached JSON value, None if there is no entry of the version.
+        :rtype: str or None
+        """
+        row = self._get_connection().execute("SELECT value FROM entry WHERE user_id = ? AND version = ?",
+                                             (user_id, version)).fetchone()
+
+        return row[0] if row else None
+
+    def get_stale(self, user_id):
+        """
+        Looks up the entry of the user regardless of its version, e.g. a stale entry.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :return: The cached JSON value, None if there is no entry.
+        :rtype: str or None
+        """
+        row = self._get_connection().execute("SELECT value FROM entry WHERE user_id = ?", (user_id,)).fetchone()
+
+        return row[0] if row else None
+
+    def put(self, user_id, version, value, neighbor_ids):
+        """
+        Stores the entry of the user, unless the user's version has changed meanwhile.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :param version: The user's version counter read before the value was calculated.
+        :type version: int
+
+        :param value: The JSON value.
+        :type value: str
+
+        :param neighbor_ids: The IDs of the user's neighbors, their rating changes invalidate the entry.
+        :type neighbor_ids: list[int]
+        """
+        with self._get_connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            if self.get_version(user_id) != version:
+                return
+
+            connection.execute("INSERT OR REPLACE INTO entry (user_id, version, value) VALUES (?, ?, ?)",
+                               (user_id, version, value))
+            connection.execute("DELETE FROM neighbor WHERE user_id = ?", (user_id,))
+            connection.executemany("INSERT OR IGNORE INTO neighbor (neighbor_id, user_id) VALUES (?, ?)",
+                                   [(neighbor_id, user_id) for neighbor_id in neighbor_ids])
+
+    def invalidate(self, user_id, neighbor_ids=()):
+        """
+        Invalidates the entry of the user, the entries that depend on the user and the entries of the user's
+        new neighbors: their versions are incremented, the entries are kept as stale values.
+
+        :param user_id: The ID of the user whose ratings have changed.
+        :type user_id: int
+
+        :param neighbor_ids: The IDs of the user's neighbors after the change.
+        :type neighbor_ids: list[int]
+
+        :return: The number of entries that became stale.
+        :rtype: int
+        """
+        with self._get_connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            dependent_ids = connection.execute("SELECT user_id FROM neighbor WHERE neighbor_id = ?",
+                                               (user_id,)).fetchall()
+            invalidated_user_ids = list({user_id} | {row[0] for row in dependent_ids} | set(neighbor_ids))
+
+            stale_count = connection.execute(
+                "SELECT COUNT(*) FROM entry WHERE user_id IN (SELECT value FROM json_each(?)) "
+                "AND version = COALESCE((SELECT version FROM version WHERE version.user_id = entry.user_id), 0)",
+                (json.dumps(invalidated_user_ids),)).fetchone()[0]
+
+            user_ids = [(invalidated_user_id,) for invalidated_user_id in invalidated_user_ids]
+            connection.executemany("INSERT INTO version (user_id, version) VALUES (?, 1) "
+                                   "ON CONFLICT (user_id) DO UPDATE SET version = version + 1", user_ids)
+            self._increment_ratings_version(connection)
+
+            return stale_count
+
+    def clear(self):
+        """
+        Drops all entries, the versions of all cached users are incremented.
+        """
+        with self._get_connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute("INSERT INTO version (user_id, version) SELECT user_id, 1 FROM entry WHERE true "
+                               "ON CONFLICT (user_id) DO UPDATE SET version = version + 1")
+            connection.execute("DELETE FROM entry")
+            connection.execute("DELETE FROM neighbor")
+            self._increment_ratings_version(connection)
+
+    @staticmethod
+    def _increment_ratings_version(connection):
+        """
+        Increments the global ratings version counter.
+
+        :param connection: The connection with the open transaction.
+        :type connection: sqlite3.Connection
+        """
+        connection.execute("INSERT INTO counter (name, value) VALUES ('ratings_version', 1) "
+                           "ON CONFLICT (name) DO UPDATE SET value = value + 1")
+
+    def _get_connection(self):
+        """
+        Returns the connection of the current thread, SQLite connections can not be shared between threads.
+
+        :return: The connection.
+        :rtype: sqlite3.Connection
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.connection = connection
+
+        return connection
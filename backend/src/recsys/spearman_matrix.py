@@ -0,0 +1,200 @@
+import numpy as np
+
+
+class SpearmanMatrix:
+    """
+    A vectorized engine for calculating Spearman's rank correlation coefficients between a target user and all
+    users of a RatingsSnapshot at once.
+
+    The snapshot stores the rank of every rating value among all distinct rating values of the dataset
+    (rating_ranks), so the whole ratings matrix is ranked only once, when the snapshot is created. For the movies
+    rated by the target user, the rating ranks of all users are gathered from the snapshot's CSR arrays into a
+    users × movies matrix of rating codes (0 means "not rated"). The ranks that SpearmanMechanism calculates
+    for the common rated movies of two users are then derived from the per-user counts of every rating code,
+    which takes a few array operations for all users together.
+
+    The results are identical to SpearmanMechanism, including the average rank of tied ratings and
+    the special cases of zero or one commonly rated movie.
+
+    :ivar snapshot: The snapshot of the ratings of all users.
+    :type snapshot: RatingsSnapshot
+
+    Usage:
+    Create an instance of the SpearmanMatrix class from the snapshot of the ratings of all users, then call
+    get_correlations() with the ratings of the target user.
+
+    Example:
+    spearman_matrix = SpearmanMatrix(RatingsSnapshot.from_users_ratings(users_ratings))
+    correlations = spearman_matrix.get_correlations(target_user.get_ratings(), target_user.get_id())
+    """
+
+    def __init__(self, snapshot):
+        """
+        Initialize the SpearmanMatrix with the snapshot of the ratings of all users.
+
+        :param snapshot: The snapshot of the ratings of all users.
+        :type snapshot: RatingsSnapshot
+        """
+        self.snapshot = snapshot
+
+    def get_correlations(self, target_user_ratings, target_user_id=None):
+        """
+        Calculates the Spearman's rank correlation coefficients between the target user and all users of the matrix.
+
+        :param target_user_ratings: The target user's ratings, key: movie ID, value: rating value.
+        :type target_user_ratings: dict[int, float]
+
+        :param target_user_id: The target user ID, the target user is left out of the result. Optional.
+        :type target_user_id: int or None
+
+        :return: A dictionary with the Spearman's rank correlation coefficients, key: user ID,
+                 value: correlation coefficient. The users are in the order of the snapshot rows.
+        :rtype: dict[int, float]
+        """
+        correlations = self._calculate_correlations(target_user_ratings)
+
+        user_ids = self.snapshot.get_user_ids()
+
+        return {user_id: correlation for user_id, correlation in zip(user_ids, correlations.tolist())
+                if user_id != target_user_id}
+
+    def get_block_correlations(self, target_users_ratings):
+        """
+        Calculates the block of the correlation matrix between a block of target users and all users of the matrix.
+
+        :param target_users_ratings: The ratings of the target users, each a dictionary with key: movie ID,
+                                     value: rating value.
+        :type target_users_ratings: list[dict[int, float]]
+
+        :return: The correlation coefficients, target users × snapshot rows. The coefficient of a target user with
+                 himself is included.
+        :rtype: numpy.ndarray
+        """
+        block = np.empty((len(target_users_ratings), len(self.snapshot.user_ids)), dtype=np.float64)
+        for index, target_user_ratings in enumerate(target_users_ratings):
+            block[index] = self._calculate_correlations(target_user_ratings)
+
+        return block
+
+    def _calculate_correlations(self, target_user_ratings):
+        """
+        Calculates the row of Spearman's rank correlation coefficients between the target user and all snapshot users.
+
+        :param target_user_ratings: The target user's ratings, key: movie ID, value: rating value.
+        :type target_user_ratings: dict[int, float]
+
+        :return: The correlation coefficients in the order of the snapshot rows.
+        :rtype: numpy.ndarray
+        """
+        snapshot = self.snapshot
+        correlations = np.zeros(len(snapshot.user_ids), dtype=np.float64)
+
+        # Only the movies present in the snapshot can be commonly rated with another user.
+        target_movie_ids = np.fromiter(target_user_ratings.keys(), dtype=np.int64, count=len(target_user_ratings))
+        target_values = np.fromiter(target_user_ratings.values(), dtype=np.float64, count=len(target_user_ratings))
+        target_columns = np.searchsorted(snapshot.movie_ids, target_movie_ids)
+        present = target_columns < len(snapshot.movie_ids)
+        present[present] = snapshot.movie_ids[target_columns[present]] == target_movie_ids[present]
+
+        if not present.any():
+            return correlations
+
+        target_columns = target_columns[present]
+        target_values = target_values[present]
+
+        # The position of every snapshot movie among the target user's movies, -1 for the other movies.
+        column_positions = np.full(len(snapshot.movie_ids), -1, dtype=np.int32)
+        column_positions[target_columns] = np.arange(len(target_columns), dtype=np.int32)
+        entry_positions = column_positions[snapshot.movie_indices]
+        entries = np.flatnonzero(entry_positions >= 0)
+
+        # Rating codes of the users for the movies rated by the target user, 0 where the movie is not common.
+        # Users without any common rated movie keep the correlation 0 and are left out of the calculation.
+        entry_rows = np.searchsorted(snapshot.indptr, entries, side="right") - 1
+        rows, entry_active_rows = np.unique(entry_rows, return_inverse=True)
+        another_codes = np.zeros((len(rows), len(target_columns)), dtype=np.int64)
+        another_codes[entry_active_rows.ravel(), entry_positions[entries]] = snapshot.rating_ranks[entries]
+        common = another_codes > 0
+
+        # The target user's rating codes (1-based) within the target user's own rating values.
+        _, target_codes = np.unique(target_values, return_inverse=True)
+        target_codes = np.broadcast_to(target_codes.ravel() + 1, another_codes.shape)
+
+        target_ranks = self._get_average_ranks(self._count_codes(target_codes, common), target_codes)
+        another_ranks = self._get_average_ranks(self._count_codes(another_codes, common), another_codes)
+
+        squared_rank_diffs_sums = np.where(common, (target_ranks - another_ranks) ** 2, 0).sum(axis=1)
+        common_rated_movies_counts = common.sum(axis=1)
+
+        correlations[rows] = self._calculate_spearman_correlation_coefficients(squared_rank_diffs_sums,
+                                                                               common_rated_movies_counts)
+
+        return correlations
+
+    @staticmethod
+    def _count_codes(codes, common):
+        """
+        Counts the common rated movies of every user per rating code.
+
+        :param codes: A users × movies matrix with the rating codes (starting with 1).
+        :type codes: numpy.ndarray
+
+        :param common: A users × movies matrix, True where the movie is rated by both users.
+        :type common: numpy.ndarray
+
+        :return: A users × codes matrix with the counts, column 0 (not rated) is always 0.
+        :rtype: numpy.ndarray
+        """
+        codes_count = int(codes.max()) + 1
+        flat_codes = (np.arange(len(codes))[:, None] * codes_count + codes)[common]
+
+        return np.bincount(flat_codes, minlength=len(codes) * codes_count).reshape(len(codes), codes_count)
+
+    @staticmethod
+    def _get_average_ranks(code_counts, codes):
+        """
+        Calculates the average ranks of the rating codes, the same way SpearmanMechanism ranks the ratings:
+        tied ratings get the average of the ranks they span.
+
+        :param code_counts: A users × codes matrix with the count of the common rated movies per rating code.
+        :type code_counts: numpy.ndarray
+
+        :param codes: A users × movies matrix with the rating codes to be ranked.
+        :type codes: numpy.ndarray
+
+        :return: A users × movies matrix of the average ranks.
+        :rtype: numpy.ndarray
+        """
+        # The count of common rated movies with a lower rating code.
+        lower_counts = np.cumsum(code_counts, axis=1) - code_counts
+
+        return np.take_along_axis(lower_counts, codes, axis=1) + \
+            (np.take_along_axis(code_counts, codes, axis=1) + 1) / 2
+
+    @staticmethod
+    def _calculate_spearman_correlation_coefficients(squared_rank_diffs_sums, common_rated_movies_counts):
+        """
+        Vectorized form of SpearmanMechanism._calculate_spearman_correlation_coefficient():
+
+        ρ = 1 - [ (6 * Σdᵢ²) / (n * (n² - 1)) ],
+
+        with ρ = 0 for no common rated movie and ρ = 1 for a single common rated movie with equal ranks.
+
+        :param squared_rank_diffs_sums: The sums of squared differences in ranks of common rated movies.
+        :type squared_rank_diffs_sums: numpy.ndarray
+
+        :param common_rated_movies_counts: The counts of common rated movies.
+        :type common_rated_movies_counts: numpy.ndarray
+
+        :return: Spearman's rank correlation coefficients.
+        :rtype: numpy.ndarray
+        """
+        counts = common_rated_movies_counts.astype(np.float64)
+        denominators = np.where(counts > 1, counts * (counts ** 2 - 1), 1)
+        correlations = 1 - (6 * squared_rank_diffs_sums) / denominators
+
+        correlations[common_rated_movies_counts == 0] = 0
+        correlations[(common_rated_movies_counts == 1) & (squared_rank_diffs_sums != 0)] = 0
+        correlations[(common_rated_movies_counts == 1) & (squared_rank_diffs_sums == 0)] = 1
+
+        return correlations
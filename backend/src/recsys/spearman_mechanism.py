@@ -1,22 +1,28 @@
+from .user_profile import UserProfile, get_average_ranks
+
+
 class SpearmanMechanism:
     """
     A class for calculating Spearman's rank correlation coefficient between two users based on their movie ratings.
+    The users are compared through their profiles (see UserProfile), whose ratings dictionaries are built once, and
+    the precomputed ranks of a profile are used when all of the user's movies are common, so neither the ratings nor
+    the ranks are rebuilt from the user for every pair of users.
 
-    :ivar target_user: A user object representing the primary target user.
-    :type target_user: user
+    :ivar target_user: The profile of the primary target user.
+    :type target_user: UserProfile
 
-    :ivar another_user: A user object representing the secondary user.
-    :type another_user: user
+    :ivar another_user: The profile of the secondary user.
+    :type another_user: UserProfile
 
-    :ivar target_user_rated_movie_ranks: A dictionary containing the ranked movie IDs and their ranks for
-                                         the target user. Key: movie ID, Value: rank value.
-    :type target_user_rated_movie_ranks: dict[int, float]
+    :ivar target_user_rated_movie_ranks: The ranks of the common rated movies among the target user's ratings of
+                                         them, in the order of common_rated_movies.
+    :type target_user_rated_movie_ranks: list[float]
 
-    :ivar another_user_rated_movie_ranks: A dictionary containing the ranked movies and their ranks for
-                                          another user. Key: movie ID, Value: rank value.
-    :type another_user_rated_movie_ranks: dict[int, float]
+    :ivar another_user_rated_movie_ranks: The ranks of the common rated movies among another user's ratings of
+                                          them, in the order of common_rated_movies.
+    :type another_user_rated_movie_ranks: list[float]
 
-    :ivar common_rated_movies: A list of movie IDs that were rated by both users.
+    :ivar common_rated_movies: The sorted IDs of the movies that were rated by both users.
     :type common_rated_movies: list[int]
 
     :ivar squared_common_rated_movies_rank_diffs_sum: Sum of squared rank differences for common rated movies.
@@ -28,29 +34,30 @@ class SpearmanMechanism:
 
     Usage:
     To calculate the Spearman's rank correlation coefficient between two users based on their movie ratings,
-    create an instance of the SpearmanMechanism class by providing two user objects as arguments.
+    create an instance of the SpearmanMechanism class by providing two users (UserProfile instances, or any
+    RecsysUser, e.g. User instances, which are converted to profiles) as arguments.
     The class will calculate the required variables and the final correlation coefficient,
     which can be accessed via the getter get_spearman_correlation_coefficient().
 
     Example:
-    user1 = User(...)
-    user2 = User(...)
+    user1 = snapshot.get_user(...)
+    user2 = snapshot.get_user(...)
     spearman_mechanism = SpearmanMechanism(user1, user2)
     correlation_coefficient = spearman_mechanism.get_spearman_correlation_coefficient()
     """
 
     def __init__(self, target_user, another_user):
         """
-        Initialize the SpearmanMechanism with two user objects.
+        Initialize the SpearmanMechanism with two users.
 
-        :param target_user: A user object representing the primary user.
-        :type target_user: user
+        :param target_user: The primary user.
+        :type target_user: RecsysUser
 
-        :param another_user: A user object representing the secondary user.
-        :type another_user: user
+        :param another_user: The secondary user.
+        :type another_user: RecsysUser
         """
-        self.target_user = target_user
-        self.another_user = another_user
+        self.target_user = UserProfile.from_user(target_user)
+        self.another_user = UserProfile.from_user(another_user)
 
         self.common_rated_movies = self._get_common_rated_movies(self.target_user, self.another_user)
 
@@ -59,7 +66,7 @@ class SpearmanMechanism:
 
         self.squared_common_rated_movies_rank_diffs_sum = \
             self._get_common_rated_movie_ranks_squared_diffs_sum(
-                self.common_rated_movies, self.target_user_rated_movie_ranks, self.another_user_rated_movie_ranks
+                self.target_user_rated_movie_ranks, self.another_user_rated_movie_ranks
             )
 
         self.spearman_correlation_coefficient = self._calculate_spearman_correlation_coefficient(
@@ -76,101 +83,64 @@ class SpearmanMechanism:
         return self.spearman_correlation_coefficient
 
     @staticmethod
-    def _get_rated_movie_ranks(user, common_rated_movies):
+    def _get_rated_movie_ranks(profile, common_rated_movies):
         """
-        This method calculates and returns the ranks for movies commonly rated by a user.
+        This method calculates and returns the ranks of the common rated movies among the user's ratings of them.
+        Tied ratings get the average of the ranks they span. When the user rated only the common movies, the
+        precomputed ranks of the profile are used.
 
-        :param user: The user whose rated movies' ranks are to be calculated.
-        :type user: user
+        :param profile: The profile of the user whose rated movies' ranks are to be calculated.
+        :type profile: UserProfile
 
-        :param common_rated_movies: A list of movie IDs that are commonly rated between two users.
+        :param common_rated_movies: The sorted IDs of the movies that are commonly rated between two users.
         :type common_rated_movies: list[int]
 
-        :return: A dictionary where each key is a movie ID and its corresponding value is the rank value of that movie.
-        :rtype: dict[int, float]
+        :return: The rank values, in the order of the common rated movies.
+        :rtype: list[float]
         """
-        # Filter the user's ratings to include only the common rated movies.
-        user_ratings = {movie_id: rating for movie_id, rating in user.get_ratings().items() if
-                        movie_id in common_rated_movies}
-
-        # A list of tuples where each tuple contains a movie ID and its corresponding rating.
-        # The list is sorted by rating value.
-        sorted_ratings = sorted(user_ratings.items(), key=lambda x: x[1])
-
-        # A dictionary where each key is a movie ID and its corresponding value is the rank of that movie.
-        ranks = {}
-
-        i = 0
-        while i < len(sorted_ratings):
-            current_rating = sorted_ratings[i][1]
-
-            # A variable that holds the count of movies with the same rating.
-            same_ratings_count = 1
-
-            for j in range(i + 1, len(sorted_ratings)):
-                if sorted_ratings[j][1] == current_rating:
-                    same_ratings_count += 1
-                else:
-                    break
+        # The profile ranks are in the order of its sorted movie IDs, which are the common rated movies then.
+        if len(common_rated_movies) == len(profile):
+            return profile.get_ranks()
 
-            # A variable that holds the average value of rank based on the movies with the same rating.
-            average_rank = sum(range(i + 1, i + same_ratings_count + 1)) / same_ratings_count
+        user_ratings = profile.get_ratings()
 
-            for k in range(i, i + same_ratings_count):
-                ranks[sorted_ratings[k][0]] = average_rank
-
-            i += same_ratings_count
-
-        return ranks
+        return get_average_ranks([user_ratings[movie_id] for movie_id in common_rated_movies])
 
     @staticmethod
-    def _get_common_rated_movies(target_user, another_user):
+    def _get_common_rated_movies(target_profile, another_profile):
         """
         Retrieves the common movies that were rated by both the target user and another user.
 
-        :param target_user: The first user for which we are finding common rated movies.
-        :type target_user: user
+        :param target_profile: The profile of the first user for which we are finding common rated movies.
+        :type target_profile: UserProfile
 
-        :param another_user: The second user for which we are finding common rated movies.
-        :type another_user: user
+        :param another_profile: The profile of the second user for which we are finding common rated movies.
+        :type another_profile: UserProfile
 
-        :return: A list of IDs representing common movies rated by both the target user and another user.
+        :return: A sorted list of IDs representing common movies rated by both the target user and another user.
         :rtype: list[int]
         """
-        # A set of IDs corresponding to movies rated by our target user.
-        target_user_movie_ids = set(target_user.get_ratings().keys())
-
-        # A set of IDs corresponding to movies rated by another user.
-        another_user_movie_ids = set(another_user.get_ratings().keys())
-
-        # A set of IDs corresponding to common movies that were rated by both the target user and another user.
-        common_movie_ids = target_user_movie_ids & another_user_movie_ids
-
-        return list(common_movie_ids)
+        return sorted(target_profile.get_ratings().keys() & another_profile.get_ratings().keys())
 
     @staticmethod
-    def _get_common_rated_movie_ranks_squared_diffs_sum(common_rated_movies,
-                                                        target_user_rated_movie_ranks, another_user_rated_movie_ranks):
+    def _get_common_rated_movie_ranks_squared_diffs_sum(target_user_rated_movie_ranks, another_user_rated_movie_ranks):
         """
         Calculates the sum of squared differences in ranks of common rated movies between two users.
 
-        :param common_rated_movies: A list of IDs of common rated movies.
-        :type common_rated_movies: list[int]
-
-        :param target_user_rated_movie_ranks: A dictionary where each key is a movie ID and its corresponding value
-                                              is the rank of that movie for the target user.
-        :type target_user_rated_movie_ranks: dict[int, float]
+        :param target_user_rated_movie_ranks: The ranks of the common rated movies for the target user.
+        :type target_user_rated_movie_ranks: list[float]
 
-        :param another_user_rated_movie_ranks: A dictionary where each key is a movie ID and its corresponding value
-                                               is the rank of that movie for another user.
-        :type another_user_rated_movie_ranks: dict[int, float]
+        :param another_user_rated_movie_ranks: The ranks of the common rated movies for another user, in the same
+                                               order.
+        :type another_user_rated_movie_ranks: list[float]
 
         :return: The sum of squared differences in ranks of common rated movies between the two users.
         :rtype: float
         """
         squared_rank_diffs_sum = sum(
-            (target_user_rated_movie_ranks[movie_id] - another_user_rated_movie_ranks[movie_id]) ** 2
-            for movie_id in common_rated_movies
+            (target_user_rank - another_user_rank) ** 2
+            for target_user_rank, another_user_rank in
+            zip(target_user_rated_movie_ranks, another_user_rated_movie_ranks)
         )
 
         return squared_rank_diffs_sum
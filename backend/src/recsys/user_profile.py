@@ -0,0 +1,282 @@
+from typing import Protocol
+
+import numpy as np
+
+
+# The number of values from which get_average_ranks() ranks them with numpy.
+NUMPY_RANKS_MIN_SIZE = 100
+
+
+class RecsysUser(Protocol):
+    """
+    The user interface of the recommendation mechanism (RecMechanism and SpearmanMechanism): a UserProfile, or any
+    object with the same methods, e.g. the User model.
+    """
+
+    def get_id(self):
+        """
+        :return: The user ID.
+        :rtype: int
+        """
+
+    def get_ratings(self):
+        """
+        :return: The user's ratings, key: movie ID, value: rating value.
+        :rtype: dict[int, float]
+        """
+
+    def get_mean_rating(self):
+        """
+        :return: The mean rating of the user, 0 without ratings.
+        :rtype: float
+        """
+
+    def get_neighbor(self, neighbor_id):
+        """
+        :param neighbor_id: ID of the neighboring user.
+        :type neighbor_id: int
+
+        :return: The neighboring user.
+        :rtype: RecsysUser
+        """
+
+
+class UserProfile:
+    """
+    A compact, read-only profile of a user's ratings for the recommendation mechanism. The ratings are kept in numpy
+    arrays sorted by the movie IDs, and the mean rating and the ranks of the ratings are calculated once per profile,
+    so the users can be compared without building dictionaries from ORM Rating objects on every call. A profile does
+    not depend on the database or on an application context: it is created from a RatingsSnapshot (see
+    RatingsSnapshot.get_user()), from a dictionary of ratings or from any RecsysUser (see from_user()).
+
+    :ivar id: The user ID.
+    :type id: int
+
+    :ivar movie_ids: The sorted IDs of the rated movies.
+    :type movie_ids: numpy.ndarray
+
+    :ivar ratings: The rating values, in the order of the movie IDs.
+    :type ratings: numpy.ndarray
+
+    :ivar mean_rating: The mean rating of the user, 0 without ratings.
+    :type mean_rating: float
+
+    Usage:
+    profile = UserProfile.from_ratings(user_id, {movie_id: rating, ...})
+    correlation = SpearmanMechanism(profile, another_profile).get_spearman_correlation_coefficient()
+    """
+    __slots__ = ("id", "movie_ids", "ratings", "mean_rating", "_ranks", "_source_order", "_ratings_dict",
+                 "_get_neighbor")
+
+    def __init__(self, user_id, movie_ids, ratings, mean_rating=None, get_neighbor=None):
+        """
+        Initialize the UserProfile, the ratings are sorted by the movie IDs. The ratings dictionary of get_ratings()
+        keeps the order of the provided ratings.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :param movie_ids: The IDs of the rated movies, without duplicates.
+        :type movie_ids: numpy.ndarray or list[int]
+
+        :param ratings: The rating values, in the order of the movie IDs.
+        :type ratings: numpy.ndarray or list[float]
+
+        :param mean_rating: The mean rating of the user, the mean of the ratings if None.
+        :type mean_rating: float or None
+
+        :param get_neighbor: A function returning the neighboring user of an ID, see get_neighbor(). Optional.
+        :type get_neighbor: callable or None
+        """
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        ratings = np.asarray(ratings, dtype=np.float64)
+        source_order = np.argsort(movie_ids, kind="stable")
+
+        self.id = user_id
+        self.movie_ids = movie_ids[source_order]
+        self.ratings = ratings[source_order]
+        self.mean_rating = float(ratings.mean()) if mean_rating is None and len(ratings) else float(mean_rating or 0)
+
+        self._ranks = None
+        self._source_order = source_order
+        self._ratings_dict = None
+        self._get_neighbor = get_neighbor
+
+    def __repr__(self):
+        """
+        String representation of the UserProfile instance.
+
+        :return: String representing the user profile.
+        :rtype: str
+        """
+        return f"<UserProfile-{self.id}>"
+
+    def __len__(self):
+        """
+        The number of ratings of the user.
+
+        :return: The number of rated movies.
+        :rtype: int
+        """
+        return len(self.movie_ids)
+
+    @classmethod
+    def from_ratings(cls, user_id, ratings, mean_rating=None, get_neighbor=None):
+        """
+        Creates the profile from a dictionary of ratings, which is kept as the dictionary of get_ratings(), so it
+        must not be changed afterwards.
+
+        :param user_id: The user ID.
+        :type user_id: int
+
+        :param ratings: The user's ratings, key: movie ID, value: rating value.
+        :type ratings: dict[int, float]
+
+        :param mean_rating: The mean rating of the user, the mean of the ratings if None.
+        :type mean_rating: float or None
+
+        :param get_neighbor: A function returning the neighboring user of an ID. Optional.
+        :type get_neighbor: callable or None
+
+        :return: The user profile.
+        :rtype: UserProfile
+        """
+        profile = cls(user_id, list(ratings.keys()), list(ratings.values()), mean_rating, get_neighbor)
+        profile._ratings_dict = ratings
+
+        return profile
+
+    @classmethod
+    def from_user(cls, user):
+        """
+        Returns the profile of a RecsysUser, e.g. of the User model, whose neighbors are resolved by the user.
+        A profile is returned as it is.
+
+        :param user: The user.
+        :type user: RecsysUser
+
+        :return: The user profile.
+        :rtype: UserProfile
+        """
+        if isinstance(user, cls):
+            return user
+
+        return cls.from_ratings(user.get_id(), dict(user.get_ratings()), user.get_mean_rating(), user.get_neighbor)
+
+    def get_id(self):
+        """
+        Get the unique identifier of the user.
+
+        :return: User's ID.
+        :rtype: int
+        """
+        return self.id
+
+    def get_ratings(self):
+        """
+        Get the user's ratings, the dictionary is created on the first call.
+
+        :return: User's ratings. The keys are movie IDs and the values are rating float values.
+        :rtype: dict[int, float]
+        """
+        if self._ratings_dict is None:
+            positions = np.empty_like(self._source_order)
+            positions[self._source_order] = np.arange(len(self._source_order))
+            self._ratings_dict = dict(zip(self.movie_ids[positions].tolist(), self.ratings[positions].tolist()))
+
+        return self._ratings_dict
+
+    def get_mean_rating(self):
+        """
+        Get the mean rating that the user has given to all rated movies.
+
+        :return: The mean rating, 0 if the user has not rated any movie.
+        :rtype: float
+        """
+        return self.mean_rating
+
+    def get_ranks(self):
+        """
+        Get the ranks of the user's ratings among all of the user's ratings, tied ratings get the average of the
+        ranks they span. The ranks are calculated on the first call.
+
+        :return: The ranks, in the order of the movie IDs.
+        :rtype: list[float]
+        """
+        if self._ranks is None:
+            self._ranks = get_average_ranks(self.ratings.tolist())
+
+        return self._ranks
+
+    def get_neighbor(self, neighbor_id):
+        """
+        Get the neighboring user, e.g. from the same snapshot.
+
+        :param neighbor_id: ID of the neighboring user.
+        :type neighbor_id: int
+
+        :return: The neighboring user.
+        :rtype: RecsysUser
+
+        :raises LookupError: If the profile cannot resolve its neighbors.
+        """
+        if self._get_neighbor is None:
+            raise LookupError(f"The profile of the user {self.id} has no neighbors.")
+
+        return self._get_neighbor(neighbor_id)
+
+
+def get_average_ranks(values):
+    """
+    Ranks the values in ascending order starting with 1, tied values get the average of the ranks they span,
+    e.g. [3.0, 1.0, 3.0] gets the ranks [2.5, 1.0, 2.5]. Most users have few common rated movies, so short sequences
+    are ranked in Python, the numpy call overhead is paid off from NUMPY_RANKS_MIN_SIZE values on.
+
+    :param values: The ranked values.
+    :type values: list[float] or numpy.ndarray
+
+    :return: The ranks, in the order of the values.
+    :rtype: list[float]
+    """
+    if len(values) >= NUMPY_RANKS_MIN_SIZE:
+        return _get_numpy_average_ranks(np.asarray(values, dtype=np.float64)).tolist()
+
+    order = sorted(range(len(values)), key=values.__getitem__)
+    ranks = [0.0] * len(values)
+
+    start = 0
+    while start < len(order):
+        # The position after the last of the values tied with the value at the start.
+        end = start + 1
+        while end < len(order) and values[order[end]] == values[order[start]]:
+            end += 1
+
+        for position in range(start, end):
+            ranks[order[position]] = (start + end + 1) / 2
+
+        start = end
+
+    return ranks
+
+
+def _get_numpy_average_ranks(values):
+    """
+    The numpy implementation of get_average_ranks().
+
+    :param values: The ranked values.
+    :type values: numpy.ndarray
+
+    :return: The ranks, in the order of the values.
+    :rtype: numpy.ndarray
+    """
+    order = np.argsort(values, kind="stable")
+    sorted_values = values[order]
+
+    # The first position of every group of tied values, and the position after the last group.
+    group_starts = np.flatnonzero(np.concatenate(([True], sorted_values[1:] != sorted_values[:-1])))
+    group_ends = np.append(group_starts[1:], len(values))
+
+    ranks = np.empty(len(values), dtype=np.float64)
+    ranks[order] = np.repeat((group_starts + group_ends + 1) / 2, group_ends - group_starts)
+
+    return ranks
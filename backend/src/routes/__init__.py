@@ -1,3 +1,4 @@
 from .auth import auth_namespace
 from .user import user_namespace
 from .movies import movies_namespace
+from .jobs import jobs_namespace
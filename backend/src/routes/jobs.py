@@ -0,0 +1,50 @@
+from flask_restx import Resource, Namespace
+from flask_jwt_extended import jwt_required
+
+from ..models import create_job_model
+from ..controllers import JobController
+
+
+jobs_namespace = Namespace("jobs", description="Background job related operations.")
+
+job_model = create_job_model(jobs_namespace)
+
+
+@jobs_namespace.route("/<int:id>")
+class JobRouter(Resource):
+    """
+    A resource representing a background job, e.g. the refresh of the recommendations of a user. Provides access to
+    the job status through the GET method.
+    """
+
+    @jobs_namespace.response(404, "Job not found")
+    @jobs_namespace.marshal_with(job_model)
+    @jwt_required()
+    def get(self, id):
+        """
+        Retrieve the status of a background job by ID.
+
+        :param id: The ID of the job.
+        :type id: int
+
+        :return: A dictionary containing the job data with the following keys:
+                    - id (int): Job ID.
+                    - kind (str): The kind of the job.
+                    - key (str): The deduplication key.
+                    - status (str): "queued", "running", "done" or "failed".
+                    - payload (dict[str, any]): The arguments of the job.
+                    - result (any): The result of the job, if it is done.
+                    - error (str): The error message, if the job failed.
+                    - created_at (str): The time the job was queued (UTC).
+                    - started_at (str): The time the job was started (UTC).
+                    - finished_at (str): The time the job was finished (UTC).
+        :rtype: dict[str, any]
+        """
+        job_controller = JobController(id)
+
+        job_response = job_controller.get_job()
+
+        if job_response is None:
+            return {"message": "Job not found"}, 404
+
+        return job_response, 200
@@ -1,17 +1,50 @@
 from flask import request
-from flask_restx import Resource, Namespace
+from flask_restx import Resource, Namespace, marshal
 from flask_jwt_extended import jwt_required
 
-from ..models import create_movie_model, create_preview_model, create_rating_model, create_comment_model
+from ..models import create_movie_model, create_preview_model, create_rating_model, create_comment_model, \
+    create_preview_page_model, create_movie_rating_model, create_movie_comment_model, create_comment_page_model, \
+    create_search_result_model, create_search_page_model, create_title_match_model, create_facet_count_model, \
+    create_facets_model, create_sorted_page_model
+from ..models.db_movie_model import MOVIES_PAGE_SIZE, MOVIES_MAX_PAGE_SIZE, SEARCH_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE, \
+    TYPEAHEAD_LIMIT, TYPEAHEAD_MAX_LIMIT
+from ..models.db_movie_facet_model import QUERY_FILTER_PARAMS
+from ..models.db_comment_model import COMMENTS_PAGE_SIZE, COMMENTS_MAX_PAGE_SIZE
 from ..controllers import MoviesController, MovieController
+from .streaming import STREAM_FORMATS, create_stream_response
 
 
 movies_namespace = Namespace("movies", description="Movies related operations.")
 
 movie_model = create_movie_model(movies_namespace)
 preview_model = create_preview_model(movies_namespace)
+preview_page_model = create_preview_page_model(movies_namespace, preview_model)
 rating_model = create_rating_model(movies_namespace)
 comment_model = create_comment_model(movies_namespace)
+movie_rating_model = create_movie_rating_model(movies_namespace)
+movie_comment_model = create_movie_comment_model(movies_namespace)
+comment_page_model = create_comment_page_model(movies_namespace, comment_model)
+search_result_model = create_search_result_model(movies_namespace)
+search_page_model = create_search_page_model(movies_namespace, search_result_model)
+title_match_model = create_title_match_model(movies_namespace)
+facet_count_model = create_facet_count_model(movies_namespace)
+facets_model = create_facets_model(movies_namespace, facet_count_model)
+sorted_page_model = create_sorted_page_model(movies_namespace, preview_model, facets_model)
+
+# The QUERY parameters of the paginated routes.
+page_params = {
+    "limit": f"The number of movies per page (1 to {MOVIES_MAX_PAGE_SIZE}, {MOVIES_PAGE_SIZE} by default).",
+    "cursor": "The next_cursor of the previous page.",
+    "stream": "Stream all movies instead of a page, as a JSON array (json) or as NDJSON (ndjson)."
+}
+
+# The QUERY parameters of the filtered routes.
+filter_params = {
+    "filter_category": "Only the movies of the category.",
+    "filter_country": "Only the movies of the country.",
+    "filter_year_from": "Only the movies released in the year or later.",
+    "filter_year_to": "Only the movies released in the year or earlier."
+}
 
 
 @movies_namespace.route('')
@@ -20,23 +53,39 @@ class MoviesRouter(Resource):
     A class representing the movies route, responsible for handling operations related to retrieving all movies.
     """
 
-    @movies_namespace.marshal_list_with(preview_model)
+    @movies_namespace.doc(params=page_params)
+    @movies_namespace.response(200, "Success", preview_page_model)
+    @movies_namespace.response(400, "Invalid QUERY parameters")
     @jwt_required()
     def get(self):
         """
-        Gets data of all movies.
+        Gets a page of data of all movies, ordered by movie IDs. With the stream QUERY parameter, the previews of
+        all movies are streamed as a JSON array or NDJSON instead.
 
-        :return: A list of dictionaries containing the following keys for each movie:
-                    - id (int): Movie ID.
-                    - title (str): Movie title.
-                    - category (str): Movie category.
-        :rtype: list[dict[str, any]]
+        :return: A dictionary containing the following keys:
+                    - movies (list[dict[str, any]]): The movies of the page, for each movie:
+                        - id (int): Movie ID.
+                        - title (str): Movie title.
+                        - category (str): Movie category.
+                    - next_cursor (str or None): The cursor of the next page, None on the last page.
+        :rtype: dict[str, any]
         """
         movies_controller = MoviesController()
 
-        movies_response = movies_controller.get_movies()
+        stream_format = request.args.get("stream")
+        if stream_format is not None:
+            if stream_format not in STREAM_FORMATS:
+                return {"message": "Invalid QUERY parameters."}, 400
+
+            return create_stream_response(movies_controller.get_all_movies(), stream_format)
+
+        limit = movies_controller.get_page_limit(request.args.get("limit"))
+        movies_response = movies_controller.get_movies(limit, request.args.get("cursor")) if limit else None
 
-        return movies_response, 200
+        if movies_response is None:
+            return {"message": "Invalid QUERY parameters."}, 400
+
+        return marshal(movies_response, preview_page_model), 200
 
 
 @movies_namespace.route("/sort")
@@ -45,29 +94,119 @@ class MoviesSortRouter(Resource):
     A class representing the movies sort route, responsible for handling operations related to sorting movies.
     """
 
+    @movies_namespace.doc(params={**page_params, **filter_params})
+    @movies_namespace.response(200, "Success", sorted_page_model)
     @movies_namespace.response(400, "Invalid QUERY parameters")
-    @movies_namespace.marshal_list_with(preview_model)
     @jwt_required()
     def get(self):
         """
-        Gets all movies sorted by QUERY parameters.
+        Gets a page of movies sorted and filtered by QUERY parameters, with the movie counts of the values of every
+        facet. With the stream QUERY parameter, the previews of all sorted and filtered movies are streamed as a JSON
+        array or NDJSON instead.
 
-        :return: A list of dictionaries containing the following keys for each sorted movie:
-                    - id (int): Movie ID.
-                    - title (str): Movie title.
-                    - category (str): Movie category.
-        :rtype: list[dict[str, any]]
+        :return: A dictionary containing the following keys:
+                    - movies (list[dict[str, any]]): The sorted movies of the page, for each movie:
+                        - id (int): Movie ID.
+                        - title (str): Movie title.
+                        - category (str): Movie category.
+                    - next_cursor (str or None): The cursor of the next page, None on the last page.
+                    - facets (dict[str, list[dict[str, any]]]): For every facet (category, country, year), the
+                      values with their movie counts, filtered by the filters of the other facets.
+        :rtype: dict[str, any]
         """
         movies_controller = MoviesController()
 
         sort_params = request.args.to_dict()
+        limit = movies_controller.get_page_limit(sort_params.pop("limit", None))
+        cursor = sort_params.pop("cursor", None)
+        stream_format = sort_params.pop("stream", None)
+        filters = movies_controller.parse_filter_parameters(
+            {key: sort_params.pop(key) for key in QUERY_FILTER_PARAMS if key in sort_params})
+
+        if not limit or filters is None or not movies_controller.validate_sort_parameters(sort_params) or \
+                stream_format not in (None, *STREAM_FORMATS):
+            return {"message": "Invalid QUERY parameters."}, 400
 
-        if not movies_controller.validate_sort_parameters(sort_params):
+        if stream_format is not None:
+            return create_stream_response(movies_controller.get_all_movies(sort_params, filters), stream_format)
+
+        movies_sorted_response = movies_controller.get_movies_sorted(sort_params, limit, cursor, filters)
+
+        if movies_sorted_response is None:
             return {"message": "Invalid QUERY parameters."}, 400
 
-        movies_sorted_response = movies_controller.get_movies_sorted(sort_params)
+        return marshal(movies_sorted_response, sorted_page_model), 200
 
-        return movies_sorted_response, 200
+
+@movies_namespace.route("/search")
+class MoviesSearchRouter(Resource):
+    """
+    A class representing the movies search route, responsible for the full-text search of movies.
+    """
+
+    @movies_namespace.doc(params={
+        "q": "The searched words, matched in the title, description, main actors and comments of the movies.",
+        "limit": f"The number of movies per page (1 to {SEARCH_MAX_PAGE_SIZE}, {SEARCH_PAGE_SIZE} by default).",
+        "cursor": "The next_cursor of the previous page."
+    })
+    @movies_namespace.response(200, "Success", search_page_model)
+    @movies_namespace.response(400, "Invalid QUERY parameters")
+    @jwt_required()
+    def get(self):
+        """
+        Gets a page of the movies matching the q QUERY parameter, ranked by relevance.
+
+        :return: A dictionary containing the following keys:
+                    - movies (list[dict[str, any]]): The matching movies of the page, the best match first:
+                        - id (int): Movie ID.
+                        - title (str): Movie title.
+                        - category (str): Movie category.
+                        - score (float): The relevance of the movie.
+                    - next_cursor (str or None): The cursor of the next page, None on the last page.
+        :rtype: dict[str, any]
+        """
+        movies_controller = MoviesController()
+
+        limit = movies_controller.get_page_limit(request.args.get("limit"), SEARCH_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE)
+        search_response = movies_controller.search_movies(request.args.get("q", ""), limit,
+                                                          request.args.get("cursor")) if limit else None
+
+        if search_response is None:
+            return {"message": "Invalid QUERY parameters."}, 400
+
+        return marshal(search_response, search_page_model), 200
+
+
+@movies_namespace.route("/typeahead")
+class MoviesTypeaheadRouter(Resource):
+    """
+    A class representing the movies typeahead route, responsible for the prefix search of movie titles.
+    """
+
+    @movies_namespace.doc(params={
+        "q": "The typed text, matched against the beginning of the titles and of their words.",
+        "limit": f"The number of movies (1 to {TYPEAHEAD_MAX_LIMIT}, {TYPEAHEAD_LIMIT} by default)."
+    })
+    @movies_namespace.response(200, "Success", [title_match_model])
+    @movies_namespace.response(400, "Invalid QUERY parameters")
+    @jwt_required()
+    def get(self):
+        """
+        Gets the movies whose title, or a word of the title, starts with the q QUERY parameter. The case, the
+        diacritics and the punctuation are ignored, the titles are looked up in memory instead of the database.
+
+        :return: A list of the matching movies, the titles starting with the text first, for each movie:
+                    - id (int): Movie ID.
+                    - title (str): Movie title.
+        :rtype: list[dict[str, any]]
+        """
+        movies_controller = MoviesController()
+
+        limit = movies_controller.get_page_limit(request.args.get("limit"), TYPEAHEAD_LIMIT, TYPEAHEAD_MAX_LIMIT)
+        if limit is None:
+            return {"message": "Invalid QUERY parameters."}, 400
+
+        return marshal(movies_controller.get_title_matches(request.args.get("q", ""), limit), title_match_model), 200
 
 
 @movies_namespace.route("/movie/<int:id>")
@@ -95,7 +234,10 @@ class MovieRouter(Resource):
                     - main_actors (str): Main actors in the movie.
                     - description (str): Movie description.
                     - rating (int): Movie's average rating.
-                    - comments (list[dict[str, any]]): Dictionary of user's comments.
+                    - comment_count (int): The number of comments of the movie.
+                    - comments (list[dict[str, any]]): The first page of user's comments.
+                    - comments_next_cursor (str or None): The cursor of the next page of comments, see
+                      /movies/movie/<id>/comments.
         :rtype: dict[str, any]
         """
         movie_controller = MovieController(id)
@@ -108,6 +250,49 @@ class MovieRouter(Resource):
         return movie_response, 200
 
 
+@movies_namespace.route("/movie/<int:id>/comments")
+class MovieCommentsRouter(Resource):
+    """
+    A class representing the movie comments route, responsible for handling operations related to retrieving
+    the comments of a movie.
+    """
+
+    @movies_namespace.doc(params={
+        "limit": f"The number of comments per page (1 to {COMMENTS_MAX_PAGE_SIZE}, {COMMENTS_PAGE_SIZE} by default).",
+        "cursor": "The next_cursor of the previous page (or the comments_next_cursor of the movie)."
+    })
+    @movies_namespace.response(200, "Success", comment_page_model)
+    @movies_namespace.response(400, "Invalid QUERY parameters")
+    @movies_namespace.response(404, "Movie not found")
+    @jwt_required()
+    def get(self, id):
+        """
+        Gets a page of the comments of a movie by its ID, the oldest comment first.
+
+        :param id: The ID of the movie.
+        :type id: int
+
+        :return: A dictionary containing the following keys:
+                    - comments (list[dict[str, any]]): The comments of the page, for each comment:
+                        - user_id (int): The ID of the user.
+                        - user_comment (str): The user's comment.
+                    - next_cursor (str or None): The cursor of the next page, None on the last page.
+        :rtype: dict[str, any]
+        """
+        movie_controller = MovieController(id)
+
+        if not movie_controller.is_found():
+            return {"message": "Movie not found"}, 404
+
+        limit = MoviesController.get_page_limit(request.args.get("limit"), COMMENTS_PAGE_SIZE, COMMENTS_MAX_PAGE_SIZE)
+        comments_response = movie_controller.get_comments(limit, request.args.get("cursor")) if limit else None
+
+        if comments_response is None:
+            return {"message": "Invalid QUERY parameters."}, 400
+
+        return marshal(comments_response, comment_page_model), 200
+
+
 @movies_namespace.route("/movie/<int:id>/rate")
 class MovieRateRouter(Resource):
     """
@@ -116,11 +301,11 @@ class MovieRateRouter(Resource):
 
     @movies_namespace.expect(rating_model)
     @movies_namespace.response(404, "Movie not found")
-    @movies_namespace.marshal_with(movie_model)
+    @movies_namespace.marshal_with(movie_rating_model)
     @jwt_required()
     def put(self, id):
         """
-        Adds a new rating for the movie by its ID.
+        Adds a new rating for the movie by its ID, an existing rating of the movie by the user is updated.
 
         :param id: The ID of the movie.
         :type id: int
@@ -128,13 +313,10 @@ class MovieRateRouter(Resource):
         :return: A dictionary containing the following keys:
                     - id (int): Movie ID.
                     - title (str): Movie title.
-                    - category (str): Movie category.
-                    - country (str): Movie's country.
-                    - year (int): Movie's release year.
-                    - main_actors (str): Main actors in the movie.
-                    - description (str): Movie description.
-                    - rating (int): Movie's average rating.
-                    - comments (list[dict[str, any]]): Dictionary of user's comments.
+                    - rating (float): Movie's average rating after the change.
+                    - rating_count (int): The number of ratings of the movie after the change.
+                    - user_id (int): The ID of the user.
+                    - user_rating (float): The user's rating of the movie.
         :rtype: dict[str, any]
         """
         movie_controller = MovieController(id)
@@ -157,11 +339,11 @@ class MovieCommentRouter(Resource):
 
     @movies_namespace.expect(comment_model)
     @movies_namespace.response(404, "Movie not found")
-    @movies_namespace.marshal_with(movie_model)
+    @movies_namespace.marshal_with(movie_comment_model)
     @jwt_required()
     def put(self, id):
         """
-        Adds a new comment for the movie by its ID.
+        Adds a new comment for the movie by its ID, an existing comment of the movie by the user is updated.
 
         :param id: The ID of the movie.
         :type id: int
@@ -169,13 +351,8 @@ class MovieCommentRouter(Resource):
         :return: A dictionary containing the following keys:
                     - id (int): Movie ID.
                     - title (str): Movie title.
-                    - category (str): Movie category.
-                    - country (str): Movie's country.
-                    - year (int): Movie's release year.
-                    - main_actors (str): Main actors in the movie.
-                    - description (str): Movie description.
-                    - rating (int): Movie's average rating.
-                    - comments (list[dict[str, any]]): Dictionary of user's comments.
+                    - user_id (int): The ID of the user.
+                    - user_comment (str): The user's comment for the movie.
         :rtype: dict[str, any]
         """
         movie_controller = MovieController(id)
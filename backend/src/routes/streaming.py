@@ -0,0 +1,75 @@
+import json
+
+from flask import Response, stream_with_context
+
+
+# The formats of the streamed list responses, key: the stream QUERY parameter, value: the mimetype.
+STREAM_FORMATS = {"json": "application/json", "ndjson": "application/x-ndjson"}
+
+# The number of items sent in one chunk of a streamed response.
+STREAM_CHUNK_ITEMS = 100
+
+
+def create_stream_response(items, stream_format, chunk_items=STREAM_CHUNK_ITEMS):
+    """
+    Creates a response that streams the items as they are generated, so the list is never built in memory. The items
+    are generated within the request context, e.g. by a database cursor, and sent in chunks of several items instead
+    of one write per item.
+
+    :param items: The JSON serializable items.
+    :type items: iterable[any]
+
+    :param stream_format: The format, "json" for a JSON array or "ndjson" for one JSON document per line.
+    :type stream_format: str
+
+    :param chunk_items: The number of items sent in one chunk, 1 to send every item as soon as it is generated.
+    :type chunk_items: int
+
+    :return: The streamed response.
+    :rtype: Response
+    """
+    if stream_format == "ndjson":
+        chunks = _get_chunks((json.dumps(item) + "\n" for item in items), "", "", "", chunk_items)
+    else:
+        chunks = _get_chunks((json.dumps(item) for item in items), "[", ",", "]", chunk_items)
+
+    return Response(stream_with_context(chunks), mimetype=STREAM_FORMATS[stream_format])
+
+
+def _get_chunks(texts, start, separator, end, chunk_items):
+    """
+    Joins the serialized items into the chunks of the response.
+
+    :param texts: The serialized items.
+    :type texts: iterable[str]
+
+    :param start: The text before the first item.
+    :type start: str
+
+    :param separator: The text between two items.
+    :type separator: str
+
+    :param end: The text after the last item.
+    :type end: str
+
+    :param chunk_items: The number of items of a chunk.
+    :type chunk_items: int
+
+    :return: Generator of the text chunks.
+    :rtype: generator[str]
+    """
+    chunk = [start]
+
+    for index, text in enumerate(texts):
+        if index:
+            chunk.append(separator)
+        chunk.append(text)
+
+        if len(chunk) >= 2 * chunk_items:
+            yield "".join(chunk)
+            chunk = []
+
+    chunk.append(end)
+    last_chunk = "".join(chunk)
+    if last_chunk:
+        yield last_chunk
@@ -1,8 +1,11 @@
+from flask import request, current_app
 from flask_restx import Resource, Namespace
 from flask_jwt_extended import jwt_required
 
-from ..models import create_user_model, create_recommendation_model, create_prediction_model
+from ..models import create_user_model, create_recommendation_model, create_prediction_model, \
+    create_batch_recommendations_model, create_predictions_model, create_predictions_request_model
 from ..controllers import UserController
+from .streaming import STREAM_FORMATS, create_stream_response
 
 
 user_namespace = Namespace("user", description="User related operations.")
@@ -10,6 +13,9 @@ user_namespace = Namespace("user", description="User related operations.")
 user_model = create_user_model(user_namespace)
 recommendation_model = create_recommendation_model(user_namespace)
 prediction_model = create_prediction_model(user_namespace)
+batch_recommendations_model = create_batch_recommendations_model(user_namespace)
+predictions_model = create_predictions_model(user_namespace)
+predictions_request_model = create_predictions_request_model(user_namespace)
 
 
 @user_namespace.route("/<int:id>")
@@ -46,6 +52,44 @@ class UserRouter(Resource):
         return user_response, 200
 
 
+@user_namespace.route("/<int:id>/ratings")
+class UserRatingsRouter(Resource):
+    """
+    A resource representing the export of all ratings of a user through the GET method.
+    """
+
+    @user_namespace.doc(params={"stream": "The format, a JSON array (json, the default) or NDJSON (ndjson)."})
+    @user_namespace.response(400, "Invalid QUERY parameters")
+    @user_namespace.response(404, "User not found")
+    @jwt_required()
+    def get(self, id):
+        """
+        Export all ratings of a user by ID. The ratings are streamed from the database, so the export does not hold
+        the whole rating history in memory.
+
+        :param id: The ID of the user.
+        :type id: int
+
+        :return: A JSON array or NDJSON stream of dictionaries ordered by movie IDs, where each dictionary contains:
+                    - movie_id (int): ID of the rated movie.
+                    - movie_rating (float): Rating of the movie.
+        :rtype: Response
+        """
+        stream_format = request.args.get("stream", "json")
+
+        if stream_format not in STREAM_FORMATS:
+            return {"message": "Invalid QUERY parameters."}, 400
+
+        user_controller = UserController(id)
+
+        ratings_response = user_controller.get_ratings()
+
+        if ratings_response is None:
+            return {"message": "User not found"}, 404
+
+        return create_stream_response(ratings_response, stream_format)
+
+
 @user_namespace.route("/<int:id>/recommendations")
 class UserRecsRouter(Resource):
     """
@@ -58,7 +102,8 @@ class UserRecsRouter(Resource):
     @jwt_required()
     def get(self, id):
         """
-        Retrieve movie recommendations for a user by ID.
+        Retrieve movie recommendations for a user by ID. If the cached recommendations are stale, they are returned
+        at once and their refresh is queued, the X-Refresh-Job header holds the ID of the job (see /jobs/<id>).
 
         :param id: The ID of the user.
         :type id: int
@@ -80,9 +125,51 @@ class UserRecsRouter(Resource):
         if recs_response is None:
             return {"message": "User not found"}, 404
 
+        refresh_job_id = user_controller.get_refresh_job_id()
+        if refresh_job_id is not None:
+            return recs_response, 200, {"X-Refresh-Job": str(refresh_job_id)}
+
         return recs_response, 200
 
 
+@user_namespace.route("/recommendations")
+class BatchRecsRouter(Resource):
+    """
+    A resource representing movie recommendations for many users. Provides the recommendations of all requested users
+    at once through the POST method, e.g. for a nightly e-mail job.
+    """
+
+    @user_namespace.expect(batch_recommendations_model)
+    @user_namespace.response(400, "Invalid user IDs")
+    @user_namespace.response(404, "User not found")
+    @jwt_required()
+    def post(self):
+        """
+        Retrieve movie recommendations for a list of users, or for all users with "all".
+
+        The response is streamed as NDJSON, one line per user as soon as the user's recommendations are calculated.
+
+        :return: An NDJSON stream, every line is a dictionary containing:
+                    - user_id (int): User ID.
+                    - recommendations (list[dict[str, any]]): The user's recommendations with the movie ID (id),
+                      similar_user_id, similar_user_rating and similar_user_correlation.
+        :rtype: Response
+        """
+        user_ids = (request.get_json(silent=True) or {}).get("user_ids")
+
+        if user_ids != "all" and (not isinstance(user_ids, list) or
+                                  not all(isinstance(user_id, int) and not isinstance(user_id, bool)
+                                          for user_id in user_ids)):
+            return {"message": "Invalid user IDs"}, 400
+
+        recs_response = UserController.get_batch_recommendations(user_ids)
+
+        if recs_response is None:
+            return {"message": "User not found"}, 404
+
+        return create_stream_response(recs_response, "ndjson", chunk_items=1)
+
+
 @user_namespace.route("/<int:id>/prediction/<int:movie_id>")
 class UserPredictionRouter(Resource):
     """
@@ -116,3 +203,92 @@ class UserPredictionRouter(Resource):
             return {"message": "User or movie not found"}, 404
 
         return prediction_response, 200
+
+
+@user_namespace.route("/<int:id>/predictions")
+class UserPredictionsRouter(Resource):
+    """
+    A resource representing predicted movie ratings of many movies for a user, e.g. for a movie list page.
+    The movie IDs are provided as a comma-separated query parameter (GET) or in the request body (POST).
+    """
+
+    @user_namespace.param("movie_ids", "Comma-separated movie IDs, e.g. 1,2,3 (at most PREDICTIONS_MAX_MOVIES)")
+    @user_namespace.response(400, "Invalid movie IDs")
+    @user_namespace.response(404, "User or movie not found")
+    @user_namespace.marshal_with(predictions_model)
+    @jwt_required()
+    def get(self, id):
+        """
+        Retrieve predicted movie ratings for a user by user's ID and movie IDs.
+
+        :param id: The ID of the user.
+        :type id: int
+
+        :return: A dictionary, containing:
+                    - user_id (int): The user's ID.
+                    - user_predicted_ratings (dict[int, float]): Predicted movie ratings, key: movie ID.
+        :rtype: dict[str, any]
+        """
+        try:
+            movie_ids = [int(movie_id) for movie_id in request.args.get("movie_ids", "").split(",") if movie_id]
+        except ValueError:
+            movie_ids = None
+
+        return _get_predictions(id, movie_ids)
+
+    @user_namespace.expect(predictions_request_model)
+    @user_namespace.response(400, "Invalid movie IDs")
+    @user_namespace.response(404, "User or movie not found")
+    @user_namespace.marshal_with(predictions_model)
+    @jwt_required()
+    def post(self, id):
+        """
+        Retrieve predicted movie ratings for a user by user's ID and movie IDs in the request body.
+
+        :param id: The ID of the user.
+        :type id: int
+
+        :return: A dictionary, containing:
+                    - user_id (int): The user's ID.
+                    - user_predicted_ratings (dict[int, float]): Predicted movie ratings, key: movie ID.
+        :rtype: dict[str, any]
+        """
+        movie_ids = (request.get_json(silent=True) or {}).get("movie_ids")
+
+        # JSON booleans are Python ints, they are not movie IDs.
+        if not isinstance(movie_ids, list) or \
+                not all(isinstance(movie_id, int) and not isinstance(movie_id, bool) for movie_id in movie_ids):
+            movie_ids = None
+
+        return _get_predictions(id, movie_ids)
+
+
+def _get_predictions(user_id, movie_ids):
+    """
+    Retrieves the predicted movie ratings for the user and creates the response.
+
+    :param user_id: The ID of the user.
+    :type user_id: int
+
+    :param movie_ids: The validated movie IDs, None if they are invalid. At most PREDICTIONS_MAX_MOVIES of them are
+                      accepted.
+    :type movie_ids: list[int] or None
+
+    :return: The response and the status code.
+    :rtype: tuple[dict[str, any], int]
+    """
+    if not movie_ids:
+        return {"message": "Invalid movie IDs"}, 400
+
+    max_movies = current_app.config["PREDICTIONS_MAX_MOVIES"]
+    if len(movie_ids) > max_movies:
+        return {"message": f"At most {max_movies} movie IDs are accepted"}, 400
+
+    user_controller = UserController(user_id)
+
+    predictions_response = user_controller.get_predicted_movie_ratings(movie_ids)
+
+    if predictions_response is None:
+        return {"message": "User or movie not found"}, 404
+
+    return predictions_response, 200
@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+
+# The settings read by src.exts.config, which is imported together with any module of the src package.
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("JWT_SECRET_KEY", "test-jwt-secret-key")
+os.environ.setdefault("SQLALCHEMY_TRACK_MODIFICATIONS", "False")
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+
+from src import create_app, TestConfig  # noqa: E402
+from src.exts import db  # noqa: E402
+from src.models import User, Movie, Rating  # noqa: E402
+
+
+@pytest.fixture
+def create_test_app(tmp_path):
+    """
+    Returns a function creating an application with the tables created in a new SQLite database. The background
+    jobs are run in the request (JOB_WORKERS=0), other settings are passed as keyword arguments.
+    """
+    def create(database_name="test.db", **settings):
+        class Config(TestConfig):
+            SQLALCHEMY_DATABASE_URI = "sqlite:///" + str(tmp_path / database_name)
+            JOB_WORKERS = 0
+
+        for key, value in settings.items():
+            setattr(Config, key, value)
+
+        app = create_app(Config)
+        with app.app_context():
+            db.create_all()
+
+        return app
+
+    return create
+
+
+@pytest.fixture
+def app(create_test_app):
+    """
+    The application with an empty database.
+    """
+    return create_test_app()
+
+
+def add_users_ratings(users_ratings, movies_count):
+    """
+    Adds the movies and the users with their ratings, in the application context.
+
+    :param users_ratings: The ratings of the users, key: user ID, value: dictionary with key: movie ID,
+                          value: rating value.
+    :type users_ratings: dict[int, dict[int, float]]
+
+    :param movies_count: The number of movies, their IDs start with 1.
+    :type movies_count: int
+    """
+    db.session.execute(db.insert(Movie), [
+        {"id": movie_id, "title": f"Movie {movie_id}", "category": "Drama", "country": "Czechia", "year": 2000,
+         "main_actors": "Actor", "description": "Description"} for movie_id in range(1, movies_count + 1)
+    ])
+    db.session.execute(db.insert(User), [
+        {"id": user_id, "name": "Name", "surname": "Surname", "email": f"user-{user_id}@example.com",
+         "password": "password"} for user_id in users_ratings
+    ])
+    db.session.execute(db.insert(Rating), [
+        {"user_id": user_id, "movie_id": movie_id, "rating": rating}
+        for user_id, ratings in users_ratings.items() for movie_id, rating in ratings.items()
+    ])
+    db.session.commit()
+
+
+def get_auth_headers(app, user_id):
+    """
+    Returns the headers authorizing the requests of a user.
+
+    :param app: The application.
+    :type app: Flask
+
+    :param user_id: The user ID.
+    :type user_id: int
+
+    :return: The Authorization header.
+    :rtype: dict[str, str]
+    """
+    with app.app_context():
+        return {"Authorization": f"Bearer {create_access_token(identity=f'user-{user_id}@example.com')}"}
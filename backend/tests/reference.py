@@ -0,0 +1,97 @@
+import random
+
+
+def get_reference_correlation(target_user_ratings, another_user_ratings):
+    """
+    The Spearman's rank correlation coefficient of two users as the original SpearmanMechanism calculated it, one pair
+    of rating dictionaries at a time. The optimized implementations are compared with it.
+
+    :param target_user_ratings: The target user's ratings, key: movie ID, value: rating value.
+    :type target_user_ratings: dict[int, float]
+
+    :param another_user_ratings: Another user's ratings, key: movie ID, value: rating value.
+    :type another_user_ratings: dict[int, float]
+
+    :return: Spearman's rank correlation coefficient.
+    :rtype: float
+    """
+    common_rated_movies = list(set(target_user_ratings) & set(another_user_ratings))
+
+    target_user_ranks = _get_reference_ranks(target_user_ratings, common_rated_movies)
+    another_user_ranks = _get_reference_ranks(another_user_ratings, common_rated_movies)
+
+    squared_rank_diffs_sum = sum((target_user_ranks[movie_id] - another_user_ranks[movie_id]) ** 2
+                                 for movie_id in common_rated_movies)
+
+    count = len(common_rated_movies)
+    if count <= 1:
+        return 0 if count == 0 else (1 if squared_rank_diffs_sum == 0 else 0)
+
+    return 1 - (6 * squared_rank_diffs_sum) / (count * (count ** 2 - 1))
+
+
+def generate_users_ratings(users_count, movies_count, seed, values=(1.0, 2.0, 2.5, 3.0, 4.0, 4.5, 5.0)):
+    """
+    Generates random ratings with many ties, users without common movies, users with a single common movie and
+    users who rated the same movies.
+
+    :param users_count: The number of users, their IDs start with 1.
+    :type users_count: int
+
+    :param movies_count: The number of movies, their IDs start with 1.
+    :type movies_count: int
+
+    :param seed: The seed of the random generator.
+    :type seed: int
+
+    :param values: The rating values.
+    :type values: tuple[float]
+
+    :return: The ratings of the users, key: user ID, value: dictionary with key: movie ID, value: rating value.
+    :rtype: dict[int, dict[int, float]]
+    """
+    generator = random.Random(seed)
+    users_ratings = {}
+
+    for user_id in range(1, users_count + 1):
+        rated_count = generator.choice([0, 1, 2, generator.randint(3, movies_count)])
+        movie_ids = generator.sample(range(1, movies_count + 1), rated_count)
+        users_ratings[user_id] = {movie_id: generator.choice(values) for movie_id in movie_ids}
+
+    # A user who rated the same movies as the first user, in a different order.
+    users_ratings[users_count + 1] = dict(reversed(list(users_ratings[1].items())))
+
+    return users_ratings
+
+
+def _get_reference_ranks(user_ratings, common_rated_movies):
+    """
+    Ranks the user's ratings of the common rated movies, tied ratings get the average of the ranks they span.
+
+    :param user_ratings: The user's ratings, key: movie ID, value: rating value.
+    :type user_ratings: dict[int, float]
+
+    :param common_rated_movies: The IDs of the common rated movies.
+    :type common_rated_movies: list[int]
+
+    :return: Key: movie ID, value: rank.
+    :rtype: dict[int, float]
+    """
+    sorted_ratings = sorted(((movie_id, rating) for movie_id, rating in user_ratings.items()
+                             if movie_id in common_rated_movies), key=lambda item: item[1])
+    ranks = {}
+
+    i = 0
+    while i < len(sorted_ratings):
+        same_ratings_count = 1
+        while i + same_ratings_count < len(sorted_ratings) and \
+                sorted_ratings[i + same_ratings_count][1] == sorted_ratings[i][1]:
+            same_ratings_count += 1
+
+        average_rank = sum(range(i + 1, i + same_ratings_count + 1)) / same_ratings_count
+        for k in range(i, i + same_ratings_count):
+            ranks[sorted_ratings[k][0]] = average_rank
+
+        i += same_ratings_count
+
+    return ranks
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from src.models import Rating
+from src.recsys import RatingsSnapshotStore
+
+from .conftest import add_users_ratings, get_auth_headers
+from .reference import generate_users_ratings
+
+
+@pytest.fixture
+def client_and_headers(app):
+    with app.app_context():
+        add_users_ratings({1: {1: 1.0, 2: 2.0, 3: 3.0}, 2: {1: 1.0, 2: 2.0, 3: 3.0, 4: 5.0}}, 5)
+
+    return app.test_client(), get_auth_headers(app, 1)
+
+
+def get_batch_lines(response):
+    """
+    Parses the NDJSON lines of a batch response.
+    """
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_batch_recommendations(client_and_headers):
+    client, headers = client_and_headers
+
+    response = client.post("/user/recommendations", json={"user_ids": [1, 2]}, headers=headers)
+
+    assert response.status_code == 200
+    assert [line["user_id"] for line in get_batch_lines(response)] == [1, 2]
+
+
+def test_request_does_not_start_a_process_pool(client_and_headers, monkeypatch):
+    client, headers = client_and_headers
+
+    def create_pool(*args, **kwargs):
+        raise AssertionError("A process pool was started.")
+
+    monkeypatch.setattr("os.cpu_count", lambda: 4)
+    monkeypatch.setattr("src.recsys.batch_recommendations.ProcessPoolExecutor", create_pool)
+    response = client.post("/user/recommendations", json={"user_ids": "all"}, headers=headers)
+
+    assert [line["user_id"] for line in get_batch_lines(response)] == [1, 2]
+
+
+@pytest.mark.parametrize("user_ids", [[True, 2], [True], [False], ["1"], [1.0], "1", None])
+def test_invalid_user_ids(client_and_headers, user_ids):
+    client, headers = client_and_headers
+
+    assert client.post("/user/recommendations", json={"user_ids": user_ids}, headers=headers).status_code == 400
+
+
+def test_missing_user(client_and_headers):
+    client, headers = client_and_headers
+
+    assert client.post("/user/recommendations", json={"user_ids": [1, 3]}, headers=headers).status_code == 404
+
+
+@pytest.mark.parametrize("shared_snapshot", [False, True])
+@pytest.mark.parametrize("processes", [1, 2])
+def test_batch_matches_the_recommendations_of_each_user(tmp_path, create_test_app, shared_snapshot, processes):
+    directory = str(tmp_path / "snapshots")
+    app = create_test_app(RECOMMENDATIONS_BATCH_PROCESSES=processes,
+                          **({"RATINGS_SNAPSHOT_DIR": directory} if shared_snapshot else {}))
+    users_ratings = generate_users_ratings(users_count=40, movies_count=20, seed=5, values=(1.0, 3.0, 4.5, 5.0))
+    with app.app_context():
+        add_users_ratings(users_ratings, movies_count=20)
+        if shared_snapshot:
+            RatingsSnapshotStore(directory).write(Rating.get_snapshot(), 2)
+
+    client = app.test_client()
+    headers = get_auth_headers(app, 1)
+
+    # The users rate movies after the shared snapshot was written.
+    for user_id in (1, 2, 3):
+        for movie_id, rating in users_ratings[user_id + 10].items():
+            response = client.put(f"/movies/movie/{movie_id}/rate", json={"user_id": user_id, "user_rating": rating},
+                                  headers=headers)
+            assert response.status_code == 200
+
+    user_ids = list(range(1, 16))
+    response = client.post("/user/recommendations", json={"user_ids": user_ids}, headers=headers)
+    batch = {line["user_id"]: [recommendation["id"] for recommendation in line["recommendations"]]
+             for line in get_batch_lines(response)}
+
+    for user_id in user_ids:
+        response = client.get(f"/user/{user_id}/recommendations", headers=headers)
+        assert batch[user_id] == [recommendation["id"] for recommendation in response.get_json()]
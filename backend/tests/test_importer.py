@@ -0,0 +1,121 @@
+import pytest
+
+from src.exts import db
+from src.models import ImportProgress, Movie, Rating
+
+
+MOVIES_COUNT = 4
+UNKNOWN_MOVIE_ID = 99
+CHUNK_SIZE = 3
+BULK_UPSERT = Rating.bulk_upsert
+
+# The rows of the rating dump, every third row rates a movie that does not exist.
+ROWS = [(user_id, UNKNOWN_MOVIE_ID if user_id % 3 == 0 else user_id % MOVIES_COUNT + 1, float(user_id % 5 + 1))
+        for user_id in range(1, 11)]
+
+
+@pytest.fixture
+def ratings_path(app, tmp_path):
+    """
+    The path of the rating dump with the ROWS, the movies of the dump are created without any ratings.
+    """
+    with app.app_context():
+        db.session.execute(db.insert(Movie), [
+            {"id": movie_id, "title": f"Movie {movie_id}", "category": "Drama", "country": "Czechia", "year": 2000,
+             "main_actors": "Actor", "description": "Description"} for movie_id in range(1, MOVIES_COUNT + 1)
+        ])
+        db.session.commit()
+
+    path = tmp_path / "ratings.csv"
+    path.write_text("user_id,book_id,rating\n" + "".join(f"{user_id},{movie_id},{rating}\n"
+                                                         for user_id, movie_id, rating in ROWS))
+
+    return str(path)
+
+
+def record_imported_rows(monkeypatch, interrupted_chunk=None):
+    """
+    Records the ratings passed to Rating.bulk_upsert() by the import.
+
+    :param interrupted_chunk: The number of the chunk (starting with 1) whose import is interrupted, as with Ctrl+C.
+    :type interrupted_chunk: int or None
+
+    :return: The recorded ratings, the ratings of the interrupted chunk are not included.
+    :rtype: list[tuple[int, int, float]]
+    """
+    imported_rows = []
+    chunks = []
+
+    def record_bulk_upsert(ratings):
+        chunks.append(ratings)
+        if len(chunks) == interrupted_chunk:
+            raise KeyboardInterrupt()
+
+        imported_rows.extend(ratings)
+        return BULK_UPSERT(ratings)
+
+    monkeypatch.setattr(Rating, "bulk_upsert", record_bulk_upsert)
+
+    return imported_rows
+
+
+def run_import(app, path, *args):
+    """
+    Runs flask import ratings with the chunk size CHUNK_SIZE.
+    """
+    return app.test_cli_runner().invoke(args=["import", "ratings", path, "--chunk-size", str(CHUNK_SIZE), *args])
+
+
+def assert_ratings_imported(app):
+    """
+    Checks that every rating of a known movie was stored and that the movies' aggregates count it once.
+    """
+    expected = {(user_id, movie_id): rating for user_id, movie_id, rating in ROWS if movie_id != UNKNOWN_MOVIE_ID}
+
+    with app.app_context():
+        assert {(rating.user_id, rating.movie_id): rating.rating for rating in Rating.query.all()} == expected
+        assert sum(movie.rating_count for movie in Movie.query.all()) == len(expected)
+
+        progress = ImportProgress.query.one()
+        assert (progress.rows, progress.completed) == (len(ROWS), True)
+
+
+def test_interrupted_import_resumes_after_the_last_committed_chunk(app, ratings_path, monkeypatch):
+    # The third chunk (rows 7 to 9) is interrupted, the first two chunks are committed.
+    imported_rows = record_imported_rows(monkeypatch, interrupted_chunk=3)
+    result = run_import(app, ratings_path)
+    assert result.exit_code != 0
+
+    with app.app_context():
+        progress = ImportProgress.query.one()
+        assert (progress.rows, progress.completed) == (2 * CHUNK_SIZE, False)
+        assert Rating.query.count() == len([row for row in imported_rows if row[1] != UNKNOWN_MOVIE_ID])
+
+    rerun_rows = record_imported_rows(monkeypatch)
+    result = run_import(app, ratings_path)
+    assert result.exit_code == 0, result.output
+    assert f"Resuming after row {2 * CHUNK_SIZE}." in result.output
+
+    # Every row is imported once, the ratings of the unknown movie are skipped.
+    assert imported_rows + rerun_rows == ROWS
+    assert f"Imported 3 of {len(ROWS) - 2 * CHUNK_SIZE} rows" in result.output
+    assert_ratings_imported(app)
+
+
+def test_completed_import_is_skipped_unless_restarted(app, ratings_path, monkeypatch):
+    result = run_import(app, ratings_path)
+    assert result.exit_code == 0, result.output
+    assert_ratings_imported(app)
+
+    imported_rows = record_imported_rows(monkeypatch)
+    result = run_import(app, ratings_path)
+    assert result.exit_code == 0, result.output
+    assert f"was already imported ({len(ROWS)} rows)" in result.output
+    assert imported_rows == []
+
+    # The restarted import reads the whole file again, the existing ratings are updated, not duplicated.
+    result = run_import(app, ratings_path, "--restart")
+    assert result.exit_code == 0, result.output
+    assert "Resuming" not in result.output
+    assert imported_rows == ROWS
+    assert_ratings_imported(app)
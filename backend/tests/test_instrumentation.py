@@ -0,0 +1,48 @@
+import re
+
+from sqlalchemy import event
+
+from src.exts import db
+
+from .conftest import add_users_ratings, get_auth_headers
+
+
+def get_db_queries(client, endpoint):
+    """
+    Returns the number of the SQL statements of the endpoint's requests exported at /metrics.
+    """
+    metrics = client.get("/metrics").get_data(as_text=True)
+    match = re.search(rf'^db_queries_total{{endpoint="{re.escape(endpoint)}"}} (\d+)$', metrics, re.MULTILINE)
+
+    return int(match.group(1)) if match else 0
+
+
+def test_statements_of_a_streamed_body_are_recorded_when_the_response_is_closed(create_test_app):
+    app = create_test_app(INSTRUMENTATION_ENABLED=True)
+
+    with app.app_context():
+        add_users_ratings({1: {movie_id: 3.0 for movie_id in range(1, 251)}}, 250)
+        engine = db.engine
+
+    client = app.test_client()
+    headers = get_auth_headers(app, 1)
+    queries_before = get_db_queries(client, "user_user_ratings_router")
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.get("/user/1/ratings?stream=ndjson", headers=headers)
+        assert response.is_streamed
+        assert "Server-Timing" in response.headers
+
+        assert len(response.get_data(as_text=True).splitlines()) == 250
+        response.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    assert statements
+    assert get_db_queries(client, "user_user_ratings_router") - queries_before == len(statements)
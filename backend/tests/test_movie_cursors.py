@@ -0,0 +1,51 @@
+import base64
+import json
+
+import pytest
+
+from src.models.db_movie_model import encode_cursor, decode_cursor
+
+from .conftest import add_users_ratings, get_auth_headers
+
+
+SORT_COLUMNS = [("id", "asc")]
+
+
+@pytest.mark.parametrize("value", [1, 2.5, "title", None])
+def test_decode_cursor(value):
+    assert decode_cursor(encode_cursor(SORT_COLUMNS, [value]), SORT_COLUMNS) == [value]
+
+
+@pytest.mark.parametrize("cursor", [
+    encode_cursor(SORT_COLUMNS, [{"a": 1}]),
+    encode_cursor(SORT_COLUMNS, [[1]]),
+    encode_cursor(SORT_COLUMNS, [True]),
+    encode_cursor(SORT_COLUMNS, [1, 2]),
+    encode_cursor([("title", "asc")], [1]),
+    base64.urlsafe_b64encode(json.dumps([1]).encode()).decode(),
+    "not a cursor",
+])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor."):
+        decode_cursor(cursor, SORT_COLUMNS)
+
+
+def test_movies_page_with_invalid_cursor(app):
+    with app.app_context():
+        add_users_ratings({1: {1: 4.0}}, movies_count=3)
+        headers = get_auth_headers(app, 1)
+
+    client = app.test_client()
+    response = client.get("/movies", query_string={"limit": 2}, headers=headers)
+    assert response.status_code == 200
+    next_cursor = response.get_json()["next_cursor"]
+
+    sort_columns = json.loads(base64.urlsafe_b64decode(next_cursor + "=" * (-len(next_cursor) % 4)))["sort"]
+    cursor = encode_cursor(sort_columns, [{"a": 1}])
+
+    response = client.get("/movies", query_string={"limit": 2, "cursor": cursor}, headers=headers)
+    assert response.status_code == 400
+
+    response = client.get("/movies", query_string={"limit": 2, "cursor": next_cursor}, headers=headers)
+    assert response.status_code == 200
+    assert [movie["id"] for movie in response.get_json()["movies"]] == [3]
@@ -0,0 +1,115 @@
+import pytest
+
+from src.exts import db
+from src.models import Movie, MovieFacetCount
+from src.models.db_movie_facet_model import FACET_COLUMNS, QUERY_FILTER_PARAMS
+
+from .conftest import add_users_ratings, get_auth_headers
+
+
+CATEGORIES = ("Comedy", "Drama", "Horror")
+COUNTRIES = ("Czechia", "Japan")
+YEARS = (1999, 2000, 2001)
+
+
+@pytest.fixture
+def movies(app):
+    """
+    The movie 1 (Drama, Czechia, 2000) rated by the user 1 and the movies 2 to 31 of various facet values.
+    """
+    with app.app_context():
+        add_users_ratings({1: {1: 4.0}}, 1)
+        db.session.execute(db.insert(Movie), [
+            {"id": movie_id, "title": f"Movie {movie_id}", "category": CATEGORIES[movie_id % 3],
+             "country": COUNTRIES[movie_id % 5 % 2], "year": YEARS[movie_id % 7 % 3], "main_actors": "Actor",
+             "description": "Description"} for movie_id in range(2, 32)
+        ])
+        db.session.commit()
+
+
+def get_grouped_movie_counts(filters=None, excluded_column=None):
+    """
+    Counts the movies of every combination of the faceted columns by grouping the movie table.
+
+    :param filters: The filter parameters, the filters of the excluded column are left out.
+    :type filters: dict or None
+
+    :param excluded_column: The faceted column whose filters are left out.
+    :type excluded_column: str or None
+
+    :return: Key: (category, country, year), value: the number of movies.
+    :rtype: dict[tuple[str, str, int], int]
+    """
+    query = db.session.query(Movie.category, Movie.country, Movie.year, db.func.count(Movie.id))
+    for key, value in (filters or {}).items():
+        column_name = QUERY_FILTER_PARAMS[key]
+        if column_name == excluded_column:
+            continue
+
+        column = getattr(Movie, column_name)
+        query = query.filter(column >= value if key == "filter_year_from" else
+                             column <= value if key == "filter_year_to" else column == value)
+
+    rows = query.group_by(Movie.category, Movie.country, Movie.year).all()
+
+    return {(category, country, year): count for category, country, year, count in rows}
+
+
+def assert_facet_counts_match_movies():
+    """
+    Compares the count table with the movie table grouped by the faceted columns.
+    """
+    facet_counts = {(row.category, row.country, row.year): row.movie_count for row in MovieFacetCount.query.all()}
+
+    assert facet_counts == get_grouped_movie_counts()
+
+
+def test_triggers_keep_the_facet_counts_in_sync(app, movies):
+    with app.app_context():
+        assert_facet_counts_match_movies()
+
+        Movie(id=32, title="New movie", category="Western", country="Chile", year=1960, main_actors="Actor",
+              description="Description").save()
+        assert_facet_counts_match_movies()
+        assert MovieFacetCount.query.filter_by(category="Western").one().movie_count == 1
+
+        # Moving a movie into another combination, then an update of columns that are not faceted.
+        movie = db.session.get(Movie, 2)
+        movie.country, movie.year = "Chile", 1960
+        db.session.commit()
+        assert_facet_counts_match_movies()
+
+        movie.title, movie.average_rating = "Renamed movie", 4.5
+        db.session.commit()
+        assert_facet_counts_match_movies()
+
+        # The delete of the last movie of a combination removes the combination.
+        db.session.get(Movie, 32).delete()
+        assert_facet_counts_match_movies()
+        assert MovieFacetCount.query.filter_by(category="Western").count() == 0
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"filter_category": "Drama"},
+    {"filter_category": "Comedy", "filter_country": "Japan"},
+    {"filter_country": "Czechia", "filter_year_from": "2000"},
+    {"filter_category": "Horror", "filter_year_from": "2000", "filter_year_to": "2000"},
+])
+def test_facet_counts_exclude_the_filter_of_their_own_facet(app, movies, filters):
+    response = app.test_client().get("/movies/sort", query_string={"title": "abc", **filters},
+                                     headers=get_auth_headers(app, 1))
+    assert response.status_code == 200, response.get_json()
+    facets = response.get_json()["facets"]
+
+    with app.app_context():
+        for facet in FACET_COLUMNS:
+            expected = {}
+            grouped_counts = get_grouped_movie_counts({key: int(value) if key.startswith("filter_year") else value
+                                                       for key, value in filters.items()}, excluded_column=facet)
+            for combination, count in grouped_counts.items():
+                value = combination[FACET_COLUMNS.index(facet)]
+                expected[value] = expected.get(value, 0) + count
+
+            assert facets[facet] == [{"value": value, "count": count} for value, count in sorted(expected.items())], \
+                facet
@@ -0,0 +1,100 @@
+import pytest
+
+from src.exts import db
+from src.models import Comment, Movie
+
+from .conftest import add_users_ratings, get_auth_headers
+
+
+MOVIES_COUNT = 12
+
+
+@pytest.fixture
+def client(app):
+    """
+    The test client of an application with MOVIES_COUNT movies, whose descriptions of the same length repeat "zebra"
+    one to four times, so several movies have the same score. The main actors of the movie 1 are "Zebras".
+    """
+    with app.app_context():
+        add_users_ratings({1: {1: 4.0}, 2: {1: 3.0}}, MOVIES_COUNT)
+        db.session.execute(db.update(Movie), [
+            {"id": movie_id, "description": " ".join(["zebra"] * (movie_id % 4 + 1) + ["savanna"] * (3 - movie_id % 4))}
+            for movie_id in range(1, MOVIES_COUNT + 1)
+        ])
+        db.session.execute(db.update(Movie).where(Movie.id == 1).values(main_actors="Zebras"))
+        db.session.commit()
+
+    return app.test_client()
+
+
+def search(app, client, text, **params):
+    """
+    Requests a page of the search results as the user 1.
+    """
+    response = client.get("/movies/search", query_string={"q": text, **params}, headers=get_auth_headers(app, 1))
+    assert response.status_code == 200, response.get_json()
+
+    return response.get_json()
+
+
+def get_movie_ids(app, text):
+    """
+    Returns the IDs of all movies matching the text, the best match first.
+    """
+    with app.app_context():
+        return [movie["id"] for movie in Movie.search(text, limit=MOVIES_COUNT)["movies"]]
+
+
+def test_pages_follow_the_ranking(app, client):
+    with app.app_context():
+        Comment.upsert(5, 1, "A zebra crossing")
+        Comment.upsert(6, 2, "Zebra again")
+
+    first_page = search(app, client, "zebra", limit=MOVIES_COUNT)
+    assert first_page["next_cursor"] is None
+    scores = [(-float(movie["score"]), movie["id"]) for movie in first_page["movies"]]
+    assert len(scores) == MOVIES_COUNT
+    assert scores == sorted(scores)
+    assert len({score for score, _ in scores}) < MOVIES_COUNT  # There are ties, ordered by the ID.
+
+    # The keyset cursor holds the float score of the last movie of a page.
+    movie_ids, cursor = [], None
+    while True:
+        page = search(app, client, "zebra", limit=5, **({"cursor": cursor} if cursor else {}))
+        movie_ids += [movie["id"] for movie in page["movies"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert movie_ids == [movie["id"] for movie in first_page["movies"]]
+
+
+def test_edited_and_deleted_comments_leave_the_index(app, client):
+    with app.app_context():
+        Comment.upsert(MOVIES_COUNT, 1, "Stunning giraffe")
+        Comment.upsert(2, 2, "The giraffe again")
+        assert get_movie_ids(app, "giraffe") == [2, MOVIES_COUNT]
+
+        # The edited comment matches its new text only.
+        Comment.upsert(MOVIES_COUNT, 1, "Stunning elephant")
+        assert get_movie_ids(app, "giraffe") == [2]
+        assert get_movie_ids(app, "elephant") == [MOVIES_COUNT]
+
+        Comment.query.filter_by(movie_id=2, user_id=2).one().delete()
+        assert get_movie_ids(app, "giraffe") == []
+        assert get_movie_ids(app, "stunning") == [MOVIES_COUNT]
+
+
+@pytest.mark.parametrize("text", ["zebra OR giraffe", "zebra NOT giraffe", 'zebra" OR "giraffe', "NOT giraffe"])
+def test_search_syntax_is_not_interpreted(app, client, text):
+    with app.app_context():
+        Comment.upsert(4, 1, "Zebra or not, the giraffe")
+
+    # The words of the text are searched as quoted terms, so the FTS5 operators are searched as words, which only
+    # the comment contains. Unquoted, they would select other movies or be a syntax error.
+    assert [movie["id"] for movie in search(app, client, text, limit=MOVIES_COUNT)["movies"]] == [4]
+
+
+def test_search_without_words_is_rejected(app, client):
+    response = client.get("/movies/search", query_string={"q": '"* -'}, headers=get_auth_headers(app, 1))
+    assert response.status_code == 400
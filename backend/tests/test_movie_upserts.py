@@ -0,0 +1,100 @@
+import pytest
+
+from src.exts import db
+from src.models import Comment, Movie, Rating
+
+from .conftest import add_users_ratings, get_auth_headers
+
+
+@pytest.fixture
+def client(app):
+    """
+    The test client of an application with two movies and three users, only the movie 2 is rated.
+    """
+    with app.app_context():
+        add_users_ratings({1: {2: 1.0}, 2: {2: 2.0}, 3: {2: 3.0}}, 2)
+
+    return app.test_client()
+
+
+def rate(app, client, user_id, rating):
+    """
+    Rates the movie 1 as the user.
+    """
+    response = client.put("/movies/movie/1/rate", json={"user_id": user_id, "user_rating": rating},
+                          headers=get_auth_headers(app, user_id))
+    assert response.status_code == 200, response.get_json()
+
+    return response.get_json()
+
+
+def comment(app, client, user_id, text):
+    """
+    Comments the movie 1 as the user.
+    """
+    response = client.put("/movies/movie/1/comment", json={"user_id": user_id, "user_comment": text},
+                          headers=get_auth_headers(app, user_id))
+    assert response.status_code == 200, response.get_json()
+
+    return response.get_json()
+
+
+def assert_rating_response_matches_database(response):
+    """
+    Compares the returned aggregates of the movie 1 with its ratings in the database.
+    """
+    ratings = [rating for rating, in db.session.query(Rating.rating).filter(Rating.movie_id == 1).all()]
+    movie = db.session.get(Movie, 1)
+
+    assert response["rating_count"] == len(ratings) == movie.rating_count
+    assert response["rating"] == pytest.approx(sum(ratings) / len(ratings)) == movie.average_rating
+
+
+def test_rating_and_rerating_return_the_aggregates_of_the_database(app, client):
+    response = rate(app, client, 1, 4.0)
+    assert response["user_rating"] == 4.0
+    with app.app_context():
+        assert_rating_response_matches_database(response)
+        assert db.session.get(Movie, 1).ratings_4 == 1
+
+    response = rate(app, client, 2, 2.0)
+    with app.app_context():
+        assert_rating_response_matches_database(response)
+
+    # The user 1 rates the movie again, into another bucket of the histogram.
+    response = rate(app, client, 1, 1.0)
+    with app.app_context():
+        assert_rating_response_matches_database(response)
+        assert Rating.query.filter_by(movie_id=1, user_id=1).one().rating == 1.0
+
+        movie = db.session.get(Movie, 1)
+        assert (movie.ratings_1, movie.ratings_2, movie.ratings_4) == (1, 1, 0)
+
+
+def test_commenting_and_editing_return_the_comment_count_of_the_database(app, client):
+    response = comment(app, client, 1, "First comment")
+    assert (response["comment_count"], response["user_comment"]) == (1, "First comment")
+
+    response = comment(app, client, 2, "Second comment")
+    assert response["comment_count"] == 2
+
+    # The user 1 edits the comment, the count stays.
+    response = comment(app, client, 1, "Edited comment")
+    assert (response["comment_count"], response["user_comment"]) == (2, "Edited comment")
+
+    with app.app_context():
+        assert db.session.get(Movie, 1).comment_count == Comment.query.filter_by(movie_id=1).count() == 2
+        assert Comment.query.filter_by(movie_id=1, user_id=1).one().comment == "Edited comment"
+
+
+def test_rating_or_commenting_a_missing_movie(app, client):
+    headers = get_auth_headers(app, 1)
+
+    response = client.put("/movies/movie/3/rate", json={"user_id": 1, "user_rating": 4.0}, headers=headers)
+    assert response.status_code == 404
+
+    response = client.put("/movies/movie/3/comment", json={"user_id": 1, "user_comment": "Comment"}, headers=headers)
+    assert response.status_code == 404
+
+    with app.app_context():
+        assert Rating.query.filter_by(movie_id=3).count() == Comment.query.filter_by(movie_id=3).count() == 0
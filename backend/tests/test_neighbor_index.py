@@ -0,0 +1,124 @@
+import pytest
+
+from src.exts import neighbor_index
+from src.models import Correlation, Rating
+from src.recsys import NeighborIndex, RecMechanism
+
+from .conftest import add_users_ratings, get_auth_headers
+from .reference import generate_users_ratings
+
+
+MOVIES_COUNT = 12
+
+
+@pytest.mark.parametrize("settings", [{"NEIGHBOR_INDEX_SIZE": RecMechanism.MAX_NEIGHBORS - 1},
+                                      {"NEIGHBOR_INDEX_MIN_CORRELATION": RecMechanism.MIN_CORRELATION + 0.1}])
+def test_index_that_cannot_serve_the_predictions_is_rejected(create_test_app, settings):
+    with pytest.raises(ValueError):
+        create_test_app(**settings)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_predictions_from_the_index_match_the_cold_predictions(create_test_app, seed):
+    app = create_test_app(NEIGHBOR_INDEX_SIZE=RecMechanism.MAX_NEIGHBORS)
+    users_ratings = generate_users_ratings(users_count=60, movies_count=MOVIES_COUNT, seed=seed,
+                                           values=(1.0, 2.0, 3.0, 4.0, 5.0))
+    with app.app_context():
+        add_users_ratings(users_ratings, movies_count=MOVIES_COUNT)
+        snapshot = Rating.get_snapshot()
+
+    client = app.test_client()
+    for user_id in range(1, 8):
+        headers = get_auth_headers(app, user_id)
+        rec_mechanism = RecMechanism(snapshot.get_user(user_id),
+                                     spearman_correlation_coefficients=snapshot.get_correlations(user_id))
+
+        for movie_id in range(1, MOVIES_COUNT + 1):
+            neighbor_index.clear()
+            cold = client.get(f"/user/{user_id}/prediction/{movie_id}", headers=headers).get_json()
+            assert neighbor_index.get(user_id) is not None
+
+            warm = client.get(f"/user/{user_id}/prediction/{movie_id}", headers=headers).get_json()
+
+            expected = rec_mechanism.get_predicted_rating_for_movie(movie_id)
+            assert float(cold["user_predicted_rating"]) == pytest.approx(expected)
+            assert float(warm["user_predicted_rating"]) == pytest.approx(expected)
+
+
+def test_neighbor_index_command_rejects_a_small_size(app):
+    result = app.test_cli_runner().invoke(args=["recsys", "neighbor-index", "--size",
+                                                str(RecMechanism.MAX_NEIGHBORS - 1)])
+
+    assert result.exit_code == 2
+    assert "--size" in result.output
+
+
+def test_entries_of_another_version_are_dropped():
+    index = NeighborIndex(max_neighbors=2, min_correlation=0.5)
+    index.sync(1)
+    index.put(1, {2: 0.9, 3: 0.8, 4: 0.1}, version=1)
+
+    # The entry calculated before the version changed is not stored.
+    index.put(2, {1: 0.9}, version=0)
+    assert index.get(1) == [(2, 0.9), (3, 0.8)] and index.get(2) is None
+
+    index.sync(1)
+    assert len(index) == 1
+
+    index.sync(2)
+    assert len(index) == 0 and index.version == 2
+
+
+def test_update_user_of_the_next_version():
+    index = NeighborIndex(max_neighbors=2, min_correlation=0.5)
+    index.sync(1)
+    index.put(1, {2: 0.9, 3: 0.8}, version=1)
+
+    index.update_user(3, {1: 0.95}, version=2)
+    assert index.get(1) == [(3, 0.95), (2, 0.9)] and index.version == 2
+
+    # The index missed the version 3, made by another process.
+    index.update_user(2, {1: 0.6}, version=4)
+    assert len(index) == 0 and index.version == 4
+
+
+def test_rating_change_of_another_process_drops_the_neighbors(app):
+    users_ratings = generate_users_ratings(users_count=40, movies_count=MOVIES_COUNT, seed=1,
+                                           values=(1.0, 2.0, 3.0, 4.0, 5.0))
+    with app.app_context():
+        add_users_ratings(users_ratings, movies_count=MOVIES_COUNT)
+        Correlation.rebuild(Rating.get_snapshot(), processes=1)
+
+    client = app.test_client()
+    headers = get_auth_headers(app, 1)
+
+    # The users copy the ratings of the user with the most ratings, one by one, and become the user's neighbors.
+    source_user_id = max(users_ratings, key=lambda user_id: len(users_ratings[user_id]))
+
+    for user_id in range(2, 8):
+        # The neighbors of the users are indexed.
+        for another_user_id in [source_user_id] + list(range(1, MOVIES_COUNT + 1)):
+            client.get(f"/user/{another_user_id}/prediction/1", headers=get_auth_headers(app, another_user_id))
+
+        # Another worker process refreshes the correlations of the user, the index of this process misses the change.
+        missed_neighbors, missed_version = dict(neighbor_index.neighbors), neighbor_index.version
+        for movie_id, rating in users_ratings[source_user_id].items():
+            response = client.put(f"/movies/movie/{movie_id}/rate", json={"user_id": user_id, "user_rating": rating},
+                                  headers=headers)
+            assert response.status_code == 200
+        neighbor_index.neighbors, neighbor_index.version = missed_neighbors, missed_version
+
+        with app.app_context():
+            snapshot = Rating.get_snapshot()
+
+        for another_user_id in [source_user_id] + list(range(1, MOVIES_COUNT + 1)):
+            rec_mechanism = RecMechanism(snapshot.get_user(another_user_id),
+                                         spearman_correlation_coefficients=snapshot.get_correlations(another_user_id))
+            response = client.get(f"/user/{another_user_id}/predictions",
+                                  query_string={"movie_ids": ",".join(map(str, range(1, MOVIES_COUNT + 1)))},
+                                  headers=get_auth_headers(app, another_user_id))
+            predictions = response.get_json()["user_predicted_ratings"]
+
+            for movie_id in range(1, MOVIES_COUNT + 1):
+                assert float(predictions[str(movie_id)]) == pytest.approx(
+                    rec_mechanism.get_predicted_rating_for_movie(movie_id))
@@ -0,0 +1,37 @@
+import pytest
+
+from .conftest import add_users_ratings, get_auth_headers
+
+
+@pytest.fixture
+def client_and_headers(create_test_app):
+    app = create_test_app(PREDICTIONS_MAX_MOVIES=3)
+    with app.app_context():
+        add_users_ratings({1: {1: 1.0, 2: 2.0, 3: 3.0}, 2: {1: 1.0, 2: 2.0, 3: 3.0, 4: 5.0}}, 5)
+
+    return app.test_client(), get_auth_headers(app, 1)
+
+
+def test_predictions_of_several_movies(client_and_headers):
+    client, headers = client_and_headers
+
+    get_response = client.get("/user/1/predictions?movie_ids=4,5", headers=headers)
+    post_response = client.post("/user/1/predictions", json={"movie_ids": [4, 5]}, headers=headers)
+
+    assert get_response.status_code == post_response.status_code == 200
+    assert get_response.get_json() == post_response.get_json()
+    assert set(get_response.get_json()["user_predicted_ratings"]) == {"4", "5"}
+
+
+@pytest.mark.parametrize("movie_ids", [[], [1, True], [False], ["1"], [1, 2, 3, 4], "1,2"])
+def test_invalid_movie_ids_in_the_body(client_and_headers, movie_ids):
+    client, headers = client_and_headers
+
+    assert client.post("/user/1/predictions", json={"movie_ids": movie_ids}, headers=headers).status_code == 400
+
+
+@pytest.mark.parametrize("movie_ids", ["", "1,a", "true", "1,2,3,4"])
+def test_invalid_movie_ids_in_the_query(client_and_headers, movie_ids):
+    client, headers = client_and_headers
+
+    assert client.get(f"/user/1/predictions?movie_ids={movie_ids}", headers=headers).status_code == 400
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import event
+
+from src.exts import db
+
+from .conftest import add_users_ratings, get_auth_headers
+from .reference import generate_users_ratings
+
+
+MOVIES_COUNT = 40
+
+
+def count_statements(app, url):
+    """
+    Requests the URL as the user 1 and counts the executed SQL statements.
+
+    :param app: The application.
+    :type app: Flask
+
+    :param url: The requested URL.
+    :type url: str
+
+    :return: The number of statements.
+    :rtype: int
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    headers = get_auth_headers(app, 1)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = app.test_client().get(url, headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    assert response.status_code == 200, response.get_json()
+
+    return len(statements)
+
+
+@pytest.mark.parametrize("url", ["/user/1/recommendations", f"/user/1/prediction/{MOVIES_COUNT}"])
+def test_statement_count_does_not_depend_on_user_count(create_test_app, url):
+    statement_counts = []
+
+    for users_count in (10, 80):
+        # The user 1 and the neighbor 2 have the same ratings in both databases, the other users are random.
+        users_ratings = generate_users_ratings(users_count, MOVIES_COUNT, seed=users_count)
+        users_ratings[1] = {movie_id: float(movie_id % 5 + 1) for movie_id in range(1, 11)}
+        users_ratings[2] = {**users_ratings[1], 20: 5.0}
+
+        app = create_test_app(f"users-{users_count}.db")
+        with app.app_context():
+            add_users_ratings(users_ratings, MOVIES_COUNT)
+
+        # The first request calculates the correlation coefficients of the user, the second one reads the cached
+        # recommendations or the indexed neighbors.
+        statement_counts.append((count_statements(app, url), count_statements(app, url)))
+
+    assert statement_counts[0] == statement_counts[1]
@@ -0,0 +1,107 @@
+import math
+
+import pytest
+
+from src.exts import db
+from src.models import Movie, Rating, User
+from src.models.db_movie_model import RATING_HISTOGRAM_COLUMNS, get_rating_histogram_column, \
+    get_rating_histogram_filter
+
+
+MOVIES_COUNT = 3
+
+
+@pytest.fixture
+def app_context(app):
+    """
+    The application context with the movies and the users 1 to 3, without any ratings.
+    """
+    with app.app_context():
+        db.session.execute(db.insert(Movie), [
+            {"id": movie_id, "title": f"Movie {movie_id}", "category": "Drama", "country": "Czechia", "year": 2000,
+             "main_actors": "Actor", "description": "Description"} for movie_id in range(1, MOVIES_COUNT + 1)
+        ])
+        db.session.execute(db.insert(User), [
+            {"id": user_id, "name": "Name", "surname": "Surname", "email": f"user-{user_id}@example.com",
+             "password": "password"} for user_id in range(1, 4)
+        ])
+        db.session.commit()
+
+        yield
+
+
+def assert_aggregates_match_ratings():
+    """
+    Compares the aggregate columns of every movie with the aggregates calculated from the rating table.
+    """
+    db.session.expire_all()
+
+    for movie in Movie.query.order_by(Movie.id).all():
+        ratings = [rating for rating, in db.session.query(Rating.rating).filter(Rating.movie_id == movie.id).all()]
+        assert movie.rating_count == len(ratings)
+        assert movie.rating_sum == pytest.approx(sum(ratings))
+        assert movie.average_rating == pytest.approx(sum(ratings) / len(ratings) if ratings else 0)
+
+        # The ratings rounded half up to whole stars.
+        stars = [min(max(math.floor(rating + 0.5), 1), 5) for rating in ratings]
+        assert [getattr(movie, column) for column in RATING_HISTOGRAM_COLUMNS] == \
+            [stars.count(star) for star in range(1, 6)], f"movie {movie.id}"
+
+
+def test_aggregates_follow_the_created_updated_and_deleted_ratings(app_context):
+    Rating.create(1, 1, 4.5).save()
+    Rating.create(1, 2, 2.0).save()
+    Rating.create(2, 1, 0.5).save()
+    assert_aggregates_match_ratings()
+
+    # A re-rating with create() moves the rating into another bucket.
+    Rating.create(1, 1, 1.5).save()
+    assert_aggregates_match_ratings()
+
+    rating = Rating.query.filter_by(movie_id=1, user_id=2).one()
+    rating.update_rating(3.5)
+    assert_aggregates_match_ratings()
+
+    rating.delete()
+    Rating.query.filter_by(movie_id=2, user_id=1).one().delete()
+    assert_aggregates_match_ratings()
+    assert db.session.get(Movie, 2).rating_count == 0
+
+
+def test_aggregates_follow_the_upserted_ratings(app_context):
+    assert Rating.upsert(1, 1, 2.5) == (1, pytest.approx(2.5))
+    assert Rating.upsert(1, 2, 5.0) == (2, pytest.approx(3.75))
+    assert_aggregates_match_ratings()
+
+    # The old rating is on a bucket boundary, the bucket is found by get_rating_histogram_filter().
+    assert Rating.upsert(1, 1, 1.0) == (2, pytest.approx(3.0))
+    assert_aggregates_match_ratings()
+
+    assert Rating.upsert(1, 2, 5.0) == (2, pytest.approx(3.0))
+    assert_aggregates_match_ratings()
+
+    assert Rating.upsert(MOVIES_COUNT + 1, 1, 3.0) is None
+    assert_aggregates_match_ratings()
+
+
+def test_aggregates_follow_the_bulk_upserted_ratings(app_context):
+    Rating.create(1, 1, 1.0).save()
+
+    # The same pairs twice in one chunk, the last rating wins, and a movie that does not exist.
+    assert Rating.bulk_upsert([(1, 1, 3.0), (2, 1, 4.0), (1, 1, 5.0), (2, 2, 2.0), (2, 1, 1.5),
+                               (3, MOVIES_COUNT + 1, 3.0)]) == (2, 1)
+    db.session.commit()
+    assert_aggregates_match_ratings()
+
+    assert Rating.bulk_upsert([(3, 1, 2.5), (3, 1, 4.5), (2, 2, 0.5)]) == (1, 1)
+    db.session.commit()
+    assert_aggregates_match_ratings()
+    assert Rating.query.count() == 4
+
+
+@pytest.mark.parametrize("rating", [0.5, 1.0, 1.49, 1.5, 2.0, 2.5, 3.49, 3.5, 4.49, 4.5, 5.0])
+def test_histogram_filter_matches_the_histogram_column(app_context, rating):
+    for column in RATING_HISTOGRAM_COLUMNS:
+        matches = db.session.scalar(db.select(db.case((get_rating_histogram_filter(db.literal(rating), column), 1),
+                                                      else_=0)))
+        assert matches == int(column == get_rating_histogram_column(rating)), column
@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from src.exts import db
+from src.models import Correlation, Job, Rating
+
+from .conftest import add_users_ratings
+from .reference import generate_users_ratings
+
+
+def get_stored_correlations():
+    """
+    Returns the correlation store, key: (target user ID, another user ID), value: correlation coefficient.
+    """
+    return {(row.target_user_id, row.another_user_id): row.correlation for row in Correlation.query.all()}
+
+
+def assert_store_is_fresh():
+    """
+    Checks the correlation store against a store rebuilt from the ratings of all users.
+    """
+    stored_correlations = get_stored_correlations()
+    Correlation.rebuild(Rating.get_snapshot(), processes=1)
+
+    assert stored_correlations == pytest.approx(get_stored_correlations(), abs=1e-12)
+
+
+def fill(app):
+    users_ratings = generate_users_ratings(users_count=30, movies_count=25, seed=2)
+    with app.app_context():
+        add_users_ratings(users_ratings, movies_count=25)
+        Correlation.rebuild(Rating.get_snapshot(), processes=1)
+        assert Correlation.is_filled()
+
+    return users_ratings
+
+
+def test_related_snapshot_gives_the_same_correlations(app):
+    users_ratings = fill(app)
+
+    with app.app_context():
+        snapshot = Rating.get_snapshot()
+        for user_id in users_ratings:
+            related_snapshot = Rating.get_related_snapshot(user_id)
+            correlations = snapshot.get_correlations(user_id)
+
+            assert set(related_snapshot.get_user_ids()) <= set(snapshot.get_user_ids())
+            assert related_snapshot.get_correlations(user_id) == pytest.approx(
+                {another_user_id: correlations[another_user_id] for another_user_id in related_snapshot.get_user_ids()
+                 if another_user_id != user_id}, abs=1e-12)
+            assert not any(correlations[another_user_id] for another_user_id in
+                           set(snapshot.get_user_ids()) - set(related_snapshot.get_user_ids()) - {user_id})
+
+
+def test_rating_change_refreshes_the_store_in_the_request(app):
+    users_ratings = fill(app)
+
+    with app.app_context():
+        for movie_id, rating in users_ratings[2].items():
+            Rating.upsert(movie_id, 1, rating)
+
+        assert Job.query.count() == 0
+        assert_store_is_fresh()
+
+
+def test_rating_change_queues_the_correlations_job(create_test_app):
+    app = create_test_app(JOB_WORKERS=1)
+    users_ratings = fill(app)
+
+    with app.app_context():
+        for movie_id, rating in users_ratings[2].items():
+            Rating.upsert(movie_id, 1, rating)
+
+        jobs = Job.query.filter_by(kind="correlations").all()
+        assert jobs and {job.key for job in jobs} == {"correlations:1"}
+
+        deadline = time.monotonic() + 10
+        while Job.query.filter(Job.status.in_(["queued", "running"])).count() and time.monotonic() < deadline:
+            db.session.rollback()
+            time.sleep(0.05)
+
+        assert {job.status for job in Job.query.filter_by(kind="correlations").all()} == {"done"}
+        assert_store_is_fresh()
@@ -0,0 +1,99 @@
+import pytest
+
+from src.recsys import RecommendationCache, LRUCacheBackend, SQLiteCacheBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, tmp_path):
+    backend = LRUCacheBackend(16) if request.param == "memory" else SQLiteCacheBackend(str(tmp_path / "cache.db"))
+
+    return RecommendationCache(backend)
+
+
+def calculated(recommendations, neighbor_ids, calls):
+    """
+    Returns a calculate function for the cache, which records its calls.
+    """
+    def calculate():
+        calls.append(recommendations)
+        return recommendations, neighbor_ids
+
+    return calculate
+
+
+def fill(cache, neighbors):
+    """
+    Caches the recommendations of the users, key: user ID, value: the IDs of the user's neighbors.
+    """
+    for user_id, neighbor_ids in neighbors.items():
+        cache.get_or_calculate(user_id, calculated([{"id": user_id}], neighbor_ids, []))
+
+
+def get_recalculated_users(cache, user_ids):
+    """
+    Looks up the users and returns the IDs of those whose recommendations had to be calculated again.
+    """
+    recalculated_user_ids = []
+    for user_id in user_ids:
+        calls = []
+        cache.get_or_calculate(user_id, calculated([{"id": user_id}], [], calls))
+        if calls:
+            recalculated_user_ids.append(user_id)
+
+    return recalculated_user_ids
+
+
+def test_invalidates_the_user_and_the_dependent_users(cache):
+    fill(cache, {1: [2, 3], 2: [4], 3: [], 4: [1], 5: []})
+
+    # The ratings of the user 2 have changed, the user 5 is the user's new neighbor.
+    cache.invalidate_user(2, [5])
+
+    # The user 4 is the old neighbor of the user 2, the entry of the user 4 does not depend on the user 2.
+    assert get_recalculated_users(cache, [1, 2, 3, 4, 5]) == [1, 2, 5]
+    assert get_recalculated_users(cache, [1, 2, 3, 4, 5]) == []
+
+
+def test_the_recalculated_neighbors_replace_the_old_ones(cache):
+    fill(cache, {1: [2]})
+    cache.invalidate_user(3)
+    assert get_recalculated_users(cache, [1]) == []
+
+    # The recalculated entry of the user 1 depends on the user 3 instead of the user 2.
+    cache.invalidate_user(1)
+    cache.get_or_calculate(1, calculated([{"id": 1}], [3], []))
+
+    cache.invalidate_user(2)
+    assert get_recalculated_users(cache, [1]) == []
+
+    cache.invalidate_user(3)
+    assert get_recalculated_users(cache, [1]) == [1]
+
+
+def test_stale_value_is_served_while_the_refresh_is_queued(cache):
+    fill(cache, {1: [2]})
+    cache.invalidate_user(2)
+
+    queued = []
+    calls = []
+    recommendations = cache.get_or_calculate(1, calculated([{"id": 10}], [2], calls), lambda: queued.append(1))
+
+    assert recommendations == [{"id": 1}]
+    assert queued == [1] and calls == []
+
+    assert cache.refresh(1, calculated([{"id": 10}], [2], calls)) == [{"id": 10}]
+    assert cache.get_or_calculate(1, calculated([{"id": 11}], [2], [])) == [{"id": 10}]
+
+
+def test_result_calculated_before_an_invalidation_is_not_stored(cache):
+    fill(cache, {1: [2]})
+    cache.invalidate_user(1)
+
+    def calculate():
+        # The ratings of the neighbor change during the calculation.
+        cache.invalidate_user(2)
+        return [{"id": 1}], [2]
+
+    cache.refresh(1, calculate)
+
+    assert get_recalculated_users(cache, [1]) == [1]
@@ -0,0 +1,67 @@
+import gc
+import uuid
+
+import pytest
+
+from src.models import Rating
+from src.recsys import RatingsSnapshot, RatingsSnapshotStore, SharedRatingsSnapshot
+
+from .conftest import add_users_ratings, get_auth_headers
+
+
+def test_own_rating_changes_are_overlaid_on_the_snapshot_file(tmp_path, create_test_app):
+    directory = str(tmp_path / "snapshots")
+    app = create_test_app(RATINGS_SNAPSHOT_DIR=directory)
+
+    with app.app_context():
+        add_users_ratings({1: {1: 1.0, 2: 2.0, 3: 3.0}, 2: {1: 1.0, 2: 2.0, 3: 3.0, 4: 5.0, 5: 1.0}}, 5)
+        RatingsSnapshotStore(directory).write(Rating.get_snapshot(), 2)
+
+    client = app.test_client()
+    headers = get_auth_headers(app, 1)
+
+    response = client.get("/user/1/recommendations", headers=headers)
+    assert [recommendation["id"] for recommendation in response.get_json()] == [4]
+
+    # The user rates the recommended movie, the snapshot file is not written again.
+    response = client.put("/movies/movie/4/rate", json={"user_id": 1, "user_rating": 4.0}, headers=headers)
+    assert response.status_code == 200
+
+    response = client.get("/user/1/recommendations", headers=headers)
+    assert response.get_json() == []
+
+    # The user's new mean rating (2.5) and the neighbor's deviation from the neighbor's mean rating (1.0 - 2.4).
+    response = client.get("/user/1/prediction/5", headers=headers)
+    assert float(response.get_json()["user_predicted_rating"]) == pytest.approx(2.5 + (1.0 - 2.4))
+
+
+def test_republished_shared_memory_snapshot_is_attached_without_a_restart():
+    name = f"test-ratings-{uuid.uuid4().hex[:8]}"
+    shared_snapshot = SharedRatingsSnapshot(name=name)
+    assert shared_snapshot.get() is None
+
+    RatingsSnapshot.from_users_ratings({1: {1: 1.0, 2: 2.0}}).publish(name)
+    try:
+        old_snapshot = shared_snapshot.get()
+        assert old_snapshot.get_ratings(1) == {1: 1.0, 2: 2.0}
+        assert shared_snapshot.get() is old_snapshot
+        old_ratings = old_snapshot.ratings
+
+        # Published again, as `flask recsys publish` does.
+        RatingsSnapshot.unpublish(name)
+        RatingsSnapshot.from_users_ratings({1: {1: 3.0}, 2: {2: 4.0}}).publish(name)
+
+        assert old_snapshot.is_retired()
+        new_snapshot = shared_snapshot.get()
+        assert new_snapshot is not old_snapshot
+        assert new_snapshot.get_ratings(1) == {1: 3.0}
+        assert new_snapshot.get_ratings(2) == {2: 4.0}
+
+        # A request still using the old snapshot's arrays keeps reading them after the snapshot is dropped.
+        del old_snapshot
+        gc.collect()
+        assert old_ratings.tolist() == [1.0, 2.0]
+    finally:
+        RatingsSnapshot.unpublish(name)
+
+    assert shared_snapshot.get() is None
@@ -0,0 +1,47 @@
+import pytest
+
+from src.recsys import RatingsSnapshot, SpearmanMatrix
+
+from .reference import get_reference_correlation, generate_users_ratings
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_correlations_match_reference(seed):
+    users_ratings = generate_users_ratings(users_count=60, movies_count=40, seed=seed)
+    spearman_matrix = SpearmanMatrix(RatingsSnapshot.from_users_ratings(users_ratings))
+
+    for target_user_id in (1, 2, 3):
+        correlations = spearman_matrix.get_correlations(users_ratings[target_user_id], target_user_id)
+
+        assert set(correlations) == {user_id for user_id, ratings in users_ratings.items()
+                                     if ratings and user_id != target_user_id}
+        for user_id, correlation in correlations.items():
+            assert correlation == pytest.approx(
+                get_reference_correlation(users_ratings[target_user_id], users_ratings[user_id]), abs=1e-12)
+
+
+def test_target_user_outside_the_snapshot():
+    users_ratings = generate_users_ratings(users_count=20, movies_count=30, seed=7)
+    target_user_ratings = {1: 5.0, 2: 3.0, 3: 3.0, 4: 1.0, 1000: 4.0}
+    spearman_matrix = SpearmanMatrix(RatingsSnapshot.from_users_ratings(users_ratings))
+
+    correlations = spearman_matrix.get_correlations(target_user_ratings)
+
+    for user_id, ratings in users_ratings.items():
+        if ratings:
+            assert correlations[user_id] == pytest.approx(get_reference_correlation(target_user_ratings, ratings),
+                                                          abs=1e-12)
+
+
+def test_block_correlations_match_rows():
+    users_ratings = generate_users_ratings(users_count=30, movies_count=25, seed=3)
+    snapshot = RatingsSnapshot.from_users_ratings(users_ratings)
+    spearman_matrix = SpearmanMatrix(snapshot)
+    user_ids = snapshot.get_user_ids()
+
+    block = spearman_matrix.get_block_correlations([users_ratings[user_id] for user_id in user_ids[:4]])
+
+    for index, target_user_id in enumerate(user_ids[:4]):
+        for column, user_id in enumerate(user_ids):
+            assert block[index, column] == pytest.approx(
+                get_reference_correlation(users_ratings[target_user_id], users_ratings[user_id]), abs=1e-12)
@@ -0,0 +1,117 @@
+import pytest
+
+from src.exts import db, title_index
+from src.exts.title_index import TitleIndex
+from src.models import Counter, Movie
+from src.models.db_counter_model import TITLES_VERSION
+
+from .conftest import add_users_ratings, get_auth_headers
+
+
+TITLES = {
+    1: "Amélie",
+    2: "Harry Potter and the Goblet of Fire",
+    3: "The Potato Eaters",
+    4: "Potemkin",
+    5: "Ça: The Return",
+}
+
+
+@pytest.fixture
+def index():
+    """
+    A title index loaded with the TITLES.
+    """
+    index = TitleIndex()
+    index.load(TITLES.items())
+
+    return index
+
+
+@pytest.mark.parametrize("prefix, movie_ids", [
+    ("amé", [1]),
+    ("AME", [1]),
+    ("pot", [4, 3, 2]),  # The titles starting with the prefix first, then the later words.
+    ("potter and", [2]),
+    ("ca the", [5]),
+    ("the", [3, 2, 5]),
+    ("  !? ", []),
+    ("zebra", []),
+])
+def test_matches_ignore_case_diacritics_and_punctuation(index, prefix, movie_ids):
+    assert [movie_id for movie_id, _ in index.get_matches(prefix, 10)] == movie_ids
+
+
+def test_put_rename_and_remove(index):
+    index.put(6, "Pot Luck")
+    assert index.get_matches("pot", 2) == [(6, "Pot Luck"), (4, "Potemkin")]
+
+    index.put(4, "Battleship Potemkin")
+    assert [movie_id for movie_id, _ in index.get_matches("pot", 10)] == [6, 3, 4, 2]
+    assert index.get_matches("battle", 10) == [(4, "Battleship Potemkin")]
+
+    index.remove(6)
+    index.remove(99)
+    assert [movie_id for movie_id, _ in index.get_matches("pot", 10)] == [3, 4, 2]
+    # One entry per word of the indexed titles.
+    titles = {**TITLES, 4: "Battleship Potemkin"}
+    assert index.get_metrics()["entries"] == sum(len(title.split()) for title in titles.values())
+
+
+def test_changes_of_another_process_drop_the_index():
+    index = TitleIndex()
+    index.sync(1)
+    index.load(TITLES.items())
+    index.sync(1)
+    assert index.is_loaded()
+
+    # A change of this process moves the index to the next version.
+    index.put(6, "Pot Luck", version=2)
+    assert (index.version, index.is_loaded()) == (2, True)
+
+    # The version 3 was a change of another process.
+    index.remove(6, version=4)
+    assert (index.version, index.is_loaded()) == (4, False)
+
+    index.load(TITLES.items())
+    index.sync(5)
+    assert not index.is_loaded()
+
+
+def test_typeahead_follows_the_movies_changed_by_another_process(app):
+    with app.app_context():
+        add_users_ratings({1: {1: 4.0}}, 2)
+
+    client = app.test_client()
+    headers = get_auth_headers(app, 1)
+
+    def get_titles(prefix):
+        response = client.get("/movies/typeahead", query_string={"q": prefix}, headers=headers)
+        assert response.status_code == 200, response.get_json()
+        return [movie["title"] for movie in response.get_json()]
+
+    assert get_titles("movie") == ["Movie 1", "Movie 2"]
+    assert title_index.get_metrics()["loads"] == 1
+
+    with app.app_context():
+        movie = db.session.get(Movie, 2)
+        movie.title = "Amélie"
+        movie.save()
+
+    # The change of this process is applied to the index, which is not loaded again.
+    assert get_titles("ame") == ["Amélie"]
+    assert title_index.get_metrics()["loads"] == 1
+
+    # Another process, e.g. flask import books, inserts a movie and renames one.
+    with app.app_context():
+        Movie.bulk_insert([{"id": 3, "title": "Movie 3", "category": "Drama", "country": "Czechia", "year": 2000,
+                            "main_actors": "Actor", "description": "Description"}])
+        db.session.commit()
+    assert get_titles("movie") == ["Movie 1", "Movie 3"]
+
+    with app.app_context():
+        db.session.execute(db.update(Movie).where(Movie.id == 1).values(title="Potemkin"))
+        Counter.increment(TITLES_VERSION)
+    assert get_titles("movie") == ["Movie 3"]
+    assert get_titles("pot") == ["Potemkin"]
+    assert title_index.get_metrics()["loads"] == 3
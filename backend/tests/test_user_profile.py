@@ -0,0 +1,122 @@
+import random
+
+import pytest
+
+from src.recsys import SpearmanMechanism, UserProfile
+from src.recsys.user_profile import NUMPY_RANKS_MIN_SIZE, get_average_ranks
+
+from .reference import get_reference_correlation, generate_users_ratings, _get_reference_ranks
+
+
+class PlainUser:
+    """
+    A RecsysUser which is not a profile, like the User model.
+    """
+
+    def __init__(self, user_id, ratings):
+        self.id = user_id
+        self.ratings = ratings
+
+    def get_id(self):
+        return self.id
+
+    def get_ratings(self):
+        return self.ratings
+
+    def get_mean_rating(self):
+        return sum(self.ratings.values()) / len(self.ratings) if self.ratings else 0
+
+    def get_neighbor(self, neighbor_id):
+        raise LookupError(neighbor_id)
+
+
+def get_correlation(target_user, another_user):
+    return SpearmanMechanism(target_user, another_user).get_spearman_correlation_coefficient()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_correlations_match_reference(seed):
+    users_ratings = generate_users_ratings(users_count=40, movies_count=30, seed=seed)
+    profiles = {user_id: UserProfile.from_ratings(user_id, ratings) for user_id, ratings in users_ratings.items()}
+
+    for target_user_id in (1, 2, 3):
+        for user_id, ratings in users_ratings.items():
+            expected = get_reference_correlation(users_ratings[target_user_id], ratings)
+
+            assert get_correlation(profiles[target_user_id], profiles[user_id]) == pytest.approx(expected, abs=1e-12)
+            assert get_correlation(PlainUser(target_user_id, users_ratings[target_user_id]),
+                                   PlainUser(user_id, ratings)) == pytest.approx(expected, abs=1e-12)
+
+
+@pytest.mark.parametrize("full_overlap", [True, False])
+def test_large_overlaps_match_reference(full_overlap):
+    generator = random.Random(11)
+    movies_count = NUMPY_RANKS_MIN_SIZE + 50
+    values = (1.0, 2.0, 2.5, 3.0, 4.0, 4.5, 5.0)
+
+    target_user_ratings = {movie_id: generator.choice(values) for movie_id in range(1, movies_count + 1)}
+    another_user_ratings = {movie_id: generator.choice(values) for movie_id in
+                            generator.sample(range(1, movies_count + 1), movies_count)}
+    if not full_overlap:
+        # The common movies are ranked among the ratings of them only, not among all of the user's ratings.
+        another_user_ratings.update({movie_id: generator.choice(values) for movie_id in range(1000, 1020)})
+
+    target_user = UserProfile.from_ratings(1, target_user_ratings)
+    another_user = UserProfile.from_ratings(2, another_user_ratings)
+
+    assert get_correlation(target_user, another_user) == pytest.approx(
+        get_reference_correlation(target_user_ratings, another_user_ratings), abs=1e-12)
+    assert get_correlation(target_user, target_user) == pytest.approx(1)
+
+
+@pytest.mark.parametrize("size", [0, 1, 5, NUMPY_RANKS_MIN_SIZE - 1, NUMPY_RANKS_MIN_SIZE, 300])
+def test_average_ranks_match_reference(size):
+    generator = random.Random(size)
+    values = [generator.choice((1.0, 2.0, 2.5, 3.0, 5.0)) for _ in range(size)]
+    ranks = _get_reference_ranks(dict(enumerate(values)), list(range(size)))
+    reference_ranks = [ranks[position] for position in range(size)]
+
+    assert get_average_ranks(values) == reference_ranks
+    assert UserProfile(1, list(range(size)), values).get_ranks() == reference_ranks
+
+
+def test_profile():
+    ratings = {30: 2.0, 10: 5.0, 20: 2.0}
+    profile = UserProfile.from_ratings(7, ratings)
+
+    assert profile.get_id() == 7 and len(profile) == 3
+    assert profile.get_ratings() is ratings
+    assert profile.movie_ids.tolist() == [10, 20, 30]
+    assert profile.ratings.tolist() == [5.0, 2.0, 2.0]
+    assert profile.get_mean_rating() == pytest.approx(3.0)
+    assert profile.get_ranks() == [3.0, 1.5, 1.5]
+
+    # The ratings dictionary keeps the order in which the ratings were provided.
+    assert list(UserProfile(7, [30, 10, 20], [2.0, 5.0, 2.0]).get_ratings().items()) == list(ratings.items())
+
+    assert UserProfile.from_ratings(8, {}).get_mean_rating() == 0
+    assert UserProfile.from_ratings(9, ratings, mean_rating=4.0).get_mean_rating() == 4.0
+
+    with pytest.raises(AttributeError):
+        profile.name = "profile"
+
+    with pytest.raises(LookupError):
+        profile.get_neighbor(8)
+
+
+def test_profile_from_user():
+    neighbor = UserProfile.from_ratings(2, {1: 3.0})
+    profile = UserProfile.from_ratings(1, {1: 4.0}, get_neighbor={2: neighbor}.__getitem__)
+
+    assert UserProfile.from_user(profile) is profile
+    assert profile.get_neighbor(2) is neighbor
+
+    user = PlainUser(3, {5: 1.0, 4: 3.0})
+    user_profile = UserProfile.from_user(user)
+
+    assert user_profile.get_id() == 3
+    assert user_profile.get_ratings() == user.get_ratings()
+    assert user_profile.get_mean_rating() == pytest.approx(2.0)
+    with pytest.raises(LookupError):
+        user_profile.get_neighbor(4)
+